@@ -0,0 +1,387 @@
+"""
+Neighborhood Activity Measures from Calendar and Reviews Files
+==============================================================
+Aggregates Inside Airbnb's calendar.csv (one row per listing and night) and
+reviews.csv (one row per review) into neighborhood-level activity measures:
+the share of calendar nights booked, booked nights per listing, reviews per
+listing in the last twelve months and a review-based occupancy estimate.
+
+For the largest metros these files run to tens of millions of rows, so the
+files are never held in memory by default. Every backend reduces a file to
+small per-listing totals, which are then mapped onto neighborhoods through
+the listing ids of the listings file:
+
+  pandas  - reads the needed columns of the whole file at once (small cities)
+  chunked - streams the file in chunks of ACTIVITY_CHUNKSIZE rows, so memory
+            is bounded by the number of listings, not of rows
+  sqlite  - loads the rows into an on-disk SQLite database (standard
+            library) and aggregates with SQL, which spills to disk instead
+            of growing in memory
+
+'auto' uses pandas for files below IN_MEMORY_BYTES and chunked otherwise.
+All backends return the same figures.
+
+Author: Econometrics Project
+Date: 2026-10-16
+"""
+
+import os
+import sqlite3
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+# Activity measures, by source file. Every measure is a per-neighborhood
+# figure over the listings of the listings file:
+#   occupancy_rate    - booked (unavailable) calendar nights / calendar nights
+#   booked_days       - booked calendar nights per listing with a calendar
+#   reviews_ltm       - reviews in the REVIEW_WINDOW_DAYS up to the latest
+#                       review in the file, per listing
+#   review_occupancy  - mean per-listing occupancy estimated from reviews_ltm
+#                       (Inside Airbnb's "San Francisco model")
+ACTIVITY_MEASURES = [
+    {'name': 'occupancy_rate', 'source': 'calendar',
+     'label': 'Share of calendar nights booked or blocked'},
+    {'name': 'booked_days', 'source': 'calendar',
+     'label': 'Booked or blocked calendar nights per listing'},
+    {'name': 'reviews_ltm', 'source': 'reviews',
+     'label': 'Reviews per listing in the last 12 months'},
+    {'name': 'review_occupancy', 'source': 'reviews',
+     'label': 'Occupancy estimated from reviews (share of the year)'},
+]
+
+# Activity files next to a listings file: <prefix><suffix>, where prefix is
+# the listings file name without '_listings.csv' (e.g. austin_calendar.csv)
+ACTIVITY_FILES = {
+    'calendar': ['_calendar.csv', '_calendar.csv.gz'],
+    'reviews': ['_reviews.csv', '_reviews.csv.gz'],
+}
+
+ACTIVITY_BACKENDS = ('auto', 'pandas', 'chunked', 'sqlite')
+
+# Files up to this size are read at once by the 'auto' backend; gzipped
+# files count GZIP_EXPANSION times their size
+IN_MEMORY_BYTES = 256 * 2**20
+GZIP_EXPANSION = 8
+
+# Rows parsed per chunk by the chunked and sqlite backends
+ACTIVITY_CHUNKSIZE = 1_000_000
+
+# Page cache of the sqlite backend in KB; beyond it SQLite works on disk
+SQLITE_CACHE_KB = 64 * 1024
+
+# San Francisco model: share of stays that leave a review, nights per stay
+# and the highest occupancy credited to a listing
+REVIEW_WINDOW_DAYS = 365
+REVIEW_RATE = 0.5
+AVERAGE_STAY_NIGHTS = 3
+OCCUPANCY_CAP = 0.7
+
+# Columns read from each file
+CALENDAR_COLUMNS = ['listing_id', 'available']
+REVIEW_COLUMNS = ['listing_id', 'date']
+
+
+def activity_names(sources=('calendar', 'reviews')):
+    """
+    Output column names of the measures of the given sources.
+    """
+    return [measure['name'] for measure in ACTIVITY_MEASURES if measure['source'] in sources]
+
+
+def find_activity_files(listings_path):
+    """
+    Find the calendar and reviews files next to a listings file.
+    
+    Parameters:
+    -----------
+    listings_path : str
+        Path to an Inside Airbnb listings file (<prefix>_listings.csv)
+        
+    Returns:
+    --------
+    dict
+        Source ('calendar', 'reviews') -> file path, for the files that exist
+    """
+    listings_path = Path(listings_path)
+    prefix = listings_path.name.replace('_listings.csv', '')
+    files = {}
+    for source, suffixes in ACTIVITY_FILES.items():
+        for suffix in suffixes:
+            candidate = listings_path.with_name(f"{prefix}{suffix}")
+            if candidate.exists():
+                files[source] = str(candidate)
+                break
+    return files
+
+
+def choose_backend(file_path, backend='auto'):
+    """
+    Resolve 'auto' to pandas or chunked by the size of a file.
+    """
+    if backend not in ACTIVITY_BACKENDS:
+        raise ValueError(f"Unknown activity backend: {backend} (expected {', '.join(ACTIVITY_BACKENDS)})")
+    if backend != 'auto':
+        return backend
+    size = os.path.getsize(file_path) * (GZIP_EXPANSION if str(file_path).endswith('.gz') else 1)
+    return 'pandas' if size <= IN_MEMORY_BYTES else 'chunked'
+
+
+def _read_chunks(file_path, columns, dtype=None, chunksize=ACTIVITY_CHUNKSIZE):
+    """
+    Stream the given columns of a CSV file (one chunk if chunksize is None).
+    """
+    header = pd.read_csv(file_path, nrows=0).columns
+    missing = [col for col in columns if col not in header]
+    if missing:
+        raise ValueError(f"{Path(file_path).name} lacks column(s): {', '.join(missing)}")
+    if chunksize is None:
+        yield pd.read_csv(file_path, usecols=columns, dtype=dtype)
+        return
+    with pd.read_csv(file_path, usecols=columns, dtype=dtype, chunksize=chunksize) as reader:
+        yield from reader
+
+
+def _calendar_rows(chunks, listing_ids):
+    """
+    Yield (listing position, booked) arrays per chunk, dropping rows of
+    listings not in listing_ids and rows without availability.
+    """
+    for chunk in chunks:
+        positions = listing_ids.get_indexer(chunk['listing_id'])
+        available = chunk['available']
+        keep = (positions >= 0) & available.notna().to_numpy()
+        yield len(chunk), positions[keep], (available == 'f').to_numpy()[keep]
+
+
+def _review_rows(chunks, listing_ids):
+    """
+    Yield (listing position, day number) arrays per chunk, dropping rows of
+    listings not in listing_ids and rows without a valid date.
+    """
+    for chunk in chunks:
+        positions = listing_ids.get_indexer(chunk['listing_id'])
+        dates = pd.to_datetime(chunk['date'], format='%Y-%m-%d', errors='coerce')
+        keep = (positions >= 0) & dates.notna().to_numpy()
+        days = dates.to_numpy()[keep].astype('datetime64[D]').astype(np.int64)
+        yield len(chunk), positions[keep], days
+
+
+def _fold_calendar(rows, n_listings):
+    """
+    Sum calendar nights and booked nights per listing in memory.
+    """
+    nights = np.zeros(n_listings, dtype=np.int64)
+    booked = np.zeros(n_listings, dtype=np.int64)
+    n_rows = 0
+    for chunk_rows, positions, is_booked in rows:
+        n_rows += chunk_rows
+        nights += np.bincount(positions, minlength=n_listings)
+        booked += np.bincount(positions[is_booked], minlength=n_listings)
+    return nights, booked, n_rows
+
+
+def _fold_reviews(rows, n_listings):
+    """
+    Count each listing's reviews in the window ending at the latest review.
+    
+    Reviews older than the window of the latest date seen so far can never
+    count, so after every chunk they are dropped and the rest are kept as
+    (listing, day) counts: memory stays bounded by listings x window days.
+    """
+    keys = np.zeros(0, dtype=np.int64)
+    counts = np.zeros(0, dtype=np.int64)
+    latest = None
+    n_rows = 0
+    for chunk_rows, positions, days in rows:
+        n_rows += chunk_rows
+        if len(days) == 0:
+            continue
+        latest = max(latest, int(days.max())) if latest is not None else int(days.max())
+        # Day in the low 32 bits, listing position in the high bits
+        keys = np.concatenate([keys, (positions.astype(np.int64) << 32) | days])
+        counts = np.concatenate([counts, np.ones(len(days), dtype=np.int64)])
+        recent = (keys & 0xFFFFFFFF) > latest - REVIEW_WINDOW_DAYS
+        keys, inverse = np.unique(keys[recent], return_inverse=True)
+        counts = np.bincount(inverse.ravel(), weights=counts[recent]).astype(np.int64)
+    return np.bincount(keys >> 32, weights=counts, minlength=n_listings).astype(np.int64), n_rows
+
+
+def _sqlite_database(work_dir):
+    """
+    Open a scratch SQLite database tuned for bulk loading, in work_dir.
+    """
+    connection = sqlite3.connect(os.path.join(work_dir, 'activity.db'))
+    connection.execute('PRAGMA journal_mode = OFF')
+    connection.execute('PRAGMA synchronous = OFF')
+    connection.execute('PRAGMA temp_store = FILE')
+    connection.execute(f'PRAGMA cache_size = -{SQLITE_CACHE_KB}')
+    return connection
+
+
+def _sqlite_calendar(rows, n_listings, work_dir):
+    """
+    Sum calendar nights and booked nights per listing with SQLite on disk.
+    """
+    nights = np.zeros(n_listings, dtype=np.int64)
+    booked = np.zeros(n_listings, dtype=np.int64)
+    n_rows = 0
+    with tempfile.TemporaryDirectory(dir=work_dir, prefix='activity-') as scratch:
+        connection = _sqlite_database(scratch)
+        try:
+            connection.execute('CREATE TABLE calendar (listing INTEGER, booked INTEGER)')
+            for chunk_rows, positions, is_booked in rows:
+                n_rows += chunk_rows
+                connection.executemany('INSERT INTO calendar VALUES (?, ?)',
+                                       zip(positions.tolist(), is_booked.astype(int).tolist()))
+            query = 'SELECT listing, COUNT(*), SUM(booked) FROM calendar GROUP BY listing'
+            for listing, listing_nights, listing_booked in connection.execute(query):
+                nights[listing], booked[listing] = listing_nights, listing_booked
+        finally:
+            connection.close()
+    return nights, booked, n_rows
+
+
+def _sqlite_reviews(rows, n_listings, work_dir):
+    """
+    Count each listing's reviews in the window with SQLite on disk.
+    """
+    counts = np.zeros(n_listings, dtype=np.int64)
+    n_rows = 0
+    with tempfile.TemporaryDirectory(dir=work_dir, prefix='activity-') as scratch:
+        connection = _sqlite_database(scratch)
+        try:
+            connection.execute('CREATE TABLE reviews (listing INTEGER, day INTEGER)')
+            for chunk_rows, positions, days in rows:
+                n_rows += chunk_rows
+                connection.executemany('INSERT INTO reviews VALUES (?, ?)', zip(positions.tolist(), days.tolist()))
+            query = ('SELECT listing, COUNT(*) FROM reviews '
+                     'WHERE day > (SELECT MAX(day) FROM reviews) - ? GROUP BY listing')
+            for listing, listing_count in connection.execute(query, (REVIEW_WINDOW_DAYS,)):
+                counts[listing] = listing_count
+        finally:
+            connection.close()
+    return counts, n_rows
+
+
+def listing_calendar(file_path, listing_ids, backend='auto', chunksize=ACTIVITY_CHUNKSIZE, work_dir=None):
+    """
+    Calendar nights and booked nights of every listing.
+    
+    Parameters:
+    -----------
+    file_path : str
+        Inside Airbnb calendar file (listing_id, date, available, ...)
+    listing_ids : pd.Index
+        Listing ids to aggregate, unique; rows of other listings are skipped
+    backend : str
+        One of ACTIVITY_BACKENDS
+    chunksize : int
+        Rows parsed per chunk (chunked and sqlite backends)
+    work_dir : str, optional
+        Directory for the sqlite backend's scratch database (default: the
+        system temporary directory)
+        
+    Returns:
+    --------
+    tuple
+        (nights, booked, n_rows): int arrays aligned with listing_ids and the
+        number of rows read
+    """
+    backend = choose_backend(file_path, backend)
+    chunks = _read_chunks(file_path, CALENDAR_COLUMNS, dtype={'available': 'category'},
+                          chunksize=None if backend == 'pandas' else chunksize)
+    rows = _calendar_rows(chunks, listing_ids)
+    if backend == 'sqlite':
+        return _sqlite_calendar(rows, len(listing_ids), work_dir)
+    return _fold_calendar(rows, len(listing_ids))
+
+
+def listing_reviews(file_path, listing_ids, backend='auto', chunksize=ACTIVITY_CHUNKSIZE, work_dir=None):
+    """
+    Reviews of every listing in the REVIEW_WINDOW_DAYS up to the latest
+    review in the file.
+    
+    Parameters:
+    -----------
+    file_path : str
+        Inside Airbnb reviews file (listing_id, date, ...)
+    listing_ids : pd.Index
+        Listing ids to aggregate, unique; rows of other listings are skipped
+    backend : str
+        One of ACTIVITY_BACKENDS
+    chunksize : int
+        Rows parsed per chunk (chunked and sqlite backends)
+    work_dir : str, optional
+        Directory for the sqlite backend's scratch database
+        
+    Returns:
+    --------
+    tuple
+        (counts, n_rows): int array aligned with listing_ids and the number
+        of rows read
+    """
+    backend = choose_backend(file_path, backend)
+    chunks = _read_chunks(file_path, REVIEW_COLUMNS, chunksize=None if backend == 'pandas' else chunksize)
+    rows = _review_rows(chunks, listing_ids)
+    if backend == 'sqlite':
+        return _sqlite_reviews(rows, len(listing_ids), work_dir)
+    return _fold_reviews(rows, len(listing_ids))
+
+
+def aggregate_activity(listings, files, backend='auto', chunksize=ACTIVITY_CHUNKSIZE, work_dir=None):
+    """
+    Aggregate calendar and reviews files into neighborhood activity measures.
+    
+    Parameters:
+    -----------
+    listings : pd.Series
+        Neighborhood label of every listing, indexed by listing id (missing
+        labels are skipped)
+    files : dict
+        Source ('calendar', 'reviews') -> file path (see find_activity_files)
+    backend : str
+        One of ACTIVITY_BACKENDS
+    chunksize : int
+        Rows parsed per chunk (chunked and sqlite backends)
+    work_dir : str, optional
+        Directory for the sqlite backend's scratch database
+        
+    Returns:
+    --------
+    tuple
+        (table, n_rows): table indexed by neighborhood label with the
+        measures of the given sources; n_rows is source -> rows read
+    """
+    listings = listings[~listings.index.duplicated()]
+    listing_ids = pd.Index(listings.index)
+    groups, labels = pd.factorize(listings, use_na_sentinel=True)
+    keep = groups >= 0
+    groups = groups[keep]
+    n_groups = len(labels)
+    
+    def per_group(values):
+        return np.bincount(groups, weights=values[keep], minlength=n_groups)
+    
+    table = pd.DataFrame(index=pd.Index(labels, dtype=object))
+    n_rows = {}
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if 'calendar' in files:
+            nights, booked, n_rows['calendar'] = listing_calendar(
+                files['calendar'], listing_ids, backend, chunksize, work_dir
+            )
+            group_nights, group_booked = per_group(nights), per_group(booked)
+            table['occupancy_rate'] = np.where(group_nights > 0, group_booked / group_nights, np.nan)
+            with_calendar = per_group((nights > 0).astype(float))
+            table['booked_days'] = np.where(with_calendar > 0, group_booked / with_calendar, np.nan)
+        if 'reviews' in files:
+            counts, n_rows['reviews'] = listing_reviews(files['reviews'], listing_ids, backend, chunksize, work_dir)
+            group_listings = per_group(np.ones(len(counts)))
+            nights = np.minimum(counts / REVIEW_RATE * AVERAGE_STAY_NIGHTS, OCCUPANCY_CAP * REVIEW_WINDOW_DAYS)
+            table['reviews_ltm'] = per_group(counts.astype(float)) / group_listings
+            table['review_occupancy'] = per_group(nights / REVIEW_WINDOW_DAYS) / group_listings
+    
+    return table.sort_index(), n_rows
@@ -0,0 +1,17 @@
+"""
+Airbnb Neighborhood Panel Pipeline
+==================================
+Config-driven runs of the integration pipeline (integrate_data.py):
+
+  python -m airbnb_panel configs/five_cities.json [--dry-run] [--jobs N] ...
+
+A run configuration (config.py) names the cities, input files, sources and
+outputs; several configurations can run at once in separate processes. The
+package imports only the standard library until a run needs the pipeline.
+
+Author: Econometrics Project
+Date: 2026-10-16
+"""
+
+from airbnb_panel.config import RunConfig, load_config
+from airbnb_panel.runner import run_config
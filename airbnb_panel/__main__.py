@@ -0,0 +1,10 @@
+"""
+Entry point: python -m airbnb_panel [CONFIG ...] [options]
+"""
+
+import sys
+
+from airbnb_panel.cli import main
+
+
+sys.exit(main())
@@ -0,0 +1,356 @@
+"""
+Command Line
+============
+python -m airbnb_panel [CONFIG ...] [options]
+
+Runs the pipeline once per config file (default: configs/five_cities.json).
+With several configs and --jobs N, up to N runs go at once, each in its own
+process with its output written to a log file; runs must not share an
+output base, stage directory or panel store.
+
+--events, --trace and --profile switch on the instrumentation of the
+stages (see instrumentation.py) for the run.
+
+Only the standard library is imported until a run needs the pipeline, so
+--help and dry runs of unchanged configurations start without pandas.
+
+Author: Econometrics Project
+Date: 2026-10-16
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import instrumentation
+from airbnb_panel.config import DEFAULT_CONFIG, load_config
+from airbnb_panel.runner import clear_caches, run_config
+
+
+def parse_args(argv=None):
+    """
+    Parse command-line options.
+    
+    Parameters:
+    -----------
+    argv : list, optional
+        Argument list (defaults to sys.argv[1:])
+        
+    Returns:
+    --------
+    argparse.Namespace
+        Parsed options
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m airbnb_panel',
+        description="Build the neighborhood-level Airbnb dataset for one or more run configurations."
+    )
+    parser.add_argument(
+        'configs',
+        nargs='*',
+        metavar='CONFIG',
+        help="JSON run configuration(s) (default: configs/five_cities.json)"
+    )
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=1,
+        help="Configurations to run at once, each in its own process (default: 1, in this process)"
+    )
+    parser.add_argument(
+        '--log-dir',
+        default=None,
+        help="Directory for the logs of concurrent runs (default: <output>.log next to each run's output)"
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help="Worker processes for Airbnb ingestion "
+             "(default: one per city, capped at the CPU count; 1 = serial)"
+    )
+    parser.add_argument(
+        '--activity-backend',
+        default=None,
+        help="How calendar and reviews files are aggregated: auto, pandas (in memory), chunked "
+             "(streamed) or sqlite (on disk) (default: from the config, else auto)"
+    )
+    parser.add_argument(
+        '--validation',
+        default=None,
+        help="How schema violations of the inputs and the final dataset are handled: lazy (report all, then "
+             "stop), fail_fast (stop at the first) or warn (default: from the config, else lazy)"
+    )
+    parser.add_argument(
+        '--cache-dir',
+        default=None,
+        help="Input cache directory (default: <data>/.cache/inputs)"
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help="Bypass the input cache and parse every CSV"
+    )
+    parser.add_argument(
+        '--clear-cache',
+        action='store_true',
+        help="Delete the input cache and stored stage outputs before running"
+    )
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help="Print which pipeline stages would run and why, then exit"
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help="Rerun every pipeline stage even if its inputs are unchanged"
+    )
+    parser.add_argument(
+        '--no-fuzzy',
+        action='store_true',
+        help="Join on exact neighborhood names only (no fuzzy name matching)"
+    )
+    parser.add_argument(
+        '--panel',
+        action='store_true',
+        help="Also build a neighborhood x period panel from the dated snapshots in "
+             "<data>/Airbnb Listings Data/Snapshots"
+    )
+    parser.add_argument(
+        '--panel-store',
+        default=None,
+        help="Panel store directory (default: <data>/Panel Store)"
+    )
+    parser.add_argument(
+        '--formats',
+        default=None,
+        help="Comma-separated export formats out of dta, csv, parquet, feather (default: from the config, "
+             "else all four)"
+    )
+    parser.add_argument(
+        '--partition-by-city',
+        action='store_true',
+        help="Write the Parquet export as a directory partitioned by city"
+    )
+    parser.add_argument(
+        '--events',
+        default=None,
+        help="Write per-stage timing, memory and row-count events to this JSON-lines file "
+             "('{name}' is replaced by the config name)"
+    )
+    parser.add_argument(
+        '--trace',
+        default=None,
+        help="Write the same spans as a Chrome trace (chrome://tracing, Perfetto, speedscope)"
+    )
+    parser.add_argument(
+        '--profile',
+        default=None,
+        help="Comma-separated stage or span names to run the sampling profiler on (e.g. airbnb,merge); "
+             "stacks are written as <name>.folded for flame graphs"
+    )
+    parser.add_argument(
+        '--profile-dir',
+        default=None,
+        help="Directory for the profiler's folded stacks (default: next to the events or trace file)"
+    )
+    args = parser.parse_args(argv)
+    args.configs = args.configs or [DEFAULT_CONFIG]
+    args.profile = [name.strip() for name in args.profile.split(',') if name.strip()] if args.profile else []
+    if args.formats is not None:
+        args.formats = [fmt.strip() for fmt in args.formats.split(',') if fmt.strip()]
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    return args
+
+
+def apply_overrides(config, args):
+    """
+    Apply command-line options to a run configuration.
+    """
+    if args.workers is not None:
+        config.workers = args.workers
+    if args.activity_backend is not None:
+        config.activity_backend = args.activity_backend
+    if args.validation is not None:
+        config.validation = args.validation
+    if args.cache_dir is not None:
+        config.cache_dir = str(Path(args.cache_dir).resolve())
+    if args.no_fuzzy:
+        config.fuzzy = False
+    if args.panel:
+        config.panel = True
+    if args.panel_store is not None:
+        config.panel_store = str(Path(args.panel_store).resolve())
+    if args.formats is not None:
+        config.formats = args.formats
+    if args.partition_by_city:
+        config.partition_by = 'city'
+    return config
+
+
+def check_separate(configs):
+    """
+    Check that runs do not write to the same places.
+    """
+    for attribute in ['name', 'output', 'stage_dir']:
+        seen = {}
+        for config in configs:
+            value = getattr(config, attribute)
+            if value in seen:
+                raise ValueError(f"Configs '{seen[value]}' and '{config.name}' have the same {attribute}: {value}")
+            seen[value] = config.name
+    
+    seen = {}
+    for config in configs:
+        if config.panel:
+            store = config.panel_store or config.data_dir
+            if store in seen:
+                raise ValueError(f"Configs '{seen[store]}' and '{config.name}' share a panel store")
+            seen[store] = config.name
+
+
+def instrumentation_paths(args, config, several=False):
+    """
+    Instrumentation outputs of one run.
+    
+    With several runs, '{name}' in a path is replaced by the config name, or
+    the name is added before the extension, so runs write separate files.
+    
+    Returns:
+    --------
+    dict
+        enable() keyword arguments, empty if instrumentation is off
+    """
+    def run_path(path):
+        if path is None:
+            return None
+        if '{name}' in path:
+            return path.replace('{name}', config.name)
+        if not several:
+            return path
+        path = Path(path)
+        return str(path.with_name(f"{path.stem}.{config.name}{path.suffix}"))
+    
+    if args.events is None and args.trace is None and not args.profile:
+        return {}
+    profile_dir = run_path(args.profile_dir)
+    if args.profile and profile_dir is None and args.events is None and args.trace is None:
+        profile_dir = str(Path(f"{config.output}_profile"))
+    return {'events_path': run_path(args.events), 'trace_path': run_path(args.trace),
+            'profile': args.profile, 'profile_dir': profile_dir}
+
+
+def _run_argv(args, config, several):
+    """
+    Options passed on to the process of one concurrent run.
+    """
+    argv = []
+    paths = instrumentation_paths(args, config, several)
+    for flag, value in [('--workers', args.workers), ('--activity-backend', args.activity_backend),
+                        ('--validation', args.validation), ('--cache-dir', args.cache_dir),
+                        ('--panel-store', args.panel_store), ('--events', paths.get('events_path')),
+                        ('--trace', paths.get('trace_path')), ('--profile-dir', paths.get('profile_dir'))]:
+        if value is not None:
+            argv += [flag, str(value)]
+    if args.formats is not None:
+        argv += ['--formats', ','.join(args.formats)]
+    if args.profile:
+        argv += ['--profile', ','.join(args.profile)]
+    for flag, enabled in [('--no-cache', args.no_cache), ('--dry-run', args.dry_run), ('--force', args.force),
+                          ('--no-fuzzy', args.no_fuzzy), ('--panel', args.panel),
+                          ('--partition-by-city', args.partition_by_city)]:
+        if enabled:
+            argv.append(flag)
+    return argv
+
+
+def run_concurrently(configs, args):
+    """
+    Run several configurations at once, one process each.
+    
+    Parameters:
+    -----------
+    configs : list of RunConfig
+        Run configurations (read from files)
+    args : argparse.Namespace
+        Parsed options
+        
+    Returns:
+    --------
+    int
+        0 if every run succeeded, else 1
+    """
+    # Clear once here, not in the runs, as runs may share an input cache
+    if args.clear_cache:
+        for config in configs:
+            clear_caches(config)
+    
+    def log_path(config):
+        if args.log_dir is None:
+            return Path(f"{config.output}.log")
+        return Path(args.log_dir) / f"{config.name}.log"
+    
+    def run(config):
+        path = log_path(config)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        start = time.perf_counter()
+        with open(path, 'w') as log:
+            process = subprocess.run(
+                [sys.executable, '-m', 'airbnb_panel', config.path] + _run_argv(args, config, several=True),
+                stdout=log, stderr=subprocess.STDOUT
+            )
+        return process.returncode, time.perf_counter() - start, path
+    
+    print(f"\nRunning {len(configs)} configurations, {min(args.jobs, len(configs))} at a time")
+    failed = 0
+    with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+        futures = {config.name: executor.submit(run, config) for config in configs}
+        for name, future in futures.items():
+            returncode, seconds, path = future.result()
+            if returncode == 0:
+                print(f"   + {name}: finished in {seconds:.1f} s (log: {path})")
+            else:
+                failed += 1
+                print(f"   WARNING: {name} failed with exit code {returncode} after {seconds:.1f} s (log: {path})")
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    """
+    Main execution function.
+    """
+    args = parse_args(argv)
+    try:
+        configs = [apply_overrides(load_config(path), args) for path in args.configs]
+        check_separate(configs)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    
+    if args.jobs > 1 and len(configs) > 1:
+        return run_concurrently(configs, args)
+    
+    for config in configs:
+        paths = instrumentation_paths(args, config, several=len(configs) > 1)
+        if paths:
+            instrumentation.enable(**paths)
+        try:
+            with instrumentation.span('run', config=config.name):
+                run_config(config, dry_run=args.dry_run, force=args.force, use_cache=not args.no_cache,
+                           clear_cache=args.clear_cache)
+        except Exception as e:
+            print("\n" + "="*80)
+            print("ERROR: ERROR OCCURRED")
+            print("="*80)
+            print(f"\nError: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            raise
+        finally:
+            instrumentation.disable()
+    return 0
@@ -0,0 +1,142 @@
+"""
+Pipeline Run Configuration
+==========================
+A run is described by a JSON file naming the cities and their listings
+files, the supplementary sources and where outputs go, e.g.
+
+  {
+    "name": "five_cities",
+    "data_dir": "../data",
+    "cities": {
+      "Austin": "Airbnb Listings Data/austin_listings.csv",
+      "Dallas": "Airbnb Listings Data/dallas_listings.csv"
+    },
+    "output": "airbnb_neighborhood_panel",
+    "formats": ["dta", "csv"]
+  }
+
+data_dir is relative to the config file; every other path is relative to
+data_dir (absolute paths are kept). Keys left out take their defaults:
+
+  name          config file name without extension
+  data_dir      the config file's directory
+  sources       supplementary files (demographics, rent, housing, tourism);
+                default integrate_data.SUPPLEMENTARY_FILES
+  output        'airbnb_neighborhood_panel' (base path, no extension)
+  formats       every export format
+  partition_by  null (or 'city' for a partitioned Parquet export)
+  fuzzy         true
+  panel         false
+  panel_store   <data_dir>/Panel Store
+  workers       one per city, capped at the CPU count
+  activity_backend
+                'auto': how calendar and reviews files are aggregated
+                ('pandas', 'chunked' or 'sqlite'; see activity_measures.py)
+  validation    'lazy': how schema violations of the inputs and the final
+                dataset are handled ('fail_fast' or 'warn'; see validation.py)
+  cache_dir     <data_dir>/.cache/inputs (shared by runs; safe concurrently)
+  stage_dir     <data_dir>/.cache/stages/<name> (one per run configuration)
+
+This module only uses the standard library, so configs can be read and
+checked without importing the pipeline.
+
+Author: Econometrics Project
+Date: 2026-10-16
+"""
+
+import json
+import os
+from pathlib import Path
+
+from cache_layout import DEFAULT_CACHE_SUBDIR, DEFAULT_STAGE_SUBDIR
+
+
+# Default output base name, relative to the data directory
+DEFAULT_OUTPUT = 'airbnb_neighborhood_panel'
+
+# Config shipped with the repository (the five study cities)
+DEFAULT_CONFIG = str(Path(__file__).resolve().parent.parent / 'configs' / 'five_cities.json')
+
+CONFIG_KEYS = (
+    'name', 'data_dir', 'cities', 'sources', 'output', 'formats', 'partition_by', 'fuzzy', 'panel',
+    'panel_store', 'workers', 'activity_backend', 'validation', 'cache_dir', 'stage_dir',
+)
+
+
+class RunConfig:
+    """
+    One pipeline run: cities, inputs, outputs and options, with paths resolved.
+    
+    Parameters:
+    -----------
+    settings : dict
+        Config file contents (see the module docstring)
+    path : str, optional
+        Config file the settings came from; relative data_dir is resolved
+        against its directory (default: the working directory)
+    """
+    
+    def __init__(self, settings, path=None):
+        unknown = [key for key in settings if key not in CONFIG_KEYS]
+        if unknown:
+            raise ValueError(f"Unknown config key(s): {', '.join(unknown)}")
+        
+        self.path = str(Path(path).resolve()) if path is not None else None
+        config_dir = Path(self.path).parent if path is not None else Path.cwd()
+        self.name = settings.get('name') or (Path(path).stem if path is not None else 'pipeline')
+        self.data_dir = str((config_dir / settings.get('data_dir', '.')).resolve())
+        
+        cities = settings.get('cities')
+        if not isinstance(cities, dict) or not cities:
+            raise ValueError(f"Config '{self.name}' needs a 'cities' mapping of city name -> listings file")
+        self.cities = {city: self.resolve(file_path) for city, file_path in cities.items()}
+        sources = settings.get('sources')
+        self.sources = {name: self.resolve(file_path) for name, file_path in sources.items()} if sources else None
+        
+        self.output = self.resolve(settings.get('output', DEFAULT_OUTPUT))
+        self.formats = list(settings['formats']) if settings.get('formats') else None
+        self.partition_by = settings.get('partition_by')
+        self.fuzzy = bool(settings.get('fuzzy', True))
+        self.panel = bool(settings.get('panel', False))
+        self.panel_store = self.resolve(settings['panel_store']) if settings.get('panel_store') else None
+        self.workers = settings.get('workers')
+        self.activity_backend = settings.get('activity_backend') or 'auto'
+        self.validation = settings.get('validation') or 'lazy'
+        self.cache_dir = self.resolve(settings.get('cache_dir') or DEFAULT_CACHE_SUBDIR)
+        self.stage_dir = self.resolve(settings.get('stage_dir') or f"{DEFAULT_STAGE_SUBDIR}/{self.name}")
+    
+    def resolve(self, file_path):
+        """
+        Resolve a path relative to the data directory.
+        """
+        return os.path.join(self.data_dir, file_path)
+    
+    def to_dict(self):
+        """
+        Resolved settings, as a JSON-serializable dict.
+        """
+        return {key: getattr(self, key) for key in CONFIG_KEYS}
+
+
+def load_config(path):
+    """
+    Read a run configuration file.
+    
+    Parameters:
+    -----------
+    path : str
+        JSON config file
+        
+    Returns:
+    --------
+    RunConfig
+        Configuration with resolved paths
+    """
+    with open(path) as f:
+        try:
+            settings = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Config {path} is not valid JSON: {e}") from None
+    if not isinstance(settings, dict):
+        raise ValueError(f"Config {path} must be a JSON object")
+    return RunConfig(settings, path)
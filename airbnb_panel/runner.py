@@ -0,0 +1,252 @@
+"""
+Pipeline Runs from a Configuration
+==================================
+Runs the integration pipeline (integrate_data.build_pipeline_graph) for one
+RunConfig: builds the stage graph, runs the stages whose inputs changed and
+prints where the outputs went.
+
+The pipeline modules (and pandas) are imported only when a run needs them.
+Each full run saves the graph layout next to the stage records, together
+with hashes of the pipeline source files, the resolved config and the
+listings of the directories the graph is discovered from. A dry run whose
+config, code and directories are unchanged plans from that layout (only the
+input files are re-hashed), without importing the pipeline; otherwise it
+builds the graph as a full run would.
+
+Author: Econometrics Project
+Date: 2026-10-16
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+
+from cache_layout import file_sha256
+from input_cache import InputCache
+from stage_graph import StageGraph
+
+
+# Repository root: pipeline modules imported from here are hashed into the layout
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Config settings that do not change the graph (only how it runs)
+RUN_ONLY_SETTINGS = ('workers', 'cache_dir', 'activity_backend')
+
+
+def clear_caches(config):
+    """
+    Delete a run's input cache and stored stage outputs.
+    """
+    InputCache(config.cache_dir).clear()
+    shutil.rmtree(config.stage_dir, ignore_errors=True)
+
+
+def _config_hash(config):
+    """
+    Hash of the settings that determine the graph.
+    """
+    settings = config.to_dict()
+    for key in RUN_ONLY_SETTINGS:
+        settings.pop(key)
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode()).hexdigest()
+
+
+def _directory_listings(directories):
+    """
+    Sorted file names of each directory (None if it does not exist).
+    """
+    return {directory: sorted(os.listdir(directory)) if os.path.isdir(directory) else None
+            for directory in directories}
+
+
+def _pipeline_sources():
+    """
+    Content hashes of the repository modules imported so far, keyed by path
+    relative to REPO_ROOT (so a layout is checked against the files of the
+    checkout that reads it).
+    """
+    sources = {}
+    for module in list(sys.modules.values()):
+        path = getattr(module, '__file__', None)
+        if path and Path(path).is_file() and Path(path).resolve().is_relative_to(REPO_ROOT):
+            sources[str(Path(path).resolve().relative_to(REPO_ROOT))] = file_sha256(path)
+    return dict(sorted(sources.items()))
+
+
+def saved_plan_graph(config):
+    """
+    Restore a run's stage graph from its saved layout, if still current.
+    
+    Parameters:
+    -----------
+    config : RunConfig
+        Run configuration
+        
+    Returns:
+    --------
+    tuple
+        (StageGraph or None, reason the saved layout cannot be used)
+    """
+    saved = StageGraph.load_layout(config.stage_dir)
+    if saved is None:
+        return None, 'no saved graph layout'
+    graph, details = saved
+    
+    if details.get('config') != _config_hash(config):
+        return None, 'config changed'
+    for path, digest in details.get('sources', {}).items():
+        path = REPO_ROOT / path
+        if not path.exists() or file_sha256(path) != digest:
+            return None, f"pipeline code changed: {Path(path).name}"
+    listings = details.get('directories', {})
+    if _directory_listings(listings) != listings:
+        return None, 'data directory contents changed'
+    return graph, None
+
+
+def build_graph(config, cache=None):
+    """
+    Build a run's stage graph from the pipeline modules.
+    
+    Parameters:
+    -----------
+    config : RunConfig
+        Run configuration
+    cache : InputCache, optional
+        Columnar cache of parsed inputs
+        
+    Returns:
+    --------
+    StageGraph
+        Graph of integrate_data.build_pipeline_graph; its layout is saved
+        for later dry runs
+    """
+    from activity_measures import ACTIVITY_BACKENDS
+    from validation import VALIDATION_MODES
+    from export_formats import DEFAULT_EXPORT_FORMATS, EXPORT_FORMATS
+    from panel_store import DEFAULT_PANEL_SUBDIR
+    import integrate_data
+    
+    formats = config.formats or list(DEFAULT_EXPORT_FORMATS)
+    unknown = [fmt for fmt in formats if fmt not in EXPORT_FORMATS]
+    if unknown:
+        raise ValueError(f"Config '{config.name}': unknown export format(s): {', '.join(unknown)} "
+                         f"(expected {', '.join(EXPORT_FORMATS)})")
+    if config.activity_backend not in ACTIVITY_BACKENDS:
+        raise ValueError(f"Config '{config.name}': unknown activity backend: {config.activity_backend} "
+                         f"(expected {', '.join(ACTIVITY_BACKENDS)})")
+    if config.validation not in VALIDATION_MODES:
+        raise ValueError(f"Config '{config.name}': unknown validation mode: {config.validation} "
+                         f"(expected {', '.join(VALIDATION_MODES)})")
+    
+    panel_store = None
+    if config.panel:
+        panel_store = config.panel_store or config.resolve(DEFAULT_PANEL_SUBDIR)
+    
+    graph = integrate_data.build_pipeline_graph(
+        config.cities, config.data_dir, config.output, config.stage_dir,
+        max_workers=config.workers, cache=cache, fuzzy=config.fuzzy, panel_store=panel_store,
+        formats=formats, partition_by=config.partition_by,
+        sources=config.sources or integrate_data.SUPPLEMENTARY_FILES, activity_backend=config.activity_backend,
+        validation=config.validation
+    )
+    graph.save_layout({
+        'config': _config_hash(config),
+        'sources': _pipeline_sources(),
+        'directories': _directory_listings(integrate_data.scanned_directories(config.data_dir, config.cities)),
+    })
+    return graph
+
+
+def print_outputs(config, final_df):
+    """
+    Print the success summary and the output files of a run.
+    """
+    from export_formats import DEFAULT_EXPORT_FORMATS, export_paths
+    from quality_report import CORE_COLUMNS
+    
+    formats = config.formats or DEFAULT_EXPORT_FORMATS
+    output_base = config.output
+    
+    print("\n" + "="*80)
+    print("+ SUCCESS!")
+    print("="*80)
+    complete_count = final_df.dropna(subset=CORE_COLUMNS).shape[0]
+    complete_pct = (complete_count / len(final_df) * 100)
+    
+    print(f"\nMerging: Created neighborhood-level dataset:")
+    print(f"   • {len(final_df)} neighborhoods")
+    print(f"   • {len(final_df.columns)} variables")
+    print(f"   • {complete_count} complete neighborhoods ({complete_pct:.1f}%)")
+    print(f"   • Ready for econometric analysis")
+    
+    print(f"\nFiles: Output files:")
+    for path in export_paths(output_base, formats).values():
+        print(f"   • {path}")
+    print(f"   • {output_base}_provenance.csv")
+    print(f"   • {output_base}_results.txt")
+    print(f"   • {output_base}_estimates.csv")
+    print(f"   • {output_base}_quality.json")
+    if config.fuzzy:
+        print(f"   • {output_base}_match_review.csv")
+    if config.panel:
+        for path in export_paths(f"{output_base}_by_period", formats).values():
+            print(f"   • {path}")
+
+
+def run_config(config, dry_run=False, force=False, use_cache=True, clear_cache=False):
+    """
+    Run the pipeline for one configuration.
+    
+    Parameters:
+    -----------
+    config : RunConfig
+        Run configuration
+    dry_run : bool
+        Only print which stages would run and why
+    force : bool
+        Rerun every stage regardless of stored outputs
+    use_cache : bool
+        Read inputs through the columnar input cache
+    clear_cache : bool
+        Delete the input cache and stored stage outputs first
+        
+    Returns:
+    --------
+    list of dict
+        The executed plan (see StageGraph.plan())
+    """
+    print("\n" + "="*80)
+    print("NEIGHBORHOOD-LEVEL AIRBNB DATASET CREATION")
+    print("="*80)
+    print(f"\nRun: {config.name}" + (f" ({config.path})" if config.path else ""))
+    print(f"   Data: {config.data_dir}")
+    print(f"   Cities: {', '.join(config.cities)}")
+    
+    if clear_cache:
+        clear_caches(config)
+    
+    if dry_run:
+        start = time.perf_counter()
+        graph, reason = saved_plan_graph(config)
+        if graph is not None:
+            plan = graph.plan(force=force)
+            graph.print_plan(plan)
+            print(f"  (planned from the saved graph layout in {time.perf_counter() - start:.2f} s)")
+            return plan
+        print(f"\n   Building the pipeline graph: {reason}")
+    
+    cache = InputCache(config.cache_dir, enabled=use_cache)
+    graph = build_graph(config, cache=cache)
+    plan = graph.run(force=force, dry_run=dry_run)
+    if dry_run:
+        return plan
+    
+    print_outputs(config, graph.output('final'))
+    if cache.enabled:
+        print(f"\nCache: {cache.summary()}")
+    return plan
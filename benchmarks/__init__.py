@@ -0,0 +1,11 @@
+"""
+Pipeline Benchmarks
+===================
+Synthetic Inside Airbnb-shaped inputs (synthetic_data.py) and per-stage
+timings of the integration pipeline (run_benchmarks.py):
+
+  python -m benchmarks.run_benchmarks --rows 1000000 [--compare OLD.json]
+
+Author: Econometrics Project
+Date: 2026-10-16
+"""
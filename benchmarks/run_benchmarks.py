@@ -0,0 +1,284 @@
+"""
+Pipeline Stage Benchmarks
+=========================
+Times the integration pipeline's stages on synthetic data of a given size
+and writes the results to JSON, to compare across commits:
+
+  load_and_process_airbnb_file  every city's listings file, cold (no cache)
+  merge_all_datasets            with fuzzy name matching, as in the pipeline
+  compute_derived_variables
+  print_data_quality_report     including the JSON report
+  export_dataset                every export format
+
+For each stage the best wall time over the repeats, the peak resident set
+size of the process while it ran (the peak of an instrumentation span
+around the run, sampled by the instrumentation sampler; it includes
+memory still held from earlier stages, so the growth above the RSS at the
+start of the stage is recorded as well) and the input rows per
+second are recorded. With --compare, stages slower than
+the baseline file by more than --tolerance (and by at least
+MIN_REGRESSION_S) are reported and the exit code is 1.
+
+Usage:
+  python -m benchmarks.run_benchmarks [--rows 100000] [--seed 0] [--repeat 1]
+      [--data-dir DIR] [--output FILE] [--compare BASELINE.json] [--tolerance 0.2]
+
+Author: Econometrics Project
+Date: 2026-10-16
+"""
+
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.synthetic_data import generate_dataset
+from instrumentation import collecting, span
+
+
+# Bump when the stages or measurements change, so old results are not compared
+BENCHMARK_VERSION = 1
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Default slowdown (fraction of the baseline wall time) reported as a regression
+DEFAULT_TOLERANCE = 0.2
+
+# Slowdowns of less than this many seconds are timer noise, never regressions
+MIN_REGRESSION_S = 0.05
+
+
+def measure(func, rows, repeat=1):
+    """
+    Time a stage.
+    
+    Parameters:
+    -----------
+    func : callable
+        Runs the stage once and returns its output; its printed progress is
+        discarded
+    rows : int
+        Input rows of the stage (for rows per second)
+    repeat : int
+        Number of runs; the best wall time and the highest peak RSS are kept
+        
+    Returns:
+    --------
+    tuple
+        (stage output of the last run, result dict with wall_s, peak_rss_mb,
+        rss_growth_mb (peak above the RSS at the start of the run), rows,
+        rows_per_s)
+    """
+    wall, peak, growth = [], [], []
+    for _ in range(repeat):
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            # The run is one span, whose peak RSS the instrumentation sampler tracks
+            with collecting() as events, span('benchmark'):
+                start = time.perf_counter()
+                output = func()
+                wall.append(time.perf_counter() - start)
+        # The outer span closes last
+        run = events[-1]
+        peak.append(run['rss_peak_mb'])
+        if run['rss_start_mb'] is not None:
+            growth.append(run['rss_peak_mb'] - run['rss_start_mb'])
+    
+    best = min(wall)
+    peaks = [value for value in peak if value is not None]
+    return output, {
+        'wall_s': round(best, 6),
+        'peak_rss_mb': max(peaks) if peaks else None,
+        'rss_growth_mb': round(max(growth), 1) if growth else None,
+        'rows': rows,
+        'rows_per_s': round(rows / best, 1) if best > 0 else None,
+    }
+
+
+def _git(*args):
+    """
+    Output of a git command in the repository (None if git is unavailable).
+    """
+    try:
+        return subprocess.run(['git', *args], cwd=REPO_ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(rows=100_000, seed=0, repeat=1, data_dir=None):
+    """
+    Generate (or reuse) synthetic data and time every stage.
+    
+    Parameters:
+    -----------
+    rows : int
+        Total synthetic listings
+    seed : int
+        Random seed of the synthetic data
+    repeat : int
+        Runs per stage
+    data_dir : str, optional
+        Synthetic data directory (default: a directory per rows and seed in
+        the system temp directory, reused across runs)
+        
+    Returns:
+    --------
+    dict
+        JSON-serializable results: environment, commit and one entry per stage
+    """
+    import integrate_data
+    from fuzzy_match import NameMatcher
+    
+    data_dir = data_dir or str(Path(tempfile.gettempdir()) / 'airbnb_panel_bench' / f"rows{rows}_seed{seed}")
+    print(f"\nData: {data_dir}")
+    airbnb_files = generate_dataset(data_dir, rows=rows, seed=seed)
+    
+    stages = {}
+    
+    def record(name, func, n_rows):
+        output, result = measure(func, n_rows, repeat=repeat)
+        stages[name] = result
+        rate = f"{result['rows_per_s']:,.0f}" if result['rows_per_s'] is not None else '-'
+        peak = f"{result['peak_rss_mb']:,.1f}" if result['peak_rss_mb'] is not None else '-'
+        growth = f"+{result['rss_growth_mb']:,.1f}" if result['rss_growth_mb'] is not None else '-'
+        print(f"   {name:30s} {result['wall_s']:10.3f} {rate:>14s} {peak:>14s} {growth:>10s}")
+        return output
+    
+    print(f"\n   {'Stage':30s} {'Wall (s)':>10s} {'Rows/s':>14s} {'Peak RSS (MB)':>14s} {'Growth':>10s}")
+    
+    def load_cities():
+        return [integrate_data.load_and_process_airbnb_file(path, city) for city, path in airbnb_files.items()]
+    
+    frames = record('load_and_process_airbnb_file', load_cities, rows)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        airbnb_df = integrate_data.pd.concat(frames, ignore_index=True)
+        supplementary = integrate_data.load_supplementary_data(data_dir)
+    
+    merged = record('merge_all_datasets',
+                    lambda: integrate_data.merge_all_datasets(airbnb_df, *supplementary, matcher=NameMatcher()),
+                    len(airbnb_df))
+    derived = record('compute_derived_variables', lambda: integrate_data.compute_derived_variables(merged),
+                     len(merged))
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        final_df = integrate_data.create_final_dataset(derived)
+    
+    with tempfile.TemporaryDirectory() as output_dir:
+        record('print_data_quality_report',
+               lambda: integrate_data.print_data_quality_report(final_df, json_path=f"{output_dir}/quality.json"),
+               len(final_df))
+        record('export_dataset', lambda: integrate_data.export_dataset(final_df, f"{output_dir}/panel"),
+               len(final_df))
+    
+    return {
+        'benchmark_version': BENCHMARK_VERSION,
+        'commit': _git('rev-parse', 'HEAD'),
+        'dirty': bool(_git('status', '--porcelain', '--untracked-files=no')),
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'rows': rows,
+        'seed': seed,
+        'repeat': repeat,
+        'stages': stages,
+    }
+
+
+
+def compare_results(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compare stage wall times against a baseline run.
+    
+    Parameters:
+    -----------
+    results : dict
+        Results of run_benchmarks()
+    baseline : dict
+        Earlier results to compare against
+    tolerance : float
+        Slowdown, as a fraction of the baseline time, reported as a regression
+        
+    Returns:
+    --------
+    list of str
+        Names of the stages that regressed
+    """
+    if baseline.get('benchmark_version') != results['benchmark_version'] or baseline.get('rows') != results['rows']:
+        print(f"   WARNING: Baseline is from a different benchmark version or size "
+              f"({baseline.get('rows')} rows); times are not comparable")
+    
+    commit = (baseline.get('commit') or 'unknown')[:12]
+    print(f"\nComparison with {commit} (tolerance {tolerance:.0%}):")
+    regressions = []
+    for name, result in results['stages'].items():
+        previous = baseline.get('stages', {}).get(name)
+        if previous is None or not previous.get('wall_s'):
+            print(f"   {name:30s} no baseline")
+            continue
+        ratio = result['wall_s'] / previous['wall_s']
+        regressed = ratio > 1 + tolerance and result['wall_s'] - previous['wall_s'] >= MIN_REGRESSION_S
+        status = "REGRESSION" if regressed else "ok"
+        print(f"   {name:30s} {previous['wall_s']:10.3f} s -> {result['wall_s']:10.3f} s  ({ratio:5.2f}x)  {status}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def write_results(results, path):
+    """
+    Write benchmark results as JSON (through a temporary file).
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp{os.getpid()}")
+    with open(tmp_path, 'w') as f:
+        json.dump(results, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def main(argv=None):
+    """
+    Main execution function.
+    """
+    parser = argparse.ArgumentParser(description="Time the pipeline stages on synthetic data.")
+    parser.add_argument('--rows', type=int, default=100_000,
+                        help="Total synthetic listings, e.g. 10000 to 10000000 (default: 100000)")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed of the synthetic data (default: 0)")
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per stage; the best time is kept (default: 1)")
+    parser.add_argument('--data-dir', default=None,
+                        help="Synthetic data directory, generated if missing (default: in the temp directory)")
+    parser.add_argument('--output', default=None,
+                        help="Results file (default: benchmarks/results/<commit>-<rows>.json)")
+    parser.add_argument('--compare', default=None, help="Baseline results file to compare against")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f"Slowdown reported as a regression (default: {DEFAULT_TOLERANCE})")
+    args = parser.parse_args(argv)
+    
+    print("\n" + "="*80)
+    print(f"PIPELINE BENCHMARKS: {args.rows:,} LISTINGS")
+    print("="*80)
+    
+    results = run_benchmarks(rows=args.rows, seed=args.seed, repeat=args.repeat, data_dir=args.data_dir)
+    output = args.output or REPO_ROOT / 'benchmarks' / 'results' / f"{(results['commit'] or 'unknown')[:12]}-{args.rows}.json"
+    write_results(results, output)
+    print(f"\n+ Results: {output}")
+    
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline, tolerance=args.tolerance)
+        if regressions:
+            print(f"\n   WARNING: {len(regressions)} stage(s) slower than the baseline: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,391 @@
+"""
+Synthetic Inside Airbnb Data
+============================
+Deterministic generator of listings files shaped like the Inside Airbnb
+exports (the 79 columns of LISTING_COLUMNS, quoted free text with commas
+and newlines, "$1,234.00" prices) and of matching demographics, rent,
+housing and tourism tables, for benchmarking without the real files.
+
+Listings are spread over the five study cities in proportion to the real
+files and over each city's neighborhoods with a Zipf-like skew (a few
+neighborhoods hold most listings). Neighborhood labels carry text noise
+the pipeline has to clean up: changed case, doubled or trailing spaces,
+"St." for "Saint" and missing labels. The supplementary tables cover most
+but not all neighborhoods.
+
+Files are written in chunks of CHUNK_ROWS rows, each drawn from its own
+seeded generator, so the output depends only on (rows, seed) and memory
+use stays flat for 10M-row runs.
+
+Usage:
+  python -m benchmarks.synthetic_data OUTPUT_DIR [--rows 100000] [--seed 0]
+
+Author: Econometrics Project
+Date: 2026-10-16
+"""
+
+import argparse
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+# Bump when the generated data changes, so stored datasets are regenerated
+GENERATOR_VERSION = 1
+
+# Rows generated and written at a time
+CHUNK_ROWS = 100_000
+
+MANIFEST_NAME = 'synthetic.json'
+
+# Columns of an Inside Airbnb listings.csv export
+LISTING_COLUMNS = [
+    'id', 'listing_url', 'scrape_id', 'last_scraped', 'source', 'name', 'description',
+    'neighborhood_overview', 'picture_url', 'host_id', 'host_url', 'host_name', 'host_since',
+    'host_location', 'host_about', 'host_response_time', 'host_response_rate', 'host_acceptance_rate',
+    'host_is_superhost', 'host_thumbnail_url', 'host_picture_url', 'host_neighbourhood',
+    'host_listings_count', 'host_total_listings_count', 'host_verifications', 'host_has_profile_pic',
+    'host_identity_verified', 'neighbourhood', 'neighbourhood_cleansed', 'neighbourhood_group_cleansed',
+    'latitude', 'longitude', 'property_type', 'room_type', 'accommodates', 'bathrooms', 'bathrooms_text',
+    'bedrooms', 'beds', 'amenities', 'price', 'minimum_nights', 'maximum_nights', 'minimum_minimum_nights',
+    'maximum_minimum_nights', 'minimum_maximum_nights', 'maximum_maximum_nights', 'minimum_nights_avg_ntm',
+    'maximum_nights_avg_ntm', 'calendar_updated', 'has_availability', 'availability_30', 'availability_60',
+    'availability_90', 'availability_365', 'calendar_last_scraped', 'number_of_reviews',
+    'number_of_reviews_ltm', 'number_of_reviews_l30d', 'availability_eoy', 'number_of_reviews_ly',
+    'estimated_occupancy_l365d', 'estimated_revenue_l365d', 'first_review', 'last_review',
+    'review_scores_rating', 'review_scores_accuracy', 'review_scores_cleanliness', 'review_scores_checkin',
+    'review_scores_communication', 'review_scores_location', 'review_scores_value', 'license',
+    'instant_bookable', 'calculated_host_listings_count', 'calculated_host_listings_count_entire_homes',
+    'calculated_host_listings_count_private_rooms', 'calculated_host_listings_count_shared_rooms',
+    'reviews_per_month',
+]
+
+# City -> (listings file prefix, neighborhoods, listings in the real file,
+# label style, latitude, longitude)
+CITIES = {
+    'Austin': ('austin', 44, 28956, 'zip', 30.27, -97.74),
+    'Dallas': ('dallas', 14, 9790, 'district', 32.78, -96.80),
+    'Los Angeles': ('los-angeles', 266, 84139, 'name', 34.05, -118.24),
+    'New York City': ('new-york-city', 224, 64828, 'name', 40.71, -74.01),
+    'Broward County': ('broward-county', 34, 39074, 'name', 26.12, -80.14),
+}
+
+# Skew of listings over neighborhoods (share of rank r ~ 1 / r ** ZIPF_EXPONENT)
+ZIPF_EXPONENT = 1.1
+
+# Share of listing labels with each kind of noise
+LABEL_NOISE = {'case': 0.05, 'spaces': 0.03, 'saint': 0.5, 'missing': 0.002}
+
+# Share of neighborhoods present in each supplementary table
+SUPPLEMENTARY_COVERAGE = {'demographics': 0.97, 'rent': 0.92, 'housing': 0.95, 'tourism': 0.9}
+
+# Supplementary files, relative to the data directory (as integrate_data.SUPPLEMENTARY_FILES)
+SUPPLEMENTARY_FILES = {
+    'demographics': "Census Demographics/neighborhood_demographics_acs_2023.csv",
+    'rent': "Rent Data/neighborhood_median_rent_2024.csv",
+    'housing': "Housing Units/neighborhood_housing_units.csv",
+    'tourism': "Tourist Area Indicator/neighborhood_tourist_classification.csv",
+}
+
+_PREFIXES = ['North', 'South', 'East', 'West', 'Upper', 'Lower', 'Old', 'New', 'Lake', 'Saint', 'Mount', 'Fort']
+_PLACES = ['Hills', 'Heights', 'Park', 'Village', 'Gardens', 'Harbor', 'Point', 'Terrace', 'Valley', 'Square',
+           'Beach', 'Grove', 'Ridge', 'Springs', 'Landing', 'Crossing', 'Meadows', 'Shores', 'Mills', 'Glen']
+
+_TEXT = [
+    'Cozy studio, close to downtown',
+    'Bright 2BR with "amazing" views',
+    'Quiet room in a shared house',
+    'Spacious loft, walk to cafes, bars and parks',
+    'Charming bungalow\nwith a private garden',
+    'Modern condo near the convention center',
+    '',
+]
+_PROPERTY_TYPES = ['Entire rental unit', 'Private room in home', 'Entire home', 'Entire condo',
+                   'Private room in rental unit', 'Shared room in hostel']
+_ROOM_TYPES = ['Entire home/apt', 'Private room', 'Shared room', 'Hotel room']
+_ROOM_WEIGHTS = [0.7, 0.26, 0.02, 0.02]
+_RESPONSE_TIMES = ['within an hour', 'within a few hours', 'within a day', 'a few days or more', 'N/A']
+_DATES = pd.date_range('2012-01-01', '2024-09-01', freq='D').strftime('%Y-%m-%d').to_numpy()
+
+
+def neighborhood_names(city, n_neighborhoods):
+    """
+    Canonical neighborhood labels of a synthetic city.
+    """
+    style = CITIES[city][3]
+    if style == 'zip':
+        return [str(78701 + i) for i in range(n_neighborhoods)]
+    if style == 'district':
+        return [f"District {i + 1}" for i in range(n_neighborhoods)]
+    names = []
+    for i in range(n_neighborhoods):
+        prefix = _PREFIXES[i % len(_PREFIXES)]
+        place = _PLACES[(i // len(_PREFIXES)) % len(_PLACES)]
+        round_ = i // (len(_PREFIXES) * len(_PLACES))
+        names.append(f"{prefix} {place}" + (f" {round_ + 1}" if round_ else ""))
+    return names
+
+
+def city_rows(rows):
+    """
+    Split a total listing count over the cities in proportion to the real files.
+    """
+    sizes = np.array([spec[2] for spec in CITIES.values()], dtype=float)
+    counts = np.floor(rows * sizes / sizes.sum()).astype(int)
+    counts[np.argmax(sizes)] += rows - counts.sum()
+    return dict(zip(CITIES, counts.tolist()))
+
+
+def _noisy_labels(rng, names, codes):
+    """
+    Neighborhood labels of listings, with text noise.
+    """
+    labels = np.asarray(names, dtype=object)[codes]
+    draw = rng.random(len(codes))
+    upper = draw < LABEL_NOISE['case']
+    spaces = (draw >= LABEL_NOISE['case']) & (draw < LABEL_NOISE['case'] + LABEL_NOISE['spaces'])
+    labels[upper] = [label.upper() for label in labels[upper]]
+    labels[spaces] = [f" {label.replace(' ', '  ')} " for label in labels[spaces]]
+    saint = np.array([label.startswith('Saint ') for label in labels]) & (rng.random(len(codes)) < LABEL_NOISE['saint'])
+    labels[saint] = [label.replace('Saint ', 'St. ', 1) for label in labels[saint]]
+    labels[rng.random(len(codes)) < LABEL_NOISE['missing']] = None
+    return labels
+
+
+def _listing_chunk(rng, city, first_id, n_rows, weights, names):
+    """
+    One chunk of synthetic listings of a city.
+    """
+    _, _, _, _, lat, lon = CITIES[city]
+    codes = rng.choice(len(names), size=n_rows, p=weights)
+    ids = np.arange(first_id, first_id + n_rows)
+    host_ids = rng.zipf(1.6, n_rows) + first_id // 3
+    host_listings = rng.zipf(2.0, n_rows)
+    reviews = rng.negative_binomial(1, 0.03, n_rows)
+    reviews_per_month = np.where(reviews > 0, np.round(rng.gamma(1.2, 1.0, n_rows), 2), np.nan)
+    prices = np.round(rng.lognormal(5.0, 0.7, n_rows), 0)
+    rating = np.where(reviews > 0, np.round(rng.uniform(3.5, 5.0, n_rows), 2), np.nan)
+    availability = rng.integers(0, 366, n_rows)
+    room_type = rng.choice(_ROOM_TYPES, size=n_rows, p=_ROOM_WEIGHTS)
+    dates = _DATES[rng.integers(0, len(_DATES), n_rows)]
+    
+    def text():
+        return rng.choice(_TEXT, size=n_rows)
+    
+    id_text = pd.Series(ids).astype(str)
+    host_text = pd.Series(host_ids).astype(str)
+    price_text = '$' + pd.Series(prices).map('{:,.2f}'.format)
+    price_text[rng.random(n_rows) < 0.05] = None
+    
+    columns = {
+        'id': ids,
+        'listing_url': 'https://www.airbnb.com/rooms/' + id_text,
+        'scrape_id': 20240915000000,
+        'last_scraped': '2024-09-15',
+        'source': 'city scrape',
+        'name': text(),
+        'description': text(),
+        'neighborhood_overview': text(),
+        'picture_url': 'https://a0.muscache.com/pictures/' + id_text + '.jpg',
+        'host_id': host_ids,
+        'host_url': 'https://www.airbnb.com/users/show/' + host_text,
+        'host_name': rng.choice(['Alex', 'Maria', 'Sam', 'Jordan', 'Lee'], size=n_rows),
+        'host_since': dates,
+        'host_location': f"{city}, United States",
+        'host_about': text(),
+        'host_response_time': rng.choice(_RESPONSE_TIMES, size=n_rows),
+        'host_response_rate': pd.Series(rng.integers(50, 101, n_rows)).astype(str) + '%',
+        'host_acceptance_rate': pd.Series(rng.integers(30, 101, n_rows)).astype(str) + '%',
+        'host_is_superhost': rng.choice(['t', 'f'], size=n_rows),
+        'host_thumbnail_url': 'https://a0.muscache.com/im/users/' + host_text + '.jpg',
+        'host_picture_url': 'https://a0.muscache.com/im/users/' + host_text + '.jpg',
+        'host_neighbourhood': np.asarray(names, dtype=object)[codes],
+        'host_listings_count': host_listings,
+        'host_total_listings_count': host_listings + rng.integers(0, 3, n_rows),
+        'host_verifications': "['email', 'phone']",
+        'host_has_profile_pic': 't',
+        'host_identity_verified': rng.choice(['t', 'f'], size=n_rows),
+        'neighbourhood': f"{city}, United States",
+        'neighbourhood_cleansed': _noisy_labels(rng, names, codes),
+        'neighbourhood_group_cleansed': None,
+        'latitude': np.round(lat + rng.normal(0, 0.08, n_rows), 6),
+        'longitude': np.round(lon + rng.normal(0, 0.08, n_rows), 6),
+        'property_type': rng.choice(_PROPERTY_TYPES, size=n_rows),
+        'room_type': room_type,
+        'accommodates': rng.integers(1, 11, n_rows),
+        'bathrooms': rng.integers(1, 4, n_rows),
+        'bathrooms_text': rng.choice(['1 bath', '1.5 baths', '2 baths', '1 shared bath'], size=n_rows),
+        'bedrooms': rng.integers(1, 5, n_rows),
+        'beds': rng.integers(1, 6, n_rows),
+        'amenities': '["Wifi", "Kitchen", "Air conditioning", "Smoke alarm"]',
+        'price': price_text,
+        'minimum_nights': rng.choice([1, 2, 3, 30], size=n_rows),
+        'maximum_nights': 365,
+        'minimum_minimum_nights': 1,
+        'maximum_minimum_nights': 30,
+        'minimum_maximum_nights': 365,
+        'maximum_maximum_nights': 1125,
+        'minimum_nights_avg_ntm': 2.0,
+        'maximum_nights_avg_ntm': 1125.0,
+        'calendar_updated': None,
+        'has_availability': 't',
+        'availability_30': np.minimum(availability, 30),
+        'availability_60': np.minimum(availability, 60),
+        'availability_90': np.minimum(availability, 90),
+        'availability_365': availability,
+        'calendar_last_scraped': '2024-09-15',
+        'number_of_reviews': reviews,
+        'number_of_reviews_ltm': rng.binomial(reviews, 0.3),
+        'number_of_reviews_l30d': rng.binomial(reviews, 0.03),
+        'availability_eoy': np.minimum(availability, 107),
+        'number_of_reviews_ly': rng.binomial(reviews, 0.3),
+        'estimated_occupancy_l365d': rng.integers(0, 256, n_rows),
+        'estimated_revenue_l365d': np.round(prices * rng.integers(0, 256, n_rows), 0),
+        'first_review': np.where(reviews > 0, dates, None),
+        'last_review': np.where(reviews > 0, '2024-08-30', None),
+        'review_scores_rating': rating,
+        'review_scores_accuracy': rating,
+        'review_scores_cleanliness': rating,
+        'review_scores_checkin': rating,
+        'review_scores_communication': rating,
+        'review_scores_location': rating,
+        'review_scores_value': rating,
+        'license': rng.choice(['', 'Exempt', 'STR-2024-000123'], size=n_rows),
+        'instant_bookable': rng.choice(['t', 'f'], size=n_rows),
+        'calculated_host_listings_count': host_listings,
+        'calculated_host_listings_count_entire_homes': host_listings,
+        'calculated_host_listings_count_private_rooms': 0,
+        'calculated_host_listings_count_shared_rooms': 0,
+        'reviews_per_month': reviews_per_month,
+    }
+    return pd.DataFrame(columns, columns=LISTING_COLUMNS)
+
+
+def write_listings(path, city, n_rows, seed=0):
+    """
+    Write a synthetic listings file for one city.
+    
+    Parameters:
+    -----------
+    path : str
+        Output CSV path
+    city : str
+        City name (key of CITIES)
+    n_rows : int
+        Number of listings
+    seed : int
+        Random seed
+    """
+    n_neighborhoods = CITIES[city][1]
+    names = neighborhood_names(city, n_neighborhoods)
+    weights = 1.0 / np.arange(1, n_neighborhoods + 1) ** ZIPF_EXPONENT
+    weights /= weights.sum()
+    # Which neighborhood gets which share is itself random
+    weights = np.random.default_rng([seed, list(CITIES).index(city)]).permutation(weights)
+    
+    tmp_path = Path(path).with_name(f".{Path(path).name}.tmp{os.getpid()}")
+    for chunk_index, first_row in enumerate(range(0, max(n_rows, 1), CHUNK_ROWS)):
+        rng = np.random.default_rng([seed, list(CITIES).index(city), chunk_index])
+        chunk = _listing_chunk(rng, city, first_row + 1, min(CHUNK_ROWS, n_rows - first_row), weights, names)
+        chunk.to_csv(tmp_path, mode='w' if chunk_index == 0 else 'a', header=chunk_index == 0, index=False)
+    os.replace(tmp_path, path)
+
+
+def supplementary_tables(seed=0):
+    """
+    Demographics, rent, housing and tourism tables for the synthetic cities.
+    
+    Returns:
+    --------
+    dict
+        Source name (as SUPPLEMENTARY_FILES) -> pd.DataFrame
+    """
+    rng = np.random.default_rng([seed, len(CITIES)])
+    rows = {name: [] for name in SUPPLEMENTARY_FILES}
+    for city, (_, n_neighborhoods, _, _, _, _) in CITIES.items():
+        for name in neighborhood_names(city, n_neighborhoods):
+            income = int(rng.lognormal(11.1, 0.4))
+            housing = int(rng.integers(500, 30000))
+            present = {source: rng.random() < share for source, share in SUPPLEMENTARY_COVERAGE.items()}
+            if present['demographics']:
+                rows['demographics'].append((city, name, income, int(rng.integers(1000, 60000)),
+                                             round(float(rng.uniform(10, 80)), 1), housing))
+            if present['rent']:
+                rent = int(np.exp(5.3 + 0.2 * np.log(income) + rng.normal(0, 0.1)))
+                rows['rent'].append((city, name, rent, 'Zillow ZORI', 2024))
+            if present['housing']:
+                rows['housing'].append((city, name, housing, 'ACS 2023'))
+            if present['tourism']:
+                rows['tourism'].append((city, name, int(rng.random() < 0.2), 'manual', ''))
+    
+    columns = {
+        'demographics': ['city', 'neighborhood', 'median_household_income', 'population_density', 'pct_college',
+                         'housing_units'],
+        'rent': ['city', 'neighborhood', 'median_rent', 'source', 'year'],
+        'housing': ['city', 'neighborhood', 'housing_units', 'source'],
+        'tourism': ['city', 'neighborhood', 'tourist_area', 'source', 'notes'],
+    }
+    return {name: pd.DataFrame(rows[name], columns=columns[name]) for name in SUPPLEMENTARY_FILES}
+
+
+def generate_dataset(data_dir, rows=100_000, seed=0):
+    """
+    Write a synthetic data directory, unless an identical one exists.
+    
+    Parameters:
+    -----------
+    data_dir : str
+        Output directory (laid out like data/)
+    rows : int
+        Total listings over the five cities
+    seed : int
+        Random seed
+        
+    Returns:
+    --------
+    dict
+        City name -> listings file path
+    """
+    data_dir = Path(data_dir)
+    airbnb_files = {city: str(data_dir / "Airbnb Listings Data" / f"{spec[0]}_listings.csv")
+                    for city, spec in CITIES.items()}
+    manifest = {'version': GENERATOR_VERSION, 'rows': rows, 'seed': seed}
+    manifest_path = data_dir / MANIFEST_NAME
+    if manifest_path.exists() and all(os.path.exists(path) for path in airbnb_files.values()):
+        with open(manifest_path) as f:
+            if json.load(f) == manifest:
+                return airbnb_files
+    
+    (data_dir / "Airbnb Listings Data").mkdir(parents=True, exist_ok=True)
+    for city, n_rows in city_rows(rows).items():
+        print(f"   + {city}: {n_rows:,} listings")
+        write_listings(airbnb_files[city], city, n_rows, seed=seed)
+    for name, table in supplementary_tables(seed).items():
+        path = data_dir / SUPPLEMENTARY_FILES[name]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        table.to_csv(path, index=False)
+    
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f)
+    return airbnb_files
+
+
+def main(argv=None):
+    """
+    Main execution function.
+    """
+    parser = argparse.ArgumentParser(description="Write synthetic Inside Airbnb-shaped input files.")
+    parser.add_argument('output_dir', help="Data directory to write")
+    parser.add_argument('--rows', type=int, default=100_000, help="Total listings (default: 100000)")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed (default: 0)")
+    args = parser.parse_args(argv)
+    
+    print(f"\nGenerating {args.rows:,} synthetic listings in {args.output_dir}")
+    generate_dataset(args.output_dir, rows=args.rows, seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
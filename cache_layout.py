@@ -0,0 +1,64 @@
+"""
+Cache Locations and File Fingerprints
+=====================================
+Default cache directories and the file hashes every cache is validated
+against (input cache, stage outputs, panel store, spatial index and
+crosswalks).
+
+This module only uses the standard library, so `--help` and dry runs can
+locate and check the caches without importing pyarrow or pandas.
+
+Author: Econometrics Project
+Date: 2026-10-16
+"""
+
+import hashlib
+import os
+
+
+# Default input cache location, relative to the data directory
+DEFAULT_CACHE_SUBDIR = '.cache/inputs'
+
+# Default location of stored stage outputs, relative to the data directory
+DEFAULT_STAGE_SUBDIR = '.cache/stages'
+
+
+def file_sha256(path, block_size=1 << 20):
+    """
+    Compute the SHA-256 hash of a file's contents.
+    
+    Parameters:
+    -----------
+    path : str
+        File to hash
+    block_size : int
+        Bytes read per block
+        
+    Returns:
+    --------
+    str
+        Hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_fingerprint(path):
+    """
+    Return the cheap (size, mtime) part of a file's fingerprint.
+    
+    Parameters:
+    -----------
+    path : str
+        File to stat
+        
+    Returns:
+    --------
+    dict
+        {'size': int, 'mtime_ns': int}
+    """
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
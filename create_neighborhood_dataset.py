@@ -7,135 +7,39 @@ with demographic, rent, and tourism data.
 IMPORTANT: This script maintains neighborhood-level granularity.
 Each row = one neighborhood in one city.
 
+Listings ingestion, the final column selection and the export are shared
+with integrate_data.py; cities, data files and the output base come from a
+run configuration (see airbnb_panel/config.py).
+
 Author: Generated for Polymarket Research
 Date: 2025-11-14
 """
 
+import argparse
 import pandas as pd
 import numpy as np
 import warnings
 from pathlib import Path
 
-warnings.filterwarnings('ignore')
-
-
-def standardize_text(text):
-    """
-    Standardize text: lowercase, strip whitespace, collapse multiple spaces.
-    
-    Parameters:
-    -----------
-    text : str
-        Input text to standardize
-        
-    Returns:
-    --------
-    str
-        Standardized text
-    """
-    if pd.isna(text):
-        return text
-    text = str(text).lower().strip()
-    # Collapse multiple spaces into single space
-    while '  ' in text:
-        text = text.replace('  ', ' ')
-    return text
-
-
-def load_and_process_airbnb_file(file_path, city_name):
-    """
-    Load a single Airbnb listings file and count listings per neighborhood.
-    
-    Parameters:
-    -----------
-    file_path : str
-        Path to Airbnb CSV file
-    city_name : str
-        Name of the city
-        
-    Returns:
-    --------
-    pd.DataFrame
-        DataFrame with columns: city, neighborhood, airbnb_count
-    """
-    print(f"\nProcessing: {city_name}")
-    print(f"   File: {Path(file_path).name}")
-    
-    # Load data
-    df = pd.read_csv(file_path, low_memory=False)
-    print(f"   + Loaded {len(df):,} listings")
-    
-    # Detect neighborhood column
-    if 'neighbourhood_cleansed' in df.columns:
-        neighborhood_col = 'neighbourhood_cleansed'
-    elif 'neighbourhood' in df.columns:
-        neighborhood_col = 'neighbourhood'
-    else:
-        raise ValueError(f"No neighborhood column found in {file_path}")
-    
-    print(f"   + Using column: {neighborhood_col}")
-    
-    # Extract neighborhood and standardize
-    df_clean = df[[neighborhood_col]].copy()
-    df_clean.columns = ['neighborhood']
-    df_clean['neighborhood'] = df_clean['neighborhood'].apply(standardize_text)
-    
-    # Remove missing neighborhoods
-    df_clean = df_clean.dropna(subset=['neighborhood'])
-    
-    # Count listings per neighborhood
-    neighborhood_counts = df_clean.groupby('neighborhood').size().reset_index(name='airbnb_count')
-    
-    # Add city column
-    neighborhood_counts['city'] = standardize_text(city_name)
-    
-    # Reorder columns
-    neighborhood_counts = neighborhood_counts[['city', 'neighborhood', 'airbnb_count']]
-    
-    print(f"   + Found {len(neighborhood_counts)} unique neighborhoods")
-    print(f"   + Total listings: {neighborhood_counts['airbnb_count'].sum():,}")
-    
-    return neighborhood_counts
+from airbnb_panel.config import DEFAULT_CONFIG, load_config
+from integrate_data import SUPPLEMENTARY_FILES, create_final_dataset, export_dataset, load_all_airbnb_data
+from text_keys import normalize_keys
+from duplicate_resolution import resolve_duplicates
+from keyed_merge import keyed_left_join, count_matched
+from derived_variables import DERIVED_VARIABLES, derive_variables
 
+warnings.filterwarnings('ignore')
 
-def load_all_airbnb_data(airbnb_files):
-    """
-    Load and process all Airbnb listing files.
-    
-    Parameters:
-    -----------
-    airbnb_files : dict
-        Dictionary mapping city names to file paths
-        
-    Returns:
-    --------
-    pd.DataFrame
-        Combined neighborhood-level Airbnb data
-    """
-    print("\n" + "="*80)
-    print("STEP 1: LOADING AIRBNB DATA (NEIGHBORHOOD LEVEL)")
-    print("="*80)
-    
-    all_neighborhoods = []
-    
-    for city_name, file_path in airbnb_files.items():
-        df = load_and_process_airbnb_file(file_path, city_name)
-        all_neighborhoods.append(df)
-    
-    # Combine all neighborhoods
-    airbnb_neighborhoods = pd.concat(all_neighborhoods, ignore_index=True)
-    
-    print("\n" + "-"*80)
-    print("AIRBNB DATA SUMMARY:")
-    print("-"*80)
-    print(f"Total neighborhoods: {len(airbnb_neighborhoods)}")
-    print(f"Total listings: {airbnb_neighborhoods['airbnb_count'].sum():,}")
-    print(f"\nNeighborhoods by city:")
-    city_counts = airbnb_neighborhoods.groupby('city').size()
-    for city, count in city_counts.items():
-        print(f"  {city:20s}: {count:3d} neighborhoods")
-    
-    return airbnb_neighborhoods
+# How duplicate neighborhoods are resolved per column (README: median for
+# numeric variables, max for binary indicators)
+DUPLICATE_RULES = {
+    'median_household_income': 'median',
+    'population_density': 'median',
+    'pct_college': 'median',
+    'housing_units': 'median',
+    'median_rent': 'median',
+    'tourist_area': 'max',
+}
 
 
 def load_demographics_data(file_path):
@@ -161,8 +65,8 @@ def load_demographics_data(file_path):
     print(f"   + Loaded {len(df)} neighborhoods")
     
     # Standardize keys
-    df['city'] = df['city'].apply(standardize_text)
-    df['neighborhood'] = df['neighborhood'].apply(standardize_text)
+    df['city'] = normalize_keys(df['city'])
+    df['neighborhood'] = normalize_keys(df['neighborhood'])
     
     # Keep only needed columns
     columns_to_keep = [
@@ -178,8 +82,9 @@ def load_demographics_data(file_path):
     # Check for duplicates
     duplicates = df_clean.duplicated(subset=['city', 'neighborhood']).sum()
     if duplicates > 0:
-        print(f"   WARNING:  Found {duplicates} duplicate neighborhoods - taking median")
-        df_clean = df_clean.groupby(['city', 'neighborhood']).median().reset_index()
+        print(f"   WARNING:  Found {duplicates} duplicate neighborhoods - resolving")
+        spec = {col: DUPLICATE_RULES[col] for col in df_clean.columns if col in DUPLICATE_RULES}
+        df_clean, _ = resolve_duplicates(df_clean, spec, label='Demographics')
     
     print(f"   + Final: {len(df_clean)} unique neighborhoods")
     
@@ -209,8 +114,8 @@ def load_rent_data(file_path):
     print(f"   + Loaded {len(df)} neighborhoods")
     
     # Standardize keys
-    df['city'] = df['city'].apply(standardize_text)
-    df['neighborhood'] = df['neighborhood'].apply(standardize_text)
+    df['city'] = normalize_keys(df['city'])
+    df['neighborhood'] = normalize_keys(df['neighborhood'])
     
     # Keep only needed columns
     df_clean = df[['city', 'neighborhood', 'median_rent']].copy()
@@ -218,8 +123,9 @@ def load_rent_data(file_path):
     # Check for duplicates
     duplicates = df_clean.duplicated(subset=['city', 'neighborhood']).sum()
     if duplicates > 0:
-        print(f"   WARNING:  Found {duplicates} duplicate neighborhoods - taking median")
-        df_clean = df_clean.groupby(['city', 'neighborhood']).median().reset_index()
+        print(f"   WARNING:  Found {duplicates} duplicate neighborhoods - resolving")
+        spec = {col: DUPLICATE_RULES[col] for col in df_clean.columns if col in DUPLICATE_RULES}
+        df_clean, _ = resolve_duplicates(df_clean, spec, label='Rent')
     
     print(f"   + Final: {len(df_clean)} unique neighborhoods")
     
@@ -249,8 +155,8 @@ def load_tourism_data(file_path):
     print(f"   + Loaded {len(df)} neighborhoods")
     
     # Standardize keys
-    df['city'] = df['city'].apply(standardize_text)
-    df['neighborhood'] = df['neighborhood'].apply(standardize_text)
+    df['city'] = normalize_keys(df['city'])
+    df['neighborhood'] = normalize_keys(df['neighborhood'])
     
     # Keep only needed columns
     df_clean = df[['city', 'neighborhood', 'tourist_area']].copy()
@@ -258,8 +164,9 @@ def load_tourism_data(file_path):
     # Check for duplicates
     duplicates = df_clean.duplicated(subset=['city', 'neighborhood']).sum()
     if duplicates > 0:
-        print(f"   WARNING:  Found {duplicates} duplicate neighborhoods - taking median")
-        df_clean = df_clean.groupby(['city', 'neighborhood']).median().reset_index()
+        print(f"   WARNING:  Found {duplicates} duplicate neighborhoods - resolving")
+        spec = {col: DUPLICATE_RULES[col] for col in df_clean.columns if col in DUPLICATE_RULES}
+        df_clean, _ = resolve_duplicates(df_clean, spec, label='Tourism')
     
     print(f"   + Final: {len(df_clean)} unique neighborhoods")
     
@@ -270,6 +177,10 @@ def merge_all_datasets(airbnb_df, demographics_df, rent_df, tourism_df):
     """
     Merge all datasets at neighborhood level.
     
+    All sources are aligned on integer-encoded keys in a single multi-way
+    left join (see keyed_merge), which gives the same rows and columns as
+    merging them one after another.
+    
     Parameters:
     -----------
     airbnb_df : pd.DataFrame
@@ -290,40 +201,22 @@ def merge_all_datasets(airbnb_df, demographics_df, rent_df, tourism_df):
     print("STEP 5: MERGING ALL DATASETS (NEIGHBORHOOD LEVEL)")
     print("="*80)
     
-    # Start with Airbnb data
-    merged = airbnb_df.copy()
-    print(f"\n+ Starting with Airbnb data: {len(merged)} neighborhoods")
-    
-    # Merge demographics
-    print(f"\nMerging: Merging demographics...")
-    before = len(merged)
-    merged = merged.merge(
-        demographics_df, 
-        on=['city', 'neighborhood'], 
-        how='left'
-    )
-    matched = merged['median_household_income'].notna().sum()
-    print(f"   + Matched: {matched}/{len(merged)} neighborhoods")
-    
-    # Merge rent
-    print(f"\nMerging: Merging rent data...")
-    merged = merged.merge(
-        rent_df, 
-        on=['city', 'neighborhood'], 
-        how='left'
-    )
-    matched = merged['median_rent'].notna().sum()
-    print(f"   + Matched: {matched}/{len(merged)} neighborhoods")
-    
-    # Merge tourism
-    print(f"\nMerging: Merging tourism data...")
-    merged = merged.merge(
-        tourism_df, 
-        on=['city', 'neighborhood'], 
-        how='left'
-    )
-    matched = merged['tourist_area'].notna().sum()
-    print(f"   + Matched: {matched}/{len(merged)} neighborhoods")
+    print(f"\n+ Starting with Airbnb data: {len(airbnb_df)} neighborhoods")
+    
+    # (log label, frame, matched column)
+    steps = [
+        ('demographics', demographics_df, 'median_household_income'),
+        ('rent data', rent_df, 'median_rent'),
+        ('tourism data', tourism_df, 'tourist_area'),
+    ]
+    
+    # Align every source on shared integer keys in one pass
+    merged, step_rows = keyed_left_join(airbnb_df, [(frame, ('_x', '_y')) for _, frame, _ in steps])
+    
+    for i, (label, _, matched_col) in enumerate(steps):
+        print(f"\nMerging: Merging {label}...")
+        matched, total = count_matched(step_rows, i, merged[matched_col].notna())
+        print(f"   + Matched: {matched}/{total} neighborhoods")
     
     print(f"\n+ Final merged dataset: {len(merged)} neighborhoods")
     
@@ -332,7 +225,7 @@ def merge_all_datasets(airbnb_df, demographics_df, rent_df, tourism_df):
 
 def compute_derived_variables(df):
     """
-    Compute derived analysis variables.
+    Compute derived analysis variables (see DERIVED_VARIABLES).
     
     Parameters:
     -----------
@@ -348,77 +241,15 @@ def compute_derived_variables(df):
     print("STEP 6: COMPUTING DERIVED VARIABLES")
     print("="*80)
     
-    df = df.copy()
-    
-    # Compute airbnb_density
-    print("\nComputing: airbnb_density = airbnb_count / housing_units")
-    df['airbnb_density'] = df['airbnb_count'] / df['housing_units']
-    valid = df['airbnb_density'].notna().sum()
-    print(f"   + Valid values: {valid}/{len(df)}")
-    
-    # Compute log_rent
-    print("\nComputing: log_rent = log(median_rent)")
-    df['log_rent'] = np.log(df['median_rent'].replace(0, np.nan))
-    valid = df['log_rent'].notna().sum()
-    print(f"   + Valid values: {valid}/{len(df)}")
-    
-    # Compute log_income
-    print("\nComputing: log_income = log(median_household_income)")
-    df['log_income'] = np.log(df['median_household_income'].replace(0, np.nan))
-    valid = df['log_income'].notna().sum()
-    print(f"   + Valid values: {valid}/{len(df)}")
-    
-    # Compute log_airbnb_density
-    print("\nComputing: log_airbnb_density = log(airbnb_density)")
-    df['log_airbnb_density'] = np.log(df['airbnb_density'].replace(0, np.nan))
-    valid = df['log_airbnb_density'].notna().sum()
-    print(f"   + Valid values: {valid}/{len(df)}")
+    df, valid = derive_variables(df, DERIVED_VARIABLES)
+    expressions = {variable['name']: variable['expr'] for variable in DERIVED_VARIABLES}
+    for name, count in valid.items():
+        print(f"\nComputing: {name} = {expressions[name]}")
+        print(f"   + Valid values: {count}/{len(df)}")
     
     return df
 
 
-def create_final_dataset(df):
-    """
-    Select final columns and prepare for export.
-    
-    Parameters:
-    -----------
-    df : pd.DataFrame
-        Dataset with all variables
-        
-    Returns:
-    --------
-    pd.DataFrame
-        Final dataset with selected columns
-    """
-    print("\n" + "="*80)
-    print("STEP 7: CREATING FINAL DATASET")
-    print("="*80)
-    
-    # Define final column order
-    final_columns = [
-        'city',
-        'neighborhood',
-        'median_rent',
-        'airbnb_count',
-        'housing_units',
-        'airbnb_density',
-        'median_household_income',
-        'population_density',
-        'pct_college',
-        'tourist_area',
-        'log_rent',
-        'log_income',
-        'log_airbnb_density'
-    ]
-    
-    df_final = df[final_columns].copy()
-    
-    print(f"\n+ Final dataset shape: {len(df_final)} neighborhoods × {len(df_final.columns)} variables")
-    
-    return df_final
-
-
 def print_data_quality_report(df):
     """
     Print comprehensive data quality report.
@@ -477,48 +308,43 @@ def print_data_quality_report(df):
     print(df[sample_cols].head(10).to_string(index=False))
 
 
-def export_dataset(df, output_base_path):
+def parse_args(argv=None):
     """
-    Export dataset to Stata and CSV formats.
+    Parse command-line options.
     
     Parameters:
     -----------
-    df : pd.DataFrame
-        Final dataset
-    output_base_path : str
-        Base path for output files (without extension)
+    argv : list, optional
+        Argument list (defaults to sys.argv[1:])
+        
+    Returns:
+    --------
+    argparse.Namespace
+        Parsed options
     """
-    print("\n" + "="*80)
-    print("STEP 8: EXPORTING DATASET")
-    print("="*80)
-    
-    # Export to Stata
-    stata_path = f"{output_base_path}.dta"
-    print(f"\nExporting: Exporting to Stata format...")
-    print(f"   File: {stata_path}")
-    df.to_stata(stata_path, write_index=False, version=118)
-    print(f"   + Stata file created!")
-    
-    # Export to CSV
-    csv_path = f"{output_base_path}.csv"
-    print(f"\nExporting: Exporting to CSV format...")
-    print(f"   File: {csv_path}")
-    df.to_csv(csv_path, index=False)
-    print(f"   + CSV file created!")
-    
-    # Print file sizes
-    import os
-    stata_size = os.path.getsize(stata_path) / 1024
-    csv_size = os.path.getsize(csv_path) / 1024
-    print(f"\nFiles: File sizes:")
-    print(f"   Stata: {stata_size:.1f} KB")
-    print(f"   CSV:   {csv_size:.1f} KB")
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        'config',
+        nargs='?',
+        default=DEFAULT_CONFIG,
+        help="JSON run configuration (default: configs/five_cities.json)"
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help="Worker processes for Airbnb ingestion "
+             "(default: one per city, capped at the CPU count; 1 = serial)"
+    )
+    return parser.parse_args(argv)
 
 
-def main():
+def main(argv=None):
     """
     Main execution function.
     """
+    args = parse_args(argv)
+    
     print("\n" + "="*80)
     print("NEIGHBORHOOD-LEVEL AIRBNB DATASET CREATION")
     print("="*80)
@@ -526,29 +352,19 @@ def main():
     print("Each row = one neighborhood in one city.")
     print("Expected output: 300-500+ neighborhoods")
     
-    # Define file paths
-    base_path = "/Users/samsonbui/Documents/PolymarketResearch/data"
-    
-    # Airbnb files
-    airbnb_files = {
-        'Austin': f"{base_path}/Airbnb Listings Data/austin_listings.csv",
-        'Dallas': f"{base_path}/Airbnb Listings Data/dallas_listings.csv",
-        'Los Angeles': f"{base_path}/Airbnb Listings Data/los-angeles_listings.csv",
-        'New York City': f"{base_path}/Airbnb Listings Data/new-york-city_listings.csv",
-        'Broward County': f"{base_path}/Airbnb Listings Data/broward-county_listings.csv",
-    }
-    
-    # Other data files
-    demographics_path = f"{base_path}/Census Demographics/neighborhood_demographics_acs_2023.csv"
-    rent_path = f"{base_path}/Rent Data/neighborhood_median_rent_2024.csv"
-    tourism_path = f"{base_path}/Tourist Area Indicator/neighborhood_tourist_classification.csv"
-    
-    # Output path
-    output_base = f"{base_path}/airbnb_neighborhood_panel"
+    # Cities, data files and output base from the run configuration
+    config = load_config(args.config)
+    sources = config.sources or {name: config.resolve(path) for name, path in SUPPLEMENTARY_FILES.items()}
+    airbnb_files = config.cities
+    demographics_path = sources['demographics']
+    rent_path = sources['rent']
+    tourism_path = sources['tourism']
+    output_base = config.output
+    max_workers = args.workers if args.workers is not None else config.workers
     
     try:
         # Step 1: Load Airbnb data
-        airbnb_df = load_all_airbnb_data(airbnb_files)
+        airbnb_df = load_all_airbnb_data(airbnb_files, max_workers=max_workers, features=[])
         
         # Step 2: Load demographics
         demographics_df = load_demographics_data(demographics_path)
@@ -572,7 +388,7 @@ def main():
         print_data_quality_report(final_df)
         
         # Step 8: Export
-        export_dataset(final_df, output_base)
+        export_dataset(final_df, output_base, formats=['dta', 'csv'])
         
         # Success message
         print("\n" + "="*80)
@@ -0,0 +1,275 @@
+"""
+Geographic Crosswalks
+=====================
+Remaps supplementary data collected for one geography (ZIP codes, council
+districts, alternate neighborhood names) onto the neighborhoods used by the
+Airbnb data, so a new city can be onboarded by writing a crosswalk file
+instead of re-collecting its demographics.
+
+A crosswalk directory holds any number of CSV files with the columns:
+
+    city, source_key, neighborhood[, weight][, kind]
+
+Each row says that `weight` of geography `source_key` falls in
+`neighborhood` (weight defaults to 1; `kind` - e.g. zip, district, alias -
+is informational). One source key may map to several neighborhoods and
+several keys to one neighborhood. Remapped values are aggregated per
+neighborhood with REMAP_RULES: counts are weighted sums, rates and medians
+are weighted means and binary indicators take the max.
+
+The parsed tables are cached as compact integer arrays (.npz), keyed by the
+content of the crosswalk files.
+
+Author: Econometrics Project
+Date: 2026-10-16
+"""
+
+import hashlib
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from cache_layout import file_sha256
+from keyed_merge import KeyIndex
+from text_keys import normalize_keys
+
+
+# How remapped values are combined per target neighborhood; other numeric
+# columns use 'mean' and non-numeric columns keep the highest-weight value
+REMAP_RULES = {
+    'housing_units': 'sum',
+    'tourist_area': 'max',
+}
+
+# Bump when the cached array layout changes
+CROSSWALK_FORMAT_VERSION = 1
+
+CROSSWALK_COLUMNS = ['city', 'source_key', 'neighborhood']
+
+
+def crosswalk_files(directory):
+    """
+    List the crosswalk CSV files in a directory (empty if it does not exist).
+    """
+    directory = Path(directory)
+    return sorted(directory.glob('*.csv')) if directory.is_dir() else []
+
+
+class Crosswalk:
+    """
+    Many-to-many mapping of (city, source key) to (city, neighborhood).
+    
+    Parameters:
+    -----------
+    cities : np.ndarray
+        Distinct city labels
+    names : np.ndarray
+        Distinct source keys and neighborhood labels
+    city : np.ndarray
+        City code of each mapping row
+    source : np.ndarray
+        Name code of each row's source key
+    target : np.ndarray
+        Name code of each row's neighborhood
+    weight : np.ndarray
+        Weight of each row
+    """
+    
+    def __init__(self, cities, names, city, source, target, weight):
+        self.cities = cities
+        self.names = names
+        self.city = city
+        self.source = source
+        self.target = target
+        self.weight = weight
+        self._city_index = pd.Index(cities)
+        self._name_index = pd.Index(names)
+        self._index = KeyIndex(city.astype(np.int64) * len(names) + source)
+    
+    def __len__(self):
+        return len(self.city)
+    
+    @classmethod
+    def from_frame(cls, table):
+        """
+        Build a crosswalk from a table with CROSSWALK_COLUMNS (+ weight).
+        """
+        missing = [col for col in CROSSWALK_COLUMNS if col not in table.columns]
+        if missing:
+            raise ValueError(f"Crosswalk table is missing column(s): {', '.join(missing)}")
+        
+        table = table.dropna(subset=CROSSWALK_COLUMNS)
+        weight = pd.to_numeric(table['weight'], errors='coerce') if 'weight' in table.columns else None
+        weight = np.ones(len(table)) if weight is None else weight.fillna(1.0).to_numpy(dtype=float)
+        
+        city_codes, cities = pd.factorize(normalize_keys(table['city']))
+        name_codes, names = pd.factorize(pd.concat([
+            normalize_keys(table['source_key']),
+            normalize_keys(table['neighborhood'])
+        ], ignore_index=True))
+        
+        return cls(
+            np.asarray(cities, dtype=str),
+            np.asarray(names, dtype=str),
+            city_codes.astype(np.int32),
+            name_codes[:len(table)].astype(np.int32),
+            name_codes[len(table):].astype(np.int32),
+            weight
+        )
+    
+    def save(self, path):
+        """
+        Store the lookup arrays as an uncompressed .npz file.
+        
+        Written under a per-process temp name and renamed into place, so
+        concurrent runs sharing the cache never clobber each other's file.
+        """
+        tmp_path = Path(f"{path}.tmp{os.getpid()}.npz")
+        np.savez(tmp_path, version=CROSSWALK_FORMAT_VERSION, cities=self.cities, names=self.names,
+                 city=self.city, source=self.source, target=self.target, weight=self.weight)
+        tmp_path.replace(path)
+    
+    @classmethod
+    def load(cls, path):
+        """
+        Load lookup arrays stored by save() (None if the layout is outdated).
+        """
+        with np.load(path, allow_pickle=False) as arrays:
+            if int(arrays['version']) != CROSSWALK_FORMAT_VERSION:
+                return None
+            return cls(*(arrays[name] for name in ['cities', 'names', 'city', 'source', 'target', 'weight']))
+    
+    def remap(self, df, label=None):
+        """
+        Move a source's rows onto crosswalk neighborhoods.
+        
+        Rows whose (city, neighborhood) is not a crosswalk source key are
+        kept as they are, and so are neighborhoods the source already has
+        its own row for; remapped values only add neighborhoods the source
+        lacked.
+        
+        Parameters:
+        -----------
+        df : pd.DataFrame
+            Source frame with standardized city and neighborhood columns
+        label : str, optional
+            Name used when printing the remap summary
+            
+        Returns:
+        --------
+        pd.DataFrame
+            Frame with the same columns, one row per remapped neighborhood
+            plus the untouched rows
+        """
+        city_codes = self._city_index.get_indexer(df['city'])
+        name_codes = self._name_index.get_indexer(df['neighborhood'])
+        known = (city_codes >= 0) & (name_codes >= 0)
+        codes = np.where(known, city_codes.astype(np.int64) * len(self.names) + name_codes, -1)
+        
+        left, pos = self._index.expand(codes)
+        mapped = pos >= 0
+        left, pos = left[mapped], pos[mapped]
+        if len(pos) == 0:
+            return df
+        
+        mapped_rows = np.unique(left)
+        untouched = df.iloc[np.setdiff1d(np.arange(len(df)), mapped_rows)]
+        
+        # Targets the source already has its own row for are left alone
+        target_codes = self.city[pos].astype(np.int64) * len(self.names) + self.target[pos]
+        existing = codes[known & ~np.isin(np.arange(len(df)), mapped_rows)]
+        keep = ~np.isin(target_codes, existing)
+        left, pos, target_codes = left[keep], pos[keep], target_codes[keep]
+        
+        # Group remapped rows by target neighborhood
+        groups, group_targets = pd.factorize(target_codes)
+        weights = self.weight[pos]
+        
+        remapped = pd.DataFrame({
+            'city': self.cities[group_targets // len(self.names)].astype(object),
+            'neighborhood': self.names[group_targets % len(self.names)].astype(object),
+        })
+        source_rows = df.iloc[left]
+        for col in df.columns:
+            if col in ('city', 'neighborhood'):
+                continue
+            remapped[col] = _aggregate(source_rows[col], groups, len(group_targets), weights,
+                                       REMAP_RULES.get(col))
+        
+        result = pd.concat([untouched, remapped[df.columns]], ignore_index=True)
+        
+        if label is not None:
+            print(f"   + Crosswalk: remapped {len(mapped_rows)} {label} rows onto {len(remapped)} neighborhoods")
+        
+        return result
+
+
+def _aggregate(values, groups, n_groups, weights, rule):
+    """
+    Combine remapped values per target group with weights.
+    """
+    if n_groups == 0:
+        return values.to_numpy()[:0]
+    if not pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+        # Keep the value from the highest-weight contributing row
+        order = np.lexsort((-weights, groups))
+        first = order[np.r_[True, groups[order][1:] != groups[order][:-1]]]
+        return values.to_numpy()[first]
+    
+    x = values.to_numpy(dtype=float)
+    present = ~np.isnan(x)
+    if rule == 'max':
+        return pd.Series(x).groupby(groups).max().reindex(range(n_groups)).to_numpy()
+    
+    weighted = np.bincount(groups[present], weights=(weights * x)[present], minlength=n_groups)
+    n_present = np.bincount(groups[present], minlength=n_groups)
+    if rule == 'sum':
+        return np.where(n_present > 0, weighted, np.nan)
+    
+    total_weight = np.bincount(groups[present], weights=weights[present], minlength=n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(total_weight > 0, weighted / total_weight, np.nan)
+
+
+def load_crosswalks(directory, cache_dir=None):
+    """
+    Load every crosswalk file in a directory, using the array cache.
+    
+    Parameters:
+    -----------
+    directory : str
+        Crosswalk directory
+    cache_dir : str, optional
+        Where parsed lookup arrays are cached (no caching if None)
+        
+    Returns:
+    --------
+    Crosswalk or None
+        None if the directory has no crosswalk files
+    """
+    files = crosswalk_files(directory)
+    if not files:
+        return None
+    
+    digest = hashlib.sha256()
+    for path in files:
+        digest.update(f"{path.name}:{file_sha256(path)}\n".encode())
+    cache_path = Path(cache_dir) / f"crosswalk-{digest.hexdigest()[:16]}.npz" if cache_dir else None
+    
+    if cache_path is not None and cache_path.exists():
+        crosswalk = Crosswalk.load(cache_path)
+        if crosswalk is not None:
+            print(f"   + Crosswalk: {len(crosswalk)} mappings from {len(files)} file(s) (cached)")
+            return crosswalk
+    
+    table = pd.concat([pd.read_csv(path) for path in files], ignore_index=True)
+    crosswalk = Crosswalk.from_frame(table)
+    print(f"   + Crosswalk: {len(crosswalk)} mappings from {len(files)} file(s)")
+    
+    if cache_path is not None:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        crosswalk.save(cache_path)
+    
+    return crosswalk
@@ -0,0 +1,198 @@
+"""
+Registry of Derived Analysis Variables
+======================================
+Derived variables (densities, logs, squares, interactions, per-capita
+measures) are declared once in DERIVED_VARIABLES as an expression over
+other columns plus a domain guard, and evaluated by derive_variables().
+
+Expressions and guards are small arithmetic expressions (+ - * / **,
+comparisons, & | ~ and the functions in FUNCTIONS) over column names. They
+are compiled once and evaluated directly on the columns' NumPy arrays, in
+dependency order, so a variable may use variables declared before or after
+it. Where the guard is false or any input is missing the result is NaN.
+The results are added to a shallow copy of the frame, so input columns are
+never copied, and their valid counts are taken in one pass at the end.
+
+Author: Econometrics Project
+Date: 2026-10-16
+"""
+
+import ast
+
+import numpy as np
+
+
+# Derived variable spec: 'name', 'expr' (value), 'where' (domain guard,
+# optional) and 'label'. Dependencies are the column names the expression
+# and guard use. New variables are one entry, e.g.
+#   {'name': 'airbnb_density_sq', 'expr': 'airbnb_density ** 2', 'label': ...}
+DERIVED_VARIABLES = [
+    {'name': 'airbnb_density', 'expr': 'airbnb_count / housing_units', 'where': 'housing_units > 0',
+     'label': 'Airbnb listings per housing unit'},
+    {'name': 'log_rent', 'expr': 'log(median_rent)', 'where': 'median_rent > 0',
+     'label': 'Log median rent'},
+    {'name': 'log_income', 'expr': 'log(median_household_income)', 'where': 'median_household_income > 0',
+     'label': 'Log median household income'},
+    {'name': 'log_airbnb_density', 'expr': 'log(airbnb_density)', 'where': 'airbnb_density > 0',
+     'label': 'Log Airbnb density'},
+]
+
+# Functions available in expressions
+FUNCTIONS = {
+    'log': np.log,
+    'log1p': np.log1p,
+    'exp': np.exp,
+    'sqrt': np.sqrt,
+    'abs': np.abs,
+}
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Compare, ast.Call, ast.Name, ast.Load, ast.Constant,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow, ast.USub, ast.UAdd, ast.Invert, ast.BitAnd, ast.BitOr,
+    ast.Gt, ast.GtE, ast.Lt, ast.LtE, ast.Eq, ast.NotEq,
+)
+
+
+def compile_expression(text):
+    """
+    Compile an expression and list the column names it uses.
+    
+    Parameters:
+    -----------
+    text : str
+        Expression, e.g. 'log(airbnb_count / housing_units)'
+        
+    Returns:
+    --------
+    tuple
+        (code object, list of column names in order of first use)
+    """
+    tree = ast.parse(text, mode='eval')
+    columns = []
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ValueError(f"Unsupported syntax in derived variable expression {text!r}")
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS or node.keywords:
+                raise ValueError(f"Unknown function in derived variable expression {text!r}")
+        elif isinstance(node, ast.Name) and node.id not in FUNCTIONS and node.id not in columns:
+            columns.append(node.id)
+    return compile(tree, f"<{text}>", 'eval'), columns
+
+
+def evaluation_order(variables):
+    """
+    Order derived variables so each comes after the derived variables it uses.
+    
+    Parameters:
+    -----------
+    variables : list of dict
+        Derived variable spec (see DERIVED_VARIABLES)
+        
+    Returns:
+    --------
+    list of tuple
+        (spec entry, compiled expr, compiled guard or None, column names used)
+    """
+    compiled = {}
+    for variable in variables:
+        expr, columns = compile_expression(variable['expr'])
+        guard = None
+        if variable.get('where'):
+            guard, guard_columns = compile_expression(variable['where'])
+            columns += [col for col in guard_columns if col not in columns]
+        compiled[variable['name']] = (variable, expr, guard, columns)
+    
+    ordered, state = [], {}
+    
+    def visit(name):
+        if state.get(name) == 'done':
+            return
+        if state.get(name) == 'visiting':
+            raise ValueError(f"Derived variable {name!r} depends on itself")
+        state[name] = 'visiting'
+        for col in compiled[name][3]:
+            if col in compiled and col != name:
+                visit(col)
+        state[name] = 'done'
+        ordered.append(compiled[name])
+    
+    for name in compiled:
+        visit(name)
+    return ordered
+
+
+def derive_variables(df, variables=DERIVED_VARIABLES):
+    """
+    Evaluate derived variables on a dataset.
+    
+    Inputs are read from the frame once each as float arrays; a variable
+    whose inputs are missing from the frame (directly or through another
+    derived variable) is skipped with a warning.
+    
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Dataset with the input columns
+    variables : list of dict
+        Derived variable spec (see DERIVED_VARIABLES)
+        
+    Returns:
+    --------
+    tuple
+        (frame with the derived columns added or replaced, dict of name ->
+        number of valid values, in evaluation order)
+    """
+    arrays = {}
+    derived = {}
+    
+    def column(name):
+        if name in derived:
+            return derived[name]
+        if name not in arrays:
+            series = df[name]
+            # Float columns are used in place; others (ints, nullable) converted once
+            if series.dtype == np.float64:
+                arrays[name] = series.to_numpy()
+            else:
+                arrays[name] = series.to_numpy(dtype=float, na_value=np.nan)
+        return arrays[name]
+    
+    for variable, expr, guard, columns in evaluation_order(variables):
+        name = variable['name']
+        missing = [col for col in columns if col not in derived and col not in df.columns]
+        if missing:
+            print(f"   WARNING: Skipping {name}: missing {', '.join(missing)}")
+            continue
+        
+        namespace = {col: column(col) for col in columns}
+        namespace.update(FUNCTIONS)
+        with np.errstate(all='ignore'):
+            values = np.broadcast_to(np.asarray(eval(expr, {'__builtins__': {}}, namespace), dtype=float),
+                                     (len(df),))
+            # Results are masked in place, so never alias an input
+            if not values.flags.writeable or any(
+                np.may_share_memory(values, array) for array in namespace.values() if isinstance(array, np.ndarray)
+            ):
+                values = values.copy()
+            # Outside the guard, and infinities (e.g. division by zero), become NaN
+            invalid = ~np.isfinite(values)
+            if guard is not None:
+                invalid |= ~np.asarray(eval(guard, {'__builtins__': {}}, namespace), dtype=bool)
+            values[invalid] = np.nan
+        derived[name] = values
+    
+    valid = {name: len(values) - int(np.count_nonzero(np.isnan(values))) for name, values in derived.items()}
+    
+    # Shallow copy: the input columns are shared, not copied
+    result = df.copy(deep=False)
+    for name, values in derived.items():
+        result[name] = values
+    return result, valid
+
+
+def variable_labels(variables=DERIVED_VARIABLES):
+    """
+    Labels of the derived variables, by name.
+    """
+    return {variable['name']: variable['label'] for variable in variables if variable.get('label')}
@@ -0,0 +1,234 @@
+"""
+Type-Aware Duplicate Resolution
+===============================
+Collapses duplicate (city, neighborhood) rows of a supplementary table into
+one row per key, following the resolution rules from the README:
+
+  - numeric variables: median across duplicate entries
+  - categorical variables: mode (most common value)
+  - binary variables: maximum (if any source says 1, use 1)
+
+plus first-by-priority and a mean weighted by housing units. Every column is
+resolved in one grouped aggregation over integer key codes, and only rows
+whose key actually repeats go through it; unique rows pass straight through.
+A compact report lists each collapsed group and how far apart its values
+were, so large discrepancies can be inspected by hand.
+
+Author: Econometrics Project
+Date: 2026-10-16
+"""
+
+import numpy as np
+import pandas as pd
+
+
+KEYS = ['city', 'neighborhood']
+
+# Supported aggregations for a column-to-aggregation spec
+AGGREGATIONS = ('median', 'mode', 'max', 'first', 'weighted_mean')
+
+# Weight column used by 'weighted_mean'
+DEFAULT_WEIGHT_COLUMN = 'housing_units'
+
+
+def infer_resolution_spec(df, columns):
+    """
+    Pick the README aggregation for each column from its values.
+    
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Table to resolve
+    columns : list
+        Value columns
+        
+    Returns:
+    --------
+    dict
+        Column -> aggregation: 'max' for 0/1 columns, 'median' for other
+        numeric columns and 'mode' for everything else
+    """
+    spec = {}
+    for col in columns:
+        values = df[col]
+        if pd.api.types.is_bool_dtype(values):
+            spec[col] = 'max'
+        elif pd.api.types.is_numeric_dtype(values):
+            is_binary = values.dropna().isin([0, 1]).all() and values.notna().any()
+            spec[col] = 'max' if is_binary else 'median'
+        else:
+            spec[col] = 'mode'
+    return spec
+
+
+def _key_codes(df, keys):
+    """
+    Integer code per row identifying its key (-1 where any key is missing).
+    """
+    codes = np.zeros(len(df), dtype=np.int64)
+    missing = np.zeros(len(df), dtype=bool)
+    for key in keys:
+        key_codes, uniques = pd.factorize(df[key])
+        missing |= key_codes < 0
+        codes = codes * (len(uniques) + 1) + key_codes
+    codes, _ = pd.factorize(codes)
+    codes[missing] = -1
+    return codes
+
+
+def _group_modes(codes, values):
+    """
+    Most common non-missing value per group code (smallest value on ties).
+    """
+    counts = (
+        pd.DataFrame({'code': codes, 'value': values})
+        .dropna(subset=['value'])
+        .value_counts()
+        .rename('n')
+        .reset_index()
+        .sort_values(['code', 'n', 'value'], ascending=[True, False, True], kind='stable')
+        .drop_duplicates('code')
+    )
+    return counts.set_index('code')['value']
+
+
+def resolve_duplicates(df, spec=None, keys=None, priority=None, weight_column=DEFAULT_WEIGHT_COLUMN,
+                       label=None):
+    """
+    Collapse duplicate keys into one row each with per-column aggregations.
+    
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Table with key columns and value columns
+    spec : dict, optional
+        Column -> one of AGGREGATIONS (default: infer_resolution_spec over
+        every non-key column). Columns not in spec are dropped
+    keys : list, optional
+        Key columns (default: city, neighborhood)
+    priority : str, optional
+        Column ranking rows for 'first' (lowest wins); row order otherwise
+    weight_column : str
+        Weights for 'weighted_mean'
+    label : str, optional
+        Name used when printing the collapse summary (no printing if None)
+        
+    Returns:
+    --------
+    tuple
+        (resolved, report) where resolved has one row per key, in order of
+        first appearance, and report has one row per collapsed key with the
+        number of rows merged and the spread (max - min) of every numeric
+        column across them
+    """
+    keys = KEYS if keys is None else list(keys)
+    if spec is None:
+        spec = infer_resolution_spec(df, [col for col in df.columns if col not in keys])
+    
+    unknown = {col: how for col, how in spec.items() if how not in AGGREGATIONS}
+    if unknown:
+        raise ValueError(f"Unknown aggregation(s): {unknown}; expected one of {AGGREGATIONS}")
+    if 'weighted_mean' in spec.values() and weight_column not in df.columns:
+        raise ValueError(f"weighted_mean needs a '{weight_column}' column")
+    
+    columns = list(spec)
+    df = df.reset_index(drop=True)
+    codes = _key_codes(df, keys)
+    duplicated = pd.Series(codes).duplicated(keep=False).to_numpy() & (codes >= 0)
+    
+    report_columns = keys + ['rows'] + [f"{col}_spread" for col in columns]
+    if not duplicated.any():
+        return df[keys + columns].copy(), pd.DataFrame(columns=report_columns)
+    
+    dups = df.loc[duplicated, keys + columns]
+    dup_codes = codes[duplicated]
+    if priority is not None:
+        order = np.argsort(df.loc[duplicated, priority].to_numpy(), kind='stable')
+        dups, dup_codes = dups.iloc[order], dup_codes[order]
+    
+    # Build every aggregation input as a column of one frame, then aggregate once
+    numeric = [
+        col for col in columns
+        if pd.api.types.is_numeric_dtype(dups[col]) and not pd.api.types.is_bool_dtype(dups[col])
+    ]
+    inputs = {'__rows': np.ones(len(dups), dtype=np.int64)}
+    aggregations = {'__rows': 'sum'}
+    for col, how in spec.items():
+        if how in ('median', 'max', 'first'):
+            inputs[col] = dups[col].to_numpy()
+            aggregations[col] = how
+        elif how == 'weighted_mean':
+            values = dups[col].astype(float)
+            weights = df.loc[dups.index, weight_column].astype(float)
+            weights = weights.where(values.notna() & weights.notna() & (weights > 0))
+            inputs[f"{col}__wx"] = (values * weights).to_numpy()
+            inputs[f"{col}__w"] = weights.to_numpy()
+            aggregations[f"{col}__wx"] = 'sum'
+            aggregations[f"{col}__w"] = 'sum'
+    for col in numeric:
+        inputs[f"{col}__min"] = dups[col].to_numpy()
+        inputs[f"{col}__max"] = dups[col].to_numpy()
+        aggregations[f"{col}__min"] = 'min'
+        aggregations[f"{col}__max"] = 'max'
+    
+    grouped = pd.DataFrame(inputs).groupby(dup_codes, sort=True).agg(aggregations)
+    
+    for col, how in spec.items():
+        if how == 'weighted_mean':
+            grouped[col] = grouped[f"{col}__wx"] / grouped[f"{col}__w"].where(grouped[f"{col}__w"] > 0)
+        elif how == 'mode':
+            grouped[col] = _group_modes(dup_codes, dups[col].to_numpy()).reindex(grouped.index)
+    
+    # One row per collapsed key, placed where the key first appeared
+    first_rows = pd.Series(np.flatnonzero(duplicated)).groupby(codes[duplicated]).first()
+    collapsed = df.loc[first_rows.loc[grouped.index].to_numpy(), keys]
+    for col in columns:
+        collapsed[col] = grouped[col].to_numpy()
+    
+    resolved = pd.concat([df.loc[~duplicated, keys + columns], collapsed]).sort_index().reset_index(drop=True)
+    
+    report = collapsed[keys].reset_index(drop=True)
+    report['rows'] = grouped['__rows'].to_numpy()
+    for col in columns:
+        if col in numeric:
+            report[f"{col}_spread"] = (grouped[f"{col}__max"] - grouped[f"{col}__min"]).to_numpy()
+        else:
+            report[f"{col}_spread"] = np.nan
+    
+    if label is not None:
+        print_collapse_report(report, label)
+    
+    return resolved, report
+
+
+def print_collapse_report(report, label, top=5):
+    """
+    Print a short summary of collapsed duplicate groups.
+    
+    Parameters:
+    -----------
+    report : pd.DataFrame
+        Report returned by resolve_duplicates
+    label : str
+        Name of the resolved table
+    top : int
+        Number of widest-spread groups to list
+    """
+    if report.empty:
+        return
+    
+    n_rows = int(report['rows'].sum())
+    print(f"   + {label}: collapsed {n_rows} rows into {len(report)} neighborhoods")
+    
+    spread_columns = [col for col in report.columns if col.endswith('_spread') and report[col].notna().any()]
+    if not spread_columns:
+        return
+    
+    keys = list(report.columns[:report.columns.get_loc('rows')])
+    widest = report[spread_columns].max(axis=1)
+    for idx in widest.nlargest(top).index:
+        if not widest[idx] > 0:
+            break
+        col = report.loc[idx, spread_columns].astype(float).idxmax()
+        print(f"     - {' / '.join(str(report.loc[idx, key]) for key in keys)}: "
+              f"{report.loc[idx, 'rows']} rows, {col[:-len('_spread')]} spread {widest[idx]:,.2f}")
@@ -0,0 +1,435 @@
+"""
+OLS Estimation of the Rent Models
+=================================
+Estimates the README's econometric models (Model 1, and Model 2 with the
+squared density and the density x tourist-area interaction) as well as the
+specifications reported in Stata Output/results.txt, directly on the frame
+returned by create_final_dataset.
+
+City fixed effects are absorbed by within-demeaning (subtracting city means)
+instead of dummy columns; by the Frisch-Waugh-Lovell theorem the slopes,
+residuals and sandwich variances are those of the regression with city
+dummies. The demeaned system is solved by QR. Each model reports
+heteroskedasticity-robust (HC1) and city-clustered standard errors with the
+small-sample factors Stata uses for
+
+    regress y x i.city, vce(robust)         n / (n - K)
+    regress y x i.city, vce(cluster city)   G / (G - 1) * (n - 1) / (n - K)
+
+where K counts the slopes, the city dummies and the constant. p-values come
+from the t distribution (n - K degrees of freedom for HC1, G - 1 for
+clustered errors). The F statistics test the slopes and the city dummies
+jointly, as regress does (not the slopes alone, as areg does).
+
+Author: Econometrics Project
+Date: 2026-10-16
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+
+# Model specifications. Regressor terms are column names, 'x^2' for a
+# square and 'x*z' for an interaction.
+MODELS = {
+    'model_1': {
+        'depvar': 'median_rent',
+        'regressors': ['airbnb_density', 'median_household_income', 'housing_units', 'tourist_area'],
+    },
+    'model_2': {
+        'depvar': 'median_rent',
+        'regressors': ['airbnb_density', 'airbnb_density^2', 'median_household_income', 'housing_units',
+                       'tourist_area', 'airbnb_density*tourist_area'],
+    },
+    # Specifications of Stata Output/results.txt
+    'model_a': {
+        'depvar': 'log_rent',
+        'regressors': ['airbnb_count', 'log_income', 'pct_college', 'population_density', 'tourist_area'],
+    },
+    'model_b': {
+        'depvar': 'log_rent',
+        'regressors': ['log_airbnb_density', 'log_income', 'pct_college', 'population_density', 'tourist_area'],
+    },
+    'model_c1': {
+        'depvar': 'log_rent',
+        'regressors': ['log_airbnb_density', 'pct_college', 'population_density', 'tourist_area'],
+    },
+    'model_c2': {
+        'depvar': 'log_rent',
+        'regressors': ['log_airbnb_density', 'log_income', 'population_density', 'tourist_area'],
+    },
+}
+
+# Column whose groups are absorbed as fixed effects and used as clusters
+GROUP_COLUMN = 'city'
+
+# Relative size of a QR diagonal entry below which a regressor is treated
+# as collinear with the ones before it and omitted
+COLLINEARITY_TOLERANCE = 1e-10
+
+
+_lgamma = np.vectorize(math.lgamma, otypes=[float])
+
+
+def _betacf(a, b, x, max_iter=1000, eps=3e-16):
+    """
+    Continued fraction of the incomplete beta function (modified Lentz),
+    evaluated elementwise on arrays.
+    """
+    tiny = 1e-300
+    c = np.ones_like(x)
+    d = 1.0 - (a + b) * x / (a + 1)
+    d = 1.0 / np.where(np.abs(d) > tiny, d, tiny)
+    h = d.copy()
+    active = np.ones(x.shape, dtype=bool)
+    for m in range(1, max_iter + 1):
+        delta = np.ones_like(x)
+        for aa in (m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+                   -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))):
+            d = 1.0 + aa * d
+            d = 1.0 / np.where(np.abs(d) > tiny, d, tiny)
+            c = 1.0 + aa / c
+            c = np.where(np.abs(c) > tiny, c, tiny)
+            delta = d * c
+            h = np.where(active, h * delta, h)
+        active &= np.abs(delta - 1.0) >= eps
+        if not active.any():
+            break
+    return h
+
+
+def betainc(a, b, x):
+    """
+    Regularized incomplete beta function I_x(a, b) (elementwise on arrays).
+    """
+    a, b, x = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (a, b, x)))
+    inside = (x > 0) & (x < 1)
+    xc = np.where(inside, x, 0.5)
+    
+    # The continued fraction converges fast below (a + 1) / (a + b + 2);
+    # above it use I_x(a, b) = 1 - I_{1-x}(b, a)
+    swap = xc >= (a + 1) / (a + b + 2)
+    a_, b_, x_ = np.where(swap, b, a), np.where(swap, a, b), np.where(swap, 1 - xc, xc)
+    front = np.exp(_lgamma(a_ + b_) - _lgamma(a_) - _lgamma(b_) + a_ * np.log(x_) + b_ * np.log1p(-x_))
+    value = front * _betacf(a_, b_, x_) / a_
+    value = np.where(swap, 1.0 - value, value)
+    
+    result = np.where(x <= 0, 0.0, np.where(x >= 1, 1.0, value))
+    return result if result.ndim else float(result)
+
+
+def t_pvalue(t, df):
+    """
+    Two-sided p-value of t statistics with df degrees of freedom
+    (elementwise on arrays).
+    """
+    t, df = np.broadcast_arrays(np.asarray(t, dtype=float), np.asarray(df, dtype=float))
+    valid = np.isfinite(t) & (df > 0)
+    tt, dd = np.where(valid, t, 0.0), np.where(valid, df, 1.0)
+    p = betainc(dd / 2, 0.5, dd / (dd + tt * tt))
+    # Infinite t statistics are significant at any level
+    p = np.where(valid, p, np.where(np.isinf(t) & (df > 0), 0.0, np.nan))
+    return p if p.ndim else float(p)
+
+
+def design_column(df, term):
+    """
+    Values of one regressor term ('x', 'x^2' or 'x*z') as float64.
+    """
+    if term.endswith('^2'):
+        values = df[term[:-2]].to_numpy(dtype=float)
+        return values * values
+    if '*' in term:
+        left, right = term.split('*')
+        return df[left].to_numpy(dtype=float) * df[right].to_numpy(dtype=float)
+    return df[term].to_numpy(dtype=float)
+
+
+def demean(matrix, codes, n_groups):
+    """
+    Subtract group means from every column (within transformation).
+    """
+    counts = np.bincount(codes, minlength=n_groups)
+    means = np.column_stack([
+        np.bincount(codes, weights=matrix[:, j], minlength=n_groups) / counts
+        for j in range(matrix.shape[1])
+    ])
+    return matrix - means[codes]
+
+
+class RegressionResult:
+    """
+    Estimates of one OLS model with absorbed group fixed effects.
+    
+    Attributes:
+    -----------
+    name, depvar : str
+        Model name and dependent variable
+    coefficients : pd.DataFrame
+        One row per regressor term: coef, se_hc1, t_hc1, p_hc1, se_cluster,
+        t_cluster, p_cluster (NaN for omitted collinear terms)
+    nobs, n_groups, df_resid : int
+        Observations, absorbed groups and residual degrees of freedom
+    r2, r2_adj, rmse : float
+        Fit of the full model (including the fixed effects), as regress
+        reports them
+    f_hc1, f_cluster : float
+        Wald F statistics that all slopes and group dummies are zero, as
+        regress reports them with i.<group> (NaN for the clustered test,
+        which has more constraints than clusters minus one)
+    group_effects : pd.Series
+        Estimated fixed effect of every group
+    """
+    
+    def __init__(self, name, depvar, coefficients, nobs, n_groups, df_resid, r2, r2_adj, rmse,
+                 f_hc1, f_cluster, group_effects):
+        self.name = name
+        self.depvar = depvar
+        self.coefficients = coefficients
+        self.nobs = nobs
+        self.n_groups = n_groups
+        self.df_resid = df_resid
+        self.r2 = r2
+        self.r2_adj = r2_adj
+        self.rmse = rmse
+        self.f_hc1 = f_hc1
+        self.f_cluster = f_cluster
+        self.group_effects = group_effects
+    
+    def to_frame(self):
+        """
+        Tidy coefficient table with the model name and fit statistics.
+        """
+        table = self.coefficients.rename_axis('term').reset_index()
+        table.insert(0, 'model', self.name)
+        table.insert(1, 'depvar', self.depvar)
+        table['nobs'] = self.nobs
+        table['r2'] = self.r2
+        return table
+
+
+def _wald_f(beta, cov):
+    """
+    F statistic of the joint hypothesis beta = 0.
+    """
+    try:
+        return float(beta @ np.linalg.solve(cov, beta)) / len(beta)
+    except np.linalg.LinAlgError:
+        return np.nan
+
+
+def estimate(df, depvar, regressors, group=GROUP_COLUMN, name=None):
+    """
+    Estimate an OLS model with absorbed group fixed effects.
+    
+    Rows with a missing dependent variable, regressor or group are dropped
+    (listwise deletion, as in Stata).
+    
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Dataset (e.g. from create_final_dataset)
+    depvar : str
+        Dependent variable
+    regressors : list of str
+        Regressor terms ('x', 'x^2' or 'x*z')
+    group : str
+        Column absorbed as fixed effects and used for clustering
+    name : str, optional
+        Model name stored on the result
+        
+    Returns:
+    --------
+    RegressionResult
+        Coefficients with HC1 and clustered standard errors, and fit
+        statistics
+    """
+    y = df[depvar].to_numpy(dtype=float)
+    X = np.column_stack([design_column(df, term) for term in regressors])
+    groups = df[group].to_numpy(dtype=object)
+    
+    keep = np.isfinite(y) & np.isfinite(X).all(axis=1) & pd.notna(groups)
+    y, X = y[keep], X[keep]
+    codes, labels = pd.factorize(groups[keep])
+    n, n_groups = len(y), len(labels)
+    
+    y_within = demean(y[:, None], codes, n_groups)[:, 0]
+    X_within = demean(X, codes, n_groups)
+    
+    # Drop terms collinear with earlier ones (or with the fixed effects)
+    Q, R = np.linalg.qr(X_within)
+    scale = np.linalg.norm(X_within, axis=0)
+    kept = np.abs(np.diag(R)) > COLLINEARITY_TOLERANCE * np.maximum(scale, 1.0)
+    if not kept.all():
+        Q, R = np.linalg.qr(X_within[:, kept])
+    k = int(kept.sum())
+    
+    beta = np.linalg.solve(R, Q.T @ y_within)
+    residuals = y_within - X_within[:, kept] @ beta
+    R_inv = np.linalg.solve(R, np.eye(k))
+    bread = R_inv @ R_inv.T
+    scores = X_within[:, kept] * residuals[:, None]
+    
+    # K = slopes + (groups - 1) dummies + constant
+    df_resid = n - k - n_groups
+    cov_hc1 = bread @ (scores.T @ scores) @ bread * (n / df_resid)
+    
+    cluster_scores = np.column_stack([
+        np.bincount(codes, weights=scores[:, j], minlength=n_groups) for j in range(k)
+    ])
+    cluster_factor = n_groups / (n_groups - 1) * (n - 1) / df_resid if n_groups > 1 else np.nan
+    cov_cluster = bread @ (cluster_scores.T @ cluster_scores) @ bread * cluster_factor
+    
+    coefficients = pd.DataFrame(np.nan, index=pd.Index(list(regressors)),
+                                columns=['coef', 'se_hc1', 't_hc1', 'p_hc1', 'se_cluster', 't_cluster', 'p_cluster'])
+    columns = coefficients.columns
+    for label, cov, dof in (('hc1', cov_hc1, df_resid), ('cluster', cov_cluster, n_groups - 1)):
+        se = np.sqrt(np.diag(cov))
+        t = beta / se
+        coefficients.loc[kept, [f'se_{label}', f't_{label}']] = np.column_stack([se, t])
+        coefficients.loc[kept, f'p_{label}'] = t_pvalue(t, dof)
+    coefficients.loc[kept, 'coef'] = beta
+    coefficients = coefficients[columns]
+    
+    rss = float(residuals @ residuals)
+    tss = float(((y - y.mean()) ** 2).sum())
+    r2 = 1 - rss / tss
+    effects = np.bincount(codes, weights=y - X[:, kept] @ beta, minlength=n_groups) / np.bincount(codes)
+    group_effects = pd.Series(effects, index=pd.Index(labels, name=group), name='effect')
+    
+    # The F statistic of regress with i.<group> also tests the dummies, whose
+    # coefficients are the fixed effects relative to the first group; their
+    # covariance is the same sandwich on the dummy design (same residuals)
+    Z = np.column_stack([X[:, kept], np.eye(n_groups)[codes][:, 1:], np.ones(n)])
+    R_z_inv = np.linalg.solve(np.linalg.qr(Z)[1], np.eye(Z.shape[1]))
+    Z_inv = R_z_inv @ R_z_inv.T
+    z_scores = Z * residuals[:, None]
+    z_cluster_scores = np.column_stack([
+        np.bincount(codes, weights=z_scores[:, j], minlength=n_groups) for j in range(Z.shape[1])
+    ])
+    tested = np.concatenate([beta, effects[1:] - effects[0]])
+    q = len(tested)
+    z_cov_hc1 = (Z_inv @ (z_scores.T @ z_scores) @ Z_inv * (n / df_resid))[:q, :q]
+    z_cov_cluster = (Z_inv @ (z_cluster_scores.T @ z_cluster_scores) @ Z_inv * cluster_factor)[:q, :q]
+    
+    return RegressionResult(
+        name=name,
+        depvar=depvar,
+        coefficients=coefficients,
+        nobs=n,
+        n_groups=n_groups,
+        df_resid=df_resid,
+        r2=r2,
+        r2_adj=1 - (1 - r2) * (n - 1) / df_resid,
+        rmse=math.sqrt(rss / df_resid),
+        f_hc1=_wald_f(tested, z_cov_hc1),
+        # With more constraints than clusters minus one the clustered
+        # covariance is singular and Stata leaves the F statistic missing
+        f_cluster=_wald_f(tested, z_cov_cluster) if q <= n_groups - 1 else np.nan,
+        group_effects=group_effects,
+    )
+
+
+def run_models(df, models=None, group=GROUP_COLUMN):
+    """
+    Estimate several models on one dataset.
+    
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Dataset (e.g. from create_final_dataset)
+    models : dict, optional
+        name -> {'depvar', 'regressors'}; defaults to MODELS. Models using
+        columns the dataset lacks are skipped
+    group : str
+        Fixed-effect and cluster column
+        
+    Returns:
+    --------
+    dict
+        Model name -> RegressionResult
+    """
+    models = MODELS if models is None else models
+    results = {}
+    for name, spec in models.items():
+        needed = {spec['depvar'], group}
+        for term in spec['regressors']:
+            needed.update(term.replace('^2', '').split('*'))
+        missing = sorted(needed - set(df.columns))
+        if missing:
+            print(f"   WARNING: Skipping {name}; missing column(s): {', '.join(missing)}")
+            continue
+        results[name] = estimate(df, spec['depvar'], spec['regressors'], group=group, name=name)
+    return results
+
+
+def _format_number(value):
+    """
+    Format an estimate with three significant digits, as esttab does.
+    """
+    if not np.isfinite(value):
+        return ''
+    magnitude = abs(value)
+    if magnitude >= 1:
+        return f"{value:.3f}"
+    if magnitude >= 1e-4:
+        return f"{value:.{2 - math.floor(math.log10(magnitude))}f}"
+    return f"{value:.2e}"
+
+
+def _stars(p):
+    """
+    Significance stars for a p-value.
+    """
+    if not np.isfinite(p):
+        return ''
+    return '***' if p < 0.01 else '**' if p < 0.05 else '*' if p < 0.1 else ''
+
+
+def results_table(results, se='hc1'):
+    """
+    Tab-separated table of several models in the layout of
+    Stata Output/results.txt.
+    
+    Parameters:
+    -----------
+    results : dict
+        Model name -> RegressionResult
+    se : str
+        'hc1' or 'cluster' standard errors in parentheses
+        
+    Returns:
+    --------
+    str
+        Table text
+    """
+    names = list(results)
+    terms = list(dict.fromkeys(term for result in results.values() for term in result.coefficients.index))
+    
+    lines = ['\t' + '\t'.join(f"({i})" for i in range(1, len(names) + 1)),
+             'VARIABLES\t' + '\t'.join(names),
+             '\t' * len(names)]
+    for term in terms:
+        coef_row, se_row = [term], ['']
+        for result in results.values():
+            if term in result.coefficients.index:
+                row = result.coefficients.loc[term]
+                coef_row.append(_format_number(row['coef']) + _stars(row[f'p_{se}']))
+                se_row.append(f"({_format_number(row[f'se_{se}'])})" if np.isfinite(row[f'se_{se}']) else '')
+            else:
+                coef_row.append('')
+                se_row.append('')
+        lines += ['\t'.join(coef_row), '\t'.join(se_row)]
+    
+    lines.append('\t' * len(names))
+    lines.append('Observations\t' + '\t'.join(str(r.nobs) for r in results.values()))
+    lines.append('R-squared\t' + '\t'.join(f"{r.r2:.3f}" for r in results.values()))
+    lines.append('Adj_R2\t' + '\t'.join(f"{r.r2_adj:.3f}" for r in results.values()))
+    lines.append('F_stat\t' + '\t'.join(f"{getattr(r, f'f_{se}'):.4g}" for r in results.values()))
+    lines.append('RMSE\t' + '\t'.join(f"{r.rmse:.3f}" for r in results.values()))
+    label = 'Robust' if se == 'hc1' else 'City-clustered'
+    lines.append(f"{label} standard errors in parentheses; city fixed effects absorbed")
+    lines.append('*** p<0.01, ** p<0.05, * p<0.1')
+    return '\n'.join(lines) + '\n'
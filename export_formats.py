@@ -0,0 +1,246 @@
+"""
+Dataset Export Formats
+======================
+Writes the final dataset in several formats at once from one in-memory
+frame:
+
+  dta     - Stata 14+ (version 118) with variable labels
+  csv     - comma-separated text
+  parquet - Parquet, with city and neighborhood dictionary-encoded; with
+            partition_by='city' a directory of city=<city>/ partitions
+            (read back as one frame by pandas.read_parquet)
+  feather - Arrow IPC (Feather v2), uncompressed so it can be memory-mapped
+
+The formats are written concurrently (one thread each; the Arrow writers
+release the GIL) and every file goes to a temporary name in the target
+directory first and is renamed into place when complete, so an interrupted
+run leaves the previous export untouched rather than a half-written file.
+
+read_dataset() loads any of the formats, memory-mapping Feather files.
+
+Author: Econometrics Project
+Date: 2026-10-16
+"""
+
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = feather = pq = None
+
+
+# Format -> file extension
+EXPORT_FORMATS = {
+    'dta': '.dta',
+    'csv': '.csv',
+    'parquet': '.parquet',
+    'feather': '.feather',
+}
+
+DEFAULT_EXPORT_FORMATS = ('dta', 'csv', 'parquet', 'feather')
+
+# Formats that need pyarrow
+ARROW_FORMATS = ('parquet', 'feather')
+
+# Text columns stored dictionary-encoded in the Arrow formats
+DICTIONARY_COLUMNS = ['city', 'neighborhood']
+
+FORMAT_NAMES = {'dta': 'Stata', 'csv': 'CSV', 'parquet': 'Parquet', 'feather': 'Feather'}
+
+
+def export_paths(output_base_path, formats=DEFAULT_EXPORT_FORMATS):
+    """
+    Output path of every format, e.g. {'csv': '<base>.csv', ...}.
+    """
+    return {fmt: f"{output_base_path}{EXPORT_FORMATS[fmt]}" for fmt in formats}
+
+
+def _temporary_path(path):
+    """
+    Temporary sibling of an output path (same directory, so the final
+    rename is atomic).
+    """
+    path = Path(path)
+    return path.with_name(f".{path.name}.tmp{os.getpid()}")
+
+
+def _replace(tmp_path, path):
+    """
+    Move a finished temporary file or directory into place.
+    """
+    path = Path(path)
+    if tmp_path.is_dir():
+        # Directories cannot be replaced atomically; swap via a backup name
+        backup = path.with_name(f".{path.name}.old{os.getpid()}")
+        if path.exists():
+            os.replace(path, backup)
+        os.replace(tmp_path, path)
+        if backup.exists():
+            if backup.is_dir():
+                shutil.rmtree(backup)
+            else:
+                backup.unlink()
+    else:
+        if path.is_dir():
+            shutil.rmtree(path)
+        os.replace(tmp_path, path)
+
+
+def arrow_table(df, labels=None):
+    """
+    Convert a frame to an Arrow table with dictionary-encoded text keys.
+    
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Dataset
+    labels : dict, optional
+        Column -> variable label, stored as field metadata
+        
+    Returns:
+    --------
+    pyarrow.Table
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    fields = []
+    for field in table.schema:
+        if field.name in DICTIONARY_COLUMNS and pa.types.is_string(field.type):
+            field = field.with_type(pa.dictionary(pa.int32(), pa.string()))
+        if labels and field.name in labels:
+            field = field.with_metadata({'label': labels[field.name]})
+        fields.append(field)
+    return table.cast(pa.schema(fields, metadata=table.schema.metadata))
+
+
+def _write_dta(df, path, labels):
+    """
+    Write a Stata file (version 118).
+    """
+    df.to_stata(path, write_index=False, version=118,
+                variable_labels={name: label for name, label in (labels or {}).items() if name in df.columns})
+
+
+def _write_csv(df, path):
+    """
+    Write a CSV file.
+    """
+    df.to_csv(path, index=False)
+
+
+def _write_parquet(table, path, partition_by):
+    """
+    Write a Parquet file, or a directory partitioned by one column.
+    """
+    if partition_by is None:
+        pq.write_table(table, path)
+    else:
+        pq.write_to_dataset(table, path, partition_cols=[partition_by],
+                            basename_template='part-{i}.parquet')
+
+
+def _write_feather(table, path):
+    """
+    Write an uncompressed Feather (Arrow IPC) file.
+    """
+    feather.write_feather(table, path, compression='uncompressed')
+
+
+def write_formats(df, output_base_path, formats=DEFAULT_EXPORT_FORMATS, labels=None, partition_by=None,
+                  max_workers=None):
+    """
+    Write a dataset in several formats concurrently.
+    
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Dataset
+    output_base_path : str
+        Base path for output files (without extension)
+    formats : iterable of str
+        Formats to write (keys of EXPORT_FORMATS)
+    labels : dict, optional
+        Column -> variable label (Stata labels and Arrow field metadata)
+    partition_by : str, optional
+        Column to partition the Parquet output by (e.g. 'city')
+    max_workers : int, optional
+        Writer threads (default: one per format)
+        
+    Returns:
+    --------
+    dict
+        Format -> written path, in the order of formats. Arrow formats are
+        skipped with a warning when pyarrow is not installed
+    """
+    formats = list(dict.fromkeys(formats))
+    unknown = [fmt for fmt in formats if fmt not in EXPORT_FORMATS]
+    if unknown:
+        raise ValueError(f"Unknown export format(s): {', '.join(unknown)} "
+                         f"(expected {', '.join(EXPORT_FORMATS)})")
+    if pa is None and any(fmt in ARROW_FORMATS for fmt in formats):
+        print(f"   WARNING: pyarrow is not installed; skipping {', '.join(f for f in formats if f in ARROW_FORMATS)}")
+        formats = [fmt for fmt in formats if fmt not in ARROW_FORMATS]
+    
+    paths = export_paths(output_base_path, formats)
+    table = arrow_table(df, labels) if any(fmt in ARROW_FORMATS for fmt in formats) else None
+    writers = {
+        'dta': lambda tmp: _write_dta(df, tmp, labels),
+        'csv': lambda tmp: _write_csv(df, tmp),
+        'parquet': lambda tmp: _write_parquet(table, tmp, partition_by),
+        'feather': lambda tmp: _write_feather(table, tmp),
+    }
+    
+    def write(fmt):
+        tmp_path = _temporary_path(paths[fmt])
+        try:
+            writers[fmt](tmp_path)
+            _replace(tmp_path, paths[fmt])
+        finally:
+            if tmp_path.is_dir():
+                shutil.rmtree(tmp_path, ignore_errors=True)
+            elif tmp_path.exists():
+                tmp_path.unlink()
+        return paths[fmt]
+    
+    with ThreadPoolExecutor(max_workers=max_workers or max(len(formats), 1)) as executor:
+        futures = {fmt: executor.submit(write, fmt) for fmt in formats}
+        return {fmt: future.result() for fmt, future in futures.items()}
+
+
+def output_size(path):
+    """
+    Size of an output file, or of all files of a partitioned directory, in bytes.
+    """
+    path = Path(path)
+    if path.is_dir():
+        return sum(part.stat().st_size for part in path.rglob('*') if part.is_file())
+    return path.stat().st_size
+
+
+def read_dataset(path):
+    """
+    Read an exported dataset (.dta, .csv, .parquet or .feather).
+    
+    Feather files are memory-mapped rather than read; a partitioned Parquet
+    directory is read as one frame.
+    """
+    suffix = os.path.splitext(str(path))[1].lower()
+    if suffix == '.dta':
+        return pd.read_stata(path)
+    if suffix == '.parquet':
+        df = pd.read_parquet(path)
+        if os.path.isdir(path):
+            # Partition columns come back last; restore the key columns first
+            keys = [col for col in DICTIONARY_COLUMNS if col in df.columns]
+            df = df[keys + [col for col in df.columns if col not in keys]]
+        return df
+    if suffix in ('.feather', '.arrow'):
+        return feather.read_table(path, memory_map=True).to_pandas()
+    return pd.read_csv(path)
@@ -0,0 +1,302 @@
+"""
+Approximate Neighborhood-Name Matching
+======================================
+Matches neighborhood names that differ only in spelling ("bedford-stuyvesant"
+vs "bedford stuyvesant", "st. george" vs "saint george") so they no longer
+drop out of exact-key joins.
+
+Names are first put in a canonical form (punctuation removed, common
+abbreviations expanded). Candidates are then found through a per-city
+inverted index of character trigrams - only names sharing a reasonably rare
+trigram with the query are ever compared - and scored with the Dice
+coefficient of their trigram sets. A match is accepted automatically when
+it scores above the accept threshold and clearly beats the runner-up;
+weaker or ambiguous matches are written to a review file instead.
+
+Match results are cached on disk, keyed by the names being matched and the
+matcher settings, so reruns skip the matching entirely.
+
+Author: Econometrics Project
+Date: 2026-10-16
+"""
+
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+# Bump when the canonical form or scoring changes so cached results are ignored
+MATCHER_VERSION = 1
+
+# Score at or above which a clear best match is accepted automatically
+ACCEPT_THRESHOLD = 0.85
+
+# Score at or above which a match is kept for manual review
+REVIEW_THRESHOLD = 0.6
+
+# Minimum lead of the best candidate over the runner-up for automatic acceptance
+MIN_MARGIN = 0.05
+
+# Candidates kept per query after the blocking step
+MAX_CANDIDATES = 10
+
+# Abbreviations expanded in the canonical form
+ABBREVIATIONS = {
+    'st': 'saint',
+    'ste': 'sainte',
+    'mt': 'mount',
+    'ft': 'fort',
+    'n': 'north',
+    's': 'south',
+    'e': 'east',
+    'w': 'west',
+}
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+
+DECISION_COLUMNS = ['city', 'query', 'candidate', 'score', 'runner_up', 'runner_up_score', 'status']
+
+
+def canonical_name(name):
+    """
+    Canonical form of a standardized name used for fuzzy comparison.
+    """
+    tokens = _NON_ALNUM.sub(' ', str(name).replace('&', ' and ')).split()
+    return ' '.join(ABBREVIATIONS.get(token, token) for token in tokens)
+
+
+def _trigrams(name):
+    """
+    Character trigrams of a name, padded so word starts count double.
+    """
+    padded = f"  {name.replace(' ', '  ')} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def score_block(queries, candidates, max_candidates=MAX_CANDIDATES):
+    """
+    Score queries against candidates of one block (city) via a trigram index.
+    
+    Parameters:
+    -----------
+    queries : list of str
+        Canonical query names
+    candidates : list of str
+        Canonical candidate names
+    max_candidates : int
+        Candidates scored per query, chosen by shared rare trigrams
+        
+    Returns:
+    --------
+    pd.DataFrame
+        Columns q, c (positions in queries/candidates) and score, for
+        every scored pair
+    """
+    if not queries or not candidates:
+        return pd.DataFrame({'q': [], 'c': [], 'score': []})
+    
+    # Inverted index: trigram -> candidate positions
+    cand_grams = [_trigrams(name) for name in candidates]
+    gram_ids, grams = pd.factorize(np.array([gram for grams in cand_grams for gram in grams], dtype=object))
+    vocab = dict(zip(grams, range(len(grams))))
+    owners = np.repeat(np.arange(len(candidates)), [len(grams) for grams in cand_grams])
+    order = np.argsort(gram_ids, kind='stable')
+    postings = owners[order]
+    bounds = np.searchsorted(gram_ids[order], np.arange(len(vocab) + 1))
+    
+    # Very common trigrams add little but would pair every query with most
+    # candidates; block on the rarer ones
+    max_postings = max(50, len(candidates) // 20)
+    
+    pair_queries, pair_candidates = [], []
+    for q, name in enumerate(queries):
+        ids = [vocab[gram] for gram in _trigrams(name) if gram in vocab]
+        ids = [i for i in ids if bounds[i + 1] - bounds[i] <= max_postings]
+        if not ids:
+            continue
+        hits = np.concatenate([postings[bounds[i]:bounds[i + 1]] for i in ids])
+        found, shared = np.unique(hits, return_counts=True)
+        if len(found) > max_candidates:
+            found = found[np.argsort(-shared, kind='stable')[:max_candidates]]
+        pair_queries.append(np.full(len(found), q))
+        pair_candidates.append(found)
+    
+    if not pair_queries:
+        return pd.DataFrame({'q': [], 'c': [], 'score': []})
+    
+    q_idx = np.concatenate(pair_queries)
+    c_idx = np.concatenate(pair_candidates)
+    query_grams = [_trigrams(name) for name in queries]
+    scores = np.array([
+        2 * len(query_grams[q] & cand_grams[c]) / (len(query_grams[q]) + len(cand_grams[c]))
+        for q, c in zip(q_idx, c_idx)
+    ])
+    
+    return pd.DataFrame({'q': q_idx, 'c': c_idx, 'score': scores})
+
+
+class NameMatcher:
+    """
+    Fuzzy matcher for unmatched (city, neighborhood) keys, with a result cache.
+    
+    Parameters:
+    -----------
+    cache_dir : str, optional
+        Directory for cached match results (no caching if None)
+    accept : float
+        Automatic acceptance threshold
+    review : float
+        Threshold for sending a match to review
+    margin : float
+        Required lead over the runner-up for automatic acceptance
+    """
+    
+    def __init__(self, cache_dir=None, accept=ACCEPT_THRESHOLD, review=REVIEW_THRESHOLD, margin=MIN_MARGIN):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.accept = accept
+        self.review = review
+        self.margin = margin
+        self.review_rows = []
+    
+    def _cache_path(self, queries, candidates):
+        """
+        Cache file for one matching problem.
+        """
+        payload = json.dumps({
+            'version': MATCHER_VERSION,
+            'settings': [self.accept, self.review, self.margin, MAX_CANDIDATES],
+            'queries': sorted(map(list, queries)),
+            'candidates': sorted(map(list, candidates)),
+        }, default=str)
+        return self.cache_dir / f"fuzzy-{hashlib.sha256(payload.encode()).hexdigest()[:16]}.csv"
+    
+    def match(self, queries, candidates):
+        """
+        Match query keys to candidate keys within each city.
+        
+        Parameters:
+        -----------
+        queries : list of tuple
+            (city, neighborhood) keys to find a match for
+        candidates : list of tuple
+            (city, neighborhood) keys that may be matched
+            
+        Returns:
+        --------
+        pd.DataFrame
+            DECISION_COLUMNS, one row per query with a candidate scoring at
+            least the review threshold; status is 'accepted' or 'review'
+        """
+        cache_path = self._cache_path(queries, candidates) if self.cache_dir else None
+        if cache_path is not None and cache_path.exists():
+            return pd.read_csv(cache_path, dtype={'city': object, 'query': object, 'candidate': object,
+                                                  'runner_up': object})
+        
+        query_frame = pd.DataFrame(queries, columns=['city', 'name'])
+        candidate_frame = pd.DataFrame(candidates, columns=['city', 'name'])
+        query_frame['canonical'] = query_frame['name'].map(canonical_name)
+        candidate_frame['canonical'] = candidate_frame['name'].map(canonical_name)
+        
+        decisions = []
+        for city, city_queries in query_frame.groupby('city', sort=False):
+            city_candidates = candidate_frame[candidate_frame['city'] == city]
+            pairs = score_block(list(city_queries['canonical']), list(city_candidates['canonical']))
+            if pairs.empty:
+                continue
+            
+            pairs = pairs.sort_values(['q', 'score'], ascending=[True, False], kind='stable')
+            rank = pairs.groupby('q').cumcount()
+            best = pairs[rank == 0].set_index('q')
+            second = pairs[rank == 1].set_index('q')['score'].reindex(best.index)
+            second_c = pairs[rank == 1].set_index('q')['c'].reindex(best.index)
+            
+            candidate_names = city_candidates['name'].to_numpy()
+            decisions.append(pd.DataFrame({
+                'city': city,
+                'query': city_queries['name'].to_numpy()[best.index.to_numpy(dtype=int)],
+                'candidate': candidate_names[best['c'].to_numpy(dtype=int)],
+                'score': best['score'].round(4).to_numpy(),
+                'runner_up': [candidate_names[int(c)] if pd.notna(c) else None for c in second_c],
+                'runner_up_score': second.round(4).to_numpy(),
+            }))
+        
+        result = pd.concat(decisions, ignore_index=True) if decisions else pd.DataFrame(columns=DECISION_COLUMNS[:-1])
+        result = result[result['score'] >= self.review].reset_index(drop=True)
+        
+        clear_lead = (result['score'] - result['runner_up_score'].fillna(0)) >= self.margin
+        # A candidate claimed by two queries is ambiguous for both
+        unique_claim = ~result.duplicated(subset=['city', 'candidate'], keep=False)
+        result['status'] = np.where((result['score'] >= self.accept) & clear_lead & unique_claim,
+                                    'accepted', 'review')
+        result = result[DECISION_COLUMNS]
+        
+        if cache_path is not None:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_suffix(f'.csv.tmp{os.getpid()}')
+            result.to_csv(tmp_path, index=False)
+            os.replace(tmp_path, cache_path)
+        
+        return result
+    
+    def align(self, base, source, label):
+        """
+        Rename a source's keys to the base keys they fuzzily match.
+        
+        Only keys unmatched on both sides are considered: base keys with no
+        exact match in the source are matched against source keys with no
+        exact match in the base.
+        
+        Parameters:
+        -----------
+        base : pd.DataFrame
+            Table whose keys are kept (the Airbnb neighborhoods)
+        source : pd.DataFrame
+            Table whose keys are renamed
+        label : str
+            Source name, for logs and the review file
+            
+        Returns:
+        --------
+        pd.DataFrame
+            Source with accepted matches renamed to the base keys
+        """
+        base_keys = set(zip(base['city'], base['neighborhood']))
+        source_keys = set(zip(source['city'], source['neighborhood']))
+        queries = sorted((key for key in base_keys - source_keys if pd.notna(key[1])), key=str)
+        candidates = sorted((key for key in source_keys - base_keys if pd.notna(key[1])), key=str)
+        
+        decisions = self.match(queries, candidates)
+        accepted = decisions[decisions['status'] == 'accepted']
+        to_review = decisions[decisions['status'] == 'review']
+        
+        print(f"   + {label}: {len(accepted)} fuzzy matches accepted, {len(to_review)} for review")
+        if not to_review.empty:
+            self.review_rows.append(to_review.assign(source=label))
+        
+        if accepted.empty:
+            return source
+        
+        renames = pd.Series(
+            accepted['query'].to_numpy(),
+            index=pd.MultiIndex.from_arrays([accepted['city'], accepted['candidate']])
+        )
+        source_index = pd.MultiIndex.from_arrays([source['city'], source['neighborhood']])
+        new_names = renames.reindex(source_index).to_numpy()
+        
+        source = source.copy()
+        source['neighborhood'] = np.where(pd.notna(new_names), new_names, source['neighborhood'].to_numpy())
+        return source
+    
+    def write_review(self, path):
+        """
+        Write every match sent to review (an empty file if there are none).
+        """
+        columns = ['source'] + DECISION_COLUMNS
+        review = pd.concat(self.review_rows, ignore_index=True) if self.review_rows else pd.DataFrame()
+        review.reindex(columns=columns).to_csv(path, index=False)
+        return len(review)
@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Resampling Inference for a Single Coefficient
+=============================================
+Wild-cluster bootstrap and permutation tests of one regression coefficient
+(by default airbnb_density in Model 1). With only five cities, clustered
+standard errors rest on five clusters and their t-test over-rejects, so the
+p-values here are computed from resampled t statistics instead.
+
+  wild        - Restricted wild-cluster bootstrap (WCR): the model is
+                re-estimated under H0 (coefficient = 0), and each replicate
+                multiplies every city's restricted residuals by one Webb
+                six-point weight. Statistic: clustered t.
+  permutation - Freedman-Lane permutation test: the restricted residuals are
+                shuffled across neighborhoods of the same city. Statistic:
+                HC1 t.
+
+City fixed effects are absorbed by within-demeaning and the other
+regressors are partialled out once (Frisch-Waugh-Lovell), so every
+replicate is a column of one weight or permutation matrix and a whole batch
+of replicates is solved with a few matrix products. For the wild bootstrap
+the products are at the city level: the replicate t statistics of a batch
+are (a' V) and (M V) for a G x B weight matrix V.
+
+Replicates are drawn in fixed-size batches, each from its own seed spawned
+from one SeedSequence, and batches are spread over worker processes. Batch
+results are consumed in order, so a given seed gives the same p-value for
+any number of workers, including when a run stops early because the
+confidence interval of the p-value is narrow enough.
+
+Author: Econometrics Project
+Date: 2026-10-16
+"""
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from estimation import COLLINEARITY_TOLERANCE, GROUP_COLUMN, MODELS, demean, design_column
+from export_formats import read_dataset
+
+
+# Webb (2014) six-point weights: +-sqrt(1/2), +-1, +-sqrt(3/2) with equal
+# probability. With G clusters they give 6^G distinct draws instead of the
+# 2^G of Rademacher weights (32 for five cities)
+WEBB_WEIGHTS = np.array([-np.sqrt(1.5), -1.0, -np.sqrt(0.5), np.sqrt(0.5), 1.0, np.sqrt(1.5)])
+
+DEFAULT_REPLICATES = 9999
+
+# Replicates per batch (the unit of work of a worker and of early stopping)
+BATCH_SIZE = 1000
+
+DEFAULT_SEED = 20251114
+
+# Normal quantile of the p-value's confidence interval (95%)
+P_VALUE_CI_Z = 1.959963984540054
+
+METHODS = ('wild', 'permutation')
+
+# Worker state, set once per process by _init_worker
+_STATE = {}
+
+
+class InferenceResult:
+    """
+    Outcome of a resampling test of one coefficient.
+    
+    Attributes:
+    -----------
+    method, term : str
+        Test method and tested regressor term
+    coef, t_stat : float
+        Estimated coefficient and its observed t statistic (clustered for
+        the wild bootstrap, HC1 for the permutation test)
+    p_value : float
+        Share of replicates with |t*| >= |t|
+    ci_low, ci_high : float
+        Wilson confidence interval of p_value given the replicates drawn
+    replicates : int
+        Replicates drawn
+    stopped_early : bool
+        Whether the run stopped before the requested replicates
+    """
+    
+    def __init__(self, method, term, coef, t_stat, p_value, ci_low, ci_high, replicates, stopped_early):
+        self.method = method
+        self.term = term
+        self.coef = coef
+        self.t_stat = t_stat
+        self.p_value = p_value
+        self.ci_low = ci_low
+        self.ci_high = ci_high
+        self.replicates = replicates
+        self.stopped_early = stopped_early
+    
+    def to_dict(self):
+        """
+        Result as a flat dict (one row of a results table).
+        """
+        return dict(vars(self))
+
+
+def p_value_interval(hits, replicates, z=P_VALUE_CI_Z):
+    """
+    Wilson score interval of a resampled p-value (hits out of replicates).
+    """
+    p = hits / replicates
+    denominator = 1 + z * z / replicates
+    center = (p + z * z / (2 * replicates)) / denominator
+    half_width = z * np.sqrt(p * (1 - p) / replicates + z * z / (4 * replicates ** 2)) / denominator
+    return max(float(center - half_width), 0.0), min(float(center + half_width), 1.0)
+
+
+def prepare_test(df, depvar, regressors, term, group=GROUP_COLUMN):
+    """
+    Reduce a model to the quantities every replicate reuses.
+    
+    Rows are dropped listwise as in estimation.estimate() and sorted by
+    group, then the group effects are absorbed and the other regressors are
+    partialled out of the tested term and of the dependent variable.
+    
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Dataset
+    depvar : str
+        Dependent variable
+    regressors : list of str
+        Regressor terms (as in estimation.MODELS)
+    term : str
+        Tested term, one of regressors
+    group : str
+        Column absorbed as fixed effects, used as clusters and as
+        permutation strata
+        
+    Returns:
+    --------
+    dict
+        Arrays of the reduced problem and the observed coefficient and t
+        statistics
+    """
+    if term not in regressors:
+        raise ValueError(f"{term!r} is not a regressor of the model")
+    
+    y = df[depvar].to_numpy(dtype=float)
+    X = np.column_stack([design_column(df, t) for t in regressors])
+    groups = df[group].to_numpy(dtype=object)
+    keep = np.isfinite(y) & np.isfinite(X).all(axis=1) & pd.notna(groups)
+    codes, labels = pd.factorize(groups[keep])
+    order = np.argsort(codes, kind='stable')
+    codes, n_groups = codes[order], len(labels)
+    y = demean(y[keep][order][:, None], codes, n_groups)[:, 0]
+    X = demean(X[keep][order], codes, n_groups)
+    n = len(y)
+    
+    # Drop terms collinear with earlier ones, as estimate() does
+    R = np.linalg.qr(X, mode='r')
+    scale = np.linalg.norm(X, axis=0)
+    kept = np.abs(np.diag(R)) > COLLINEARITY_TOLERANCE * np.maximum(scale, 1.0)
+    position = regressors.index(term)
+    if not kept[position]:
+        raise ValueError(f"{term!r} is collinear with the other regressors or the fixed effects")
+    position = int(kept[:position].sum())
+    X = X[:, kept]
+    k = X.shape[1]
+    
+    A_inv = np.linalg.inv(X.T @ X)
+    controls = np.delete(X, position, axis=1)
+    
+    def residualize(v):
+        if controls.shape[1] == 0:
+            return v
+        return v - controls @ np.linalg.lstsq(controls, v, rcond=None)[0]
+    
+    x_tilde = residualize(X[:, position])
+    restricted = residualize(y)
+    xx = float(x_tilde @ x_tilde)
+    
+    # K = slopes + (groups - 1) dummies + constant, as in estimate()
+    df_resid = n - k - n_groups
+    hc1_factor = n / df_resid
+    cluster_factor = n_groups / (n_groups - 1) * (n - 1) / df_resid
+    
+    coef = float(x_tilde @ y) / xx
+    residuals = y - X @ (A_inv @ (X.T @ y))
+    cluster_scores = np.bincount(codes, weights=x_tilde * residuals, minlength=n_groups)
+    t_cluster = coef / (np.sqrt(cluster_factor * (cluster_scores @ cluster_scores)) / xx)
+    t_hc1 = coef / (np.sqrt(hc1_factor * ((x_tilde * residuals) ** 2).sum()) / xx)
+    
+    # City-level pieces of the wild bootstrap: with restricted residuals u
+    # scaled by v_g, the tested coefficient is (a' v) / xx and the cluster
+    # scores of the unrestricted refit are M v
+    a = np.bincount(codes, weights=x_tilde * restricted, minlength=n_groups)
+    B = np.stack([np.bincount(codes, weights=x_tilde * X[:, j], minlength=n_groups) for j in range(k)], axis=1)
+    C = np.stack([np.bincount(codes, weights=X[:, j] * restricted, minlength=n_groups) for j in range(k)], axis=1)
+    M = np.diag(a) - B @ A_inv @ C.T
+    
+    return {
+        'codes': codes, 'n_groups': n_groups, 'nobs': n, 'X': X, 'A_inv': A_inv,
+        'x_tilde': x_tilde, 'restricted': restricted, 'xx': xx,
+        'hc1_factor': hc1_factor, 'cluster_factor': cluster_factor,
+        'a': a, 'M': M, 'coef': coef, 't_cluster': t_cluster, 't_hc1': t_hc1,
+    }
+
+
+def wild_cluster_t(problem, weights):
+    """
+    Clustered t statistics of a batch of wild-bootstrap replicates.
+    
+    Parameters:
+    -----------
+    problem : dict
+        As returned by prepare_test
+    weights : np.ndarray
+        G x B matrix of cluster weights, one column per replicate
+    """
+    numerator = problem['a'] @ weights
+    scores = problem['M'] @ weights
+    return numerator / np.sqrt(problem['cluster_factor'] * (scores * scores).sum(axis=0))
+
+
+def permutation_t(problem, permutations):
+    """
+    HC1 t statistics of a batch of Freedman-Lane permutation replicates.
+    
+    Parameters:
+    -----------
+    problem : dict
+        As returned by prepare_test
+    permutations : np.ndarray
+        B x n matrix of row indices, one permutation per row
+    """
+    X, x_tilde = problem['X'], problem['x_tilde']
+    # n x B matrix of permuted restricted residuals; the restricted fit is
+    # orthogonal to x_tilde, so it drops out of the numerator
+    U = problem['restricted'][permutations.T]
+    numerator = x_tilde @ U
+    E = U - X @ (problem['A_inv'] @ (X.T @ U))
+    scores = x_tilde[:, None] * E
+    return numerator / np.sqrt(problem['hc1_factor'] * (scores * scores).sum(axis=0))
+
+
+def draw_batch(problem, method, seed, size):
+    """
+    Draw one batch of replicates and return their t statistics.
+    """
+    rng = np.random.default_rng(seed)
+    if method == 'wild':
+        weights = WEBB_WEIGHTS[rng.integers(0, len(WEBB_WEIGHTS), size=(problem['n_groups'], size))]
+        return wild_cluster_t(problem, weights)
+    # Sorting group code + uniform noise shuffles rows within each group
+    # (rows are sorted by group)
+    keys = problem['codes'][None, :] + rng.random((size, problem['nobs']))
+    return permutation_t(problem, np.argsort(keys, axis=1))
+
+
+def _init_worker(problem):
+    """
+    Store the reduced problem in a worker process.
+    """
+    _STATE['problem'] = problem
+
+
+def _draw_batch(task):
+    """
+    Draw one batch in a worker (task = (method, seed, size)).
+    """
+    return draw_batch(_STATE['problem'], *task)
+
+
+def resampling_test(df, depvar, regressors, term, method='wild', replicates=DEFAULT_REPLICATES,
+                    seed=DEFAULT_SEED, tolerance=None, group=GROUP_COLUMN, max_workers=None):
+    """
+    Test H0: coefficient of term = 0 by wild-cluster bootstrap or permutation.
+    
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Dataset
+    depvar : str
+        Dependent variable
+    regressors : list of str
+        Regressor terms
+    term : str
+        Tested term
+    method : str
+        'wild' or 'permutation'
+    replicates : int
+        Maximum number of replicates
+    seed : int
+        Seed of the SeedSequence the batch seeds are spawned from
+    tolerance : float, optional
+        Stop once the half-width of the p-value's confidence interval is at
+        most this (checked after every batch; default: draw all replicates)
+    group : str
+        Fixed effects, cluster and permutation-strata column
+    max_workers : int, optional
+        Worker processes (default: CPU count; 1 = run in this process)
+        
+    Returns:
+    --------
+    InferenceResult
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method!r} (expected one of {', '.join(METHODS)})")
+    
+    problem = prepare_test(df, depvar, regressors, term, group=group)
+    observed = abs(problem['t_cluster'] if method == 'wild' else problem['t_hc1'])
+    
+    sizes = [BATCH_SIZE] * (replicates // BATCH_SIZE)
+    if replicates % BATCH_SIZE:
+        sizes.append(replicates % BATCH_SIZE)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(method, batch_seed, size) for batch_seed, size in zip(seeds, sizes)]
+    
+    hits = drawn = 0
+    
+    def consume(t_stats):
+        nonlocal hits, drawn
+        hits += int((np.abs(t_stats) >= observed).sum())
+        drawn += len(t_stats)
+        if tolerance is None:
+            return False
+        low, high = p_value_interval(hits, drawn)
+        return (high - low) / 2 <= tolerance
+    
+    if max_workers is None:
+        max_workers = min(len(tasks), os.cpu_count() or 1)
+    if max_workers <= 1:
+        for task in tasks:
+            if consume(draw_batch(problem, *task)):
+                break
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(problem,)) as executor:
+            # Keep a few batches in flight and consume them in order
+            pending = [executor.submit(_draw_batch, task) for task in tasks[:2 * max_workers]]
+            queued = len(pending)
+            while pending:
+                if consume(pending.pop(0).result()):
+                    for future in pending:
+                        future.cancel()
+                    break
+                if queued < len(tasks):
+                    pending.append(executor.submit(_draw_batch, tasks[queued]))
+                    queued += 1
+    stopped_early = drawn < replicates
+    
+    low, high = p_value_interval(hits, drawn)
+    return InferenceResult(
+        method=method,
+        term=term,
+        coef=problem['coef'],
+        t_stat=float(problem['t_cluster'] if method == 'wild' else problem['t_hc1']),
+        p_value=hits / drawn,
+        ci_low=low,
+        ci_high=high,
+        replicates=drawn,
+        stopped_early=stopped_early,
+    )
+
+
+def main(argv=None):
+    """
+    Run resampling tests of one coefficient of a model on an exported dataset.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('dataset', help="Exported dataset (e.g. data/airbnb_neighborhood_panel.feather)")
+    parser.add_argument('--model', default='model_1', choices=sorted(MODELS),
+                        help="Model from estimation.MODELS (default: model_1)")
+    parser.add_argument('--term', default='airbnb_density', help="Tested regressor (default: airbnb_density)")
+    parser.add_argument('--method', default='both', choices=METHODS + ('both',),
+                        help="Test to run (default: both)")
+    parser.add_argument('--replicates', type=int, default=DEFAULT_REPLICATES,
+                        help=f"Maximum replicates (default: {DEFAULT_REPLICATES})")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help="Random seed")
+    parser.add_argument('--tolerance', type=float, default=None,
+                        help="Stop once the p-value's 95%% interval half-width is at most this")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Worker processes (default: CPU count; 1 = serial)")
+    args = parser.parse_args(argv)
+    
+    df = read_dataset(args.dataset)
+    model = MODELS[args.model]
+    methods = METHODS if args.method == 'both' else (args.method,)
+    
+    print(f"{args.model}: {model['depvar']} on {', '.join(model['regressors'])}; H0: {args.term} = 0")
+    for method in methods:
+        result = resampling_test(df, model['depvar'], model['regressors'], args.term, method=method,
+                                 replicates=args.replicates, seed=args.seed, tolerance=args.tolerance,
+                                 max_workers=args.workers)
+        stopped = " (stopped early)" if result.stopped_early else ""
+        print(f"   + {method:<12} coef {result.coef:.4g}, t {result.t_stat:.3f}, "
+              f"p = {result.p_value:.4f} [{result.ci_low:.4f}, {result.ci_high:.4f}], "
+              f"{result.replicates} replicates{stopped}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""
+Columnar Cache of Parsed Input Files
+====================================
+Stores column-pruned, key-normalized copies of the raw CSV inputs as Arrow
+(Feather v2) files so warm runs skip CSV parsing entirely and memory-map the
+cached columns instead.
+
+Inputs too large to hold in memory at once (listings files) are cached as
+Arrow streams instead, written and read back one record batch per chunk.
+
+Each cache entry is keyed by the source path and the kind of copy stored,
+and is validated against the source file's size, modification time and
+SHA-256 content hash, and against a digest of the code that built it (see
+stage_graph.code_digest). A changed source, or a change to the parsing and
+normalization functions, is re-parsed automatically.
+
+Author: Econometrics Project
+Date: 2026-10-16
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+from cache_layout import file_fingerprint, file_sha256
+from stage_graph import code_digest
+
+
+# Bump when the layout of cached frames changes so old entries are rebuilt
+CACHE_FORMAT_VERSION = 2
+
+
+def _arrow():
+    """
+    Import pyarrow on first use, so importing this module stays cheap.
+    
+    Returns:
+    --------
+    tuple
+        (pyarrow, pyarrow.feather), or (None, None) if pyarrow is not installed
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.feather as feather
+    except ImportError:  # pragma: no cover - optional dependency
+        return None, None
+    return pa, feather
+
+
+class InputCache:
+    """
+    Cache of parsed input frames stored as memory-mappable Arrow files.
+    
+    Parameters:
+    -----------
+    cache_dir : str
+        Directory holding cached frames and their manifests
+    enabled : bool
+        If False, every load parses the source and nothing is written
+    """
+    
+    def __init__(self, cache_dir, enabled=True):
+        self.cache_dir = Path(cache_dir)
+        _, feather = _arrow() if enabled else (None, None)
+        self.enabled = enabled and feather is not None
+        self.events = []
+        
+        if enabled and feather is None:
+            print("WARNING: pyarrow is not installed - input cache disabled")
+    
+    def __getstate__(self):
+        # Copies sent to worker processes start with an empty event log; the
+        # workers return their own events to the parent
+        state = dict(self.__dict__)
+        state['events'] = []
+        return state
+    
+    def _entry_paths(self, source_path, kind):
+        """
+        Return (data_path, manifest_path) for a source file and copy kind.
+        """
+        key = f"{Path(source_path).resolve()}|{kind}"
+        name = f"{Path(source_path).stem}-{hashlib.sha1(key.encode()).hexdigest()[:12]}"
+        return self.cache_dir / f"{name}.arrow", self.cache_dir / f"{name}.json"
+    
+    def _check(self, source_path, kind, code):
+        """
+        Validate a cache entry against the source file and build code digest.
+        
+        Returns:
+        --------
+        tuple
+            (is_hit, reason, fingerprint) where fingerprint includes the
+            content hash whenever it had to be computed
+        """
+        data_path, manifest_path = self._entry_paths(source_path, kind)
+        fingerprint = file_fingerprint(source_path)
+        
+        if not manifest_path.exists() or not data_path.exists():
+            return False, 'not cached', fingerprint
+        
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        
+        if manifest.get('version') != CACHE_FORMAT_VERSION or manifest.get('kind') != kind:
+            return False, 'cache format changed', fingerprint
+        if manifest['code'] != code:
+            return False, 'code changed', fingerprint
+        if manifest['size'] != fingerprint['size']:
+            return False, 'source changed', fingerprint
+        if manifest['mtime_ns'] == fingerprint['mtime_ns']:
+            return True, 'unchanged', dict(fingerprint, sha256=manifest['sha256'])
+        
+        # Touched but possibly identical: fall back to the content hash
+        fingerprint['sha256'] = file_sha256(source_path)
+        if fingerprint['sha256'] != manifest['sha256']:
+            return False, 'source changed', fingerprint
+        
+        self._write_manifest(manifest_path, source_path, kind, code, fingerprint, manifest['rows'])
+        return True, 'content unchanged', fingerprint
+    
+    def _write_manifest(self, manifest_path, source_path, kind, code, fingerprint, rows):
+        """
+        Atomically write the manifest describing one cache entry.
+        """
+        manifest = {
+            'version': CACHE_FORMAT_VERSION,
+            'source': str(Path(source_path).resolve()),
+            'kind': kind,
+            'code': code,
+            'size': fingerprint['size'],
+            'mtime_ns': fingerprint['mtime_ns'],
+            'sha256': fingerprint['sha256'],
+            'rows': rows,
+        }
+        tmp_path = manifest_path.with_suffix(f'.json.tmp{os.getpid()}')
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, manifest_path)
+    
+    def load(self, source_path, kind, build, quiet=False):
+        """
+        Load a parsed copy of source_path, building and caching it on a miss.
+        
+        Parameters:
+        -----------
+        source_path : str
+            Raw input file
+        kind : str
+            Identifies which pruned/normalized copy is stored (e.g. the
+            columns kept), so different readers of one file do not collide
+        build : callable
+            build(source_path) -> pd.DataFrame, used on a cache miss; its
+            code digest is part of the entry, so editing it (or anything it
+            calls) rebuilds the entry
+        quiet : bool
+            Record the hit/miss without printing it (e.g. when loading from
+            several threads at once)
+            
+        Returns:
+        --------
+        pd.DataFrame
+            Parsed (and possibly cached) frame
+        """
+        name = Path(source_path).name
+        
+        if not self.enabled:
+            return build(source_path)
+        _, feather = _arrow()
+        
+        code = code_digest(build)
+        is_hit, reason, fingerprint = self._check(source_path, kind, code)
+        data_path, manifest_path = self._entry_paths(source_path, kind)
+        
+        if is_hit:
+            df = feather.read_table(data_path, memory_map=True).to_pandas()
+            if not quiet:
+                print(f"   + Cache hit: {name} ({reason})")
+            self.events.append(('hit', name))
+            return df
+        
+        if not quiet:
+            print(f"   + Cache miss: {name} ({reason})")
+        self.events.append(('miss', name))
+        df = build(source_path)
+        
+        if 'sha256' not in fingerprint:
+            fingerprint['sha256'] = file_sha256(source_path)
+        
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = data_path.with_suffix(f'.arrow.tmp{os.getpid()}')
+        try:
+            feather.write_feather(df.reset_index(drop=True), tmp_path, compression='uncompressed')
+        except (TypeError, ValueError) as e:
+            # Mixed-type object columns cannot be stored as Arrow; just don't cache
+            print(f"   WARNING: Could not cache {name}: {e}")
+            tmp_path.unlink(missing_ok=True)
+            return df
+        os.replace(tmp_path, data_path)
+        self._write_manifest(manifest_path, source_path, kind, code, fingerprint, len(df))
+        
+        return df
+    
+    def load_chunks(self, source_path, kind, build_chunks, quiet=False):
+        """
+        Stream a parsed copy of source_path chunk by chunk, building and
+        caching it on a miss.
+        
+        On a miss, the chunks of build_chunks(source_path) are yielded as
+        they are parsed and appended to the cache entry as record batches;
+        on a hit, the batches are read back from the entry one at a time.
+        Either way only one chunk is held in memory at a time.
+        
+        Parameters:
+        -----------
+        source_path : str
+            Raw input file
+        kind : str
+            Identifies which pruned/normalized copy is stored (see load())
+        build_chunks : callable
+            build_chunks(source_path) -> iterable of pd.DataFrame, used on a
+            cache miss; every chunk must have the same columns (its code
+            digest is part of the entry, as in load())
+        quiet : bool
+            Record the hit/miss without printing it
+            
+        Yields:
+        -------
+        pd.DataFrame
+            Parsed (and possibly cached) chunks
+        """
+        name = Path(source_path).name
+        
+        if not self.enabled:
+            yield from build_chunks(source_path)
+            return
+        pa, _ = _arrow()
+        
+        code = code_digest(build_chunks)
+        is_hit, reason, fingerprint = self._check(source_path, kind, code)
+        data_path, manifest_path = self._entry_paths(source_path, kind)
+        
+        if is_hit:
+            if not quiet:
+                print(f"   + Cache hit: {name} ({reason})")
+            self.events.append(('hit', name))
+            with pa.OSFile(str(data_path)) as source:
+                for batch in pa.ipc.open_stream(source):
+                    yield batch.to_pandas()
+            return
+        
+        if not quiet:
+            print(f"   + Cache miss: {name} ({reason})")
+        self.events.append(('miss', name))
+        
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = data_path.with_suffix(f'.arrow.tmp{os.getpid()}')
+        writer = schema = None
+        caching = True
+        rows = 0
+        try:
+            for chunk in build_chunks(source_path):
+                if caching:
+                    try:
+                        table = pa.Table.from_pandas(chunk.reset_index(drop=True), preserve_index=False)
+                        if writer is None:
+                            # Categories differ between chunks: store them as
+                            # dictionaries wide enough for any chunk
+                            schema = pa.schema(
+                                [field.with_type(pa.dictionary(pa.int32(), field.type.value_type))
+                                 if pa.types.is_dictionary(field.type) else field for field in table.schema],
+                                metadata=table.schema.metadata
+                            )
+                            writer = pa.ipc.new_stream(str(tmp_path), schema)
+                        writer.write_table(table.cast(schema))
+                    except (TypeError, ValueError, pa.ArrowException) as e:
+                        # Mixed-type or drifting columns cannot be stored; just don't cache
+                        print(f"   WARNING: Could not cache {name}: {e}")
+                        caching = False
+                rows += len(chunk)
+                yield chunk
+            
+            if caching and writer is not None:
+                writer.close()
+                if 'sha256' not in fingerprint:
+                    fingerprint['sha256'] = file_sha256(source_path)
+                os.replace(tmp_path, data_path)
+                self._write_manifest(manifest_path, source_path, kind, code, fingerprint, rows)
+        finally:
+            # Not stored (failed, empty or abandoned part way): drop the temp file
+            if writer is not None and tmp_path.exists():
+                writer.close()
+                tmp_path.unlink()
+    
+    def clear(self):
+        """
+        Delete every cached frame and manifest.
+        """
+        if self.cache_dir.exists():
+            shutil.rmtree(self.cache_dir)
+        print(f"+ Cleared input cache: {self.cache_dir}")
+    
+    def summary(self):
+        """
+        Return a one-line hit/miss summary of this run.
+        """
+        hits = sum(1 for event, _ in self.events if event == 'hit')
+        misses = sum(1 for event, _ in self.events if event == 'miss')
+        return f"{hits} hits, {misses} misses"
@@ -0,0 +1,410 @@
+"""
+Pipeline Instrumentation
+========================
+Structured timing, memory and row-count events for pipeline stages.
+
+Code marks a unit of work with span(), and attaches figures to the
+innermost open span with record():
+
+    with span('merge_all_datasets', rows_in=len(airbnb_df)):
+        ...
+        record(rows_out=len(merged), match_rates={'rent': 0.97})
+
+Instrumentation is off unless enable() was called; span() then returns a
+shared no-op object and record() returns at once, so instrumented code
+costs one function call per span.
+
+When enabled, every closed span becomes one JSON line in the events file:
+name, parent, wall and CPU seconds, resident set size at the start, peak
+and delta (sampled on a background thread every SAMPLE_INTERVAL seconds;
+process-wide peak where the current RSS cannot be read) and the recorded
+fields. The same spans can be written as a Chrome trace (chrome://tracing,
+Perfetto, speedscope), and spans named in profile are sampled by a
+statistical profiler whose stacks are written in folded format
+(flamegraph.pl, speedscope), one <name>.folded file per span name.
+
+Worker processes record into a list with collecting() and hand it to the
+parent, which adds it to its log with emit().
+
+Author: Econometrics Project
+Date: 2026-10-16
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+
+# Seconds between RSS (and profiler) samples
+SAMPLE_INTERVAL = 0.005
+
+# Stack depth kept by the sampling profiler
+PROFILE_DEPTH = 64
+
+_RECORDER = None
+
+
+def current_rss():
+    """
+    Resident set size of this process in bytes (None where unavailable).
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def max_rss():
+    """
+    Peak resident set size of this process so far in bytes (None where unavailable).
+    """
+    try:
+        import resource
+    except ImportError:  # pragma: no cover - not available on Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _mb(value):
+    """
+    Bytes to MB, rounded (None stays None).
+    """
+    return round(value / 2**20, 1) if value is not None else None
+
+
+class _NullSpan:
+    """
+    Span returned while instrumentation is disabled.
+    """
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+    
+    def set(self, **fields):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """
+    One timed unit of work; use through span().
+    """
+    
+    def __init__(self, recorder, name, fields):
+        self.recorder = recorder
+        self.name = name
+        self.fields = fields
+        self.parent = None
+    
+    def set(self, **fields):
+        """
+        Attach figures (rows, match rates, ...) to the span.
+        """
+        self.fields.update(fields)
+    
+    def __enter__(self):
+        self.thread = threading.get_ident()
+        self.rss_start = self.rss_peak = current_rss()
+        self.recorder._open(self)
+        self.start = time.time()
+        self.cpu_start = time.process_time()
+        self.wall_start = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.wall_start
+        cpu = time.process_time() - self.cpu_start
+        rss_end = current_rss()
+        self.recorder._close(self)
+        
+        if rss_end is None:
+            rss_delta, rss_peak = None, max_rss()
+        else:
+            rss_delta, rss_peak = rss_end - self.rss_start, max(self.rss_peak, rss_end)
+        event = {
+            'event': 'span',
+            'name': self.name,
+            'parent': self.parent,
+            'pid': os.getpid(),
+            'thread': self.thread,
+            'start': round(self.start, 6),
+            'wall_s': round(wall, 6),
+            'cpu_s': round(cpu, 6),
+            'rss_start_mb': _mb(self.rss_start),
+            'rss_peak_mb': _mb(rss_peak),
+            'rss_delta_mb': _mb(rss_delta),
+            'status': 'ok' if exc_type is None else f"error: {exc_type.__name__}",
+        }
+        event.update(self.fields)
+        self.recorder.emit([event])
+        return False
+
+
+class Recorder:
+    """
+    Collects span events and writes them out.
+    
+    Parameters:
+    -----------
+    events_path : str, optional
+        JSON-lines file of events (appended to as spans close)
+    trace_path : str, optional
+        Chrome trace file (written on close)
+    profile : iterable of str
+        Span names to run the sampling profiler on
+    profile_dir : str, optional
+        Directory for the folded stacks (default: next to the events or
+        trace file)
+    """
+    
+    def __init__(self, events_path=None, trace_path=None, profile=(), profile_dir=None):
+        self.events_path = events_path
+        self.trace_path = trace_path
+        self.profile = set(profile)
+        default_dir = Path(events_path or trace_path or '.').parent
+        self.profile_dir = Path(profile_dir) if profile_dir else default_dir
+        self.events = []
+        self.stacks = {}
+        self._lock = threading.Lock()
+        self._open_spans = []
+        self._local = threading.local()
+        self._stop = threading.Event()
+        self._events_file = None
+        if events_path is not None:
+            Path(events_path).parent.mkdir(parents=True, exist_ok=True)
+            self._events_file = open(events_path, 'a')
+        self._sampler = threading.Thread(target=self._sample, name='instrumentation-sampler', daemon=True)
+        self._sampler.start()
+    
+    def _stack(self):
+        """
+        Spans open on the calling thread, innermost last.
+        """
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+    
+    def _open(self, span):
+        stack = self._stack()
+        span.parent = stack[-1].name if stack else None
+        stack.append(span)
+        with self._lock:
+            self._open_spans.append(span)
+    
+    def _close(self, span):
+        self._stack().pop()
+        with self._lock:
+            self._open_spans.remove(span)
+    
+    def current(self):
+        """
+        Innermost open span of the calling thread (None if there is none).
+        """
+        stack = self._stack()
+        return stack[-1] if stack else None
+    
+    def _sample(self):
+        """
+        Background loop: track each open span's peak RSS and sample the
+        stacks of profiled spans.
+        """
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            with self._lock:
+                spans = list(self._open_spans)
+            if not spans:
+                continue
+            rss = current_rss()
+            if rss is not None:
+                for span in spans:
+                    if span.rss_peak is not None and rss > span.rss_peak:
+                        span.rss_peak = rss
+            profiled = [span for span in spans if span.name in self.profile]
+            if profiled:
+                frames = sys._current_frames()
+                for span in profiled:
+                    frame = frames.get(span.thread)
+                    if frame is not None:
+                        self.stacks.setdefault(span.name, Counter())[_fold(frame)] += 1
+    
+    def emit(self, events):
+        """
+        Add finished events (from this process or a worker's collecting()).
+        """
+        with self._lock:
+            self.events.extend(events)
+            if self._events_file is not None:
+                for event in events:
+                    self._events_file.write(json.dumps(event, default=str) + '\n')
+                self._events_file.flush()
+    
+    def close(self):
+        """
+        Stop sampling and write the trace and profiles.
+        """
+        self._stop.set()
+        self._sampler.join()
+        if self._events_file is not None:
+            self._events_file.close()
+        if self.trace_path is not None:
+            write_chrome_trace(self.events, self.trace_path)
+        for name, counts in self.stacks.items():
+            self.profile_dir.mkdir(parents=True, exist_ok=True)
+            path = self.profile_dir / f"{name.replace('/', '_')}.folded"
+            with open(path, 'w') as f:
+                for stack, count in counts.most_common():
+                    f.write(f"{stack} {count}\n")
+
+
+def _fold(frame):
+    """
+    Frame stack in folded form: 'outer;...;inner' with file:function names.
+    """
+    names = []
+    while frame is not None and len(names) < PROFILE_DEPTH:
+        code = frame.f_code
+        names.append(f"{Path(code.co_filename).name}:{code.co_name}")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+def write_chrome_trace(events, path):
+    """
+    Write span events as a Chrome trace (complete 'X' events, microseconds).
+    
+    Parameters:
+    -----------
+    events : list of dict
+        Span events
+    path : str
+        Output JSON path
+    """
+    origin = min((event['start'] for event in events), default=0.0)
+    skip = {'event', 'name', 'pid', 'thread', 'start', 'wall_s'}
+    trace = {
+        'traceEvents': [
+            {
+                'name': event['name'],
+                'cat': 'pipeline',
+                'ph': 'X',
+                'ts': round((event['start'] - origin) * 1e6),
+                'dur': round(event['wall_s'] * 1e6),
+                'pid': event['pid'],
+                'tid': event['thread'],
+                'args': {key: value for key, value in event.items() if key not in skip},
+            }
+            for event in events
+        ],
+        'displayTimeUnit': 'ms',
+    }
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = Path(path).with_name(f".{Path(path).name}.tmp{os.getpid()}")
+    with open(tmp_path, 'w') as f:
+        json.dump(trace, f, default=str)
+    os.replace(tmp_path, path)
+
+
+def enable(events_path=None, trace_path=None, profile=(), profile_dir=None):
+    """
+    Start recording spans in this process (see Recorder for the arguments).
+    """
+    global _RECORDER
+    disable()
+    _RECORDER = Recorder(events_path, trace_path, profile, profile_dir)
+    return _RECORDER
+
+
+def disable():
+    """
+    Stop recording and write the outputs of the active recorder, if any.
+    """
+    global _RECORDER
+    recorder, _RECORDER = _RECORDER, None
+    if recorder is not None:
+        recorder.close()
+
+
+def enabled():
+    """
+    Whether spans are being recorded in this process.
+    """
+    return _RECORDER is not None
+
+
+def span(name, **fields):
+    """
+    Context manager timing a unit of work (a no-op while disabled).
+    
+    Parameters:
+    -----------
+    name : str
+        Span name, e.g. the function or stage name
+    **fields
+        Figures known up front, e.g. rows_in
+    """
+    if _RECORDER is None:
+        return _NULL_SPAN
+    return Span(_RECORDER, name, dict(fields))
+
+
+def record(**fields):
+    """
+    Attach figures to the innermost open span (a no-op while disabled).
+    """
+    if _RECORDER is None:
+        return
+    current = _RECORDER.current()
+    if current is not None:
+        current.set(**fields)
+
+
+class collecting:
+    """
+    Record spans into a list, e.g. in a worker process whose events are sent
+    back to the parent and added there with emit().
+    
+    Only the spans' events are collected; the sampling profiler runs in the
+    process that called enable().
+    
+    Parameters:
+    -----------
+    active : bool
+        Whether to record at all (pass enabled() from the parent)
+    """
+    
+    def __init__(self, active=True):
+        self.active = active
+        self.events = []
+    
+    def __enter__(self):
+        global _RECORDER
+        if self.active:
+            self._previous = _RECORDER
+            _RECORDER = Recorder()
+        return self.events
+    
+    def __exit__(self, *exc):
+        global _RECORDER
+        if self.active:
+            recorder, _RECORDER = _RECORDER, self._previous
+            recorder.close()
+            self.events.extend(recorder.events)
+        return False
+
+
+def emit(events):
+    """
+    Add events recorded elsewhere (see collecting) to the active recorder.
+    """
+    if _RECORDER is not None and events:
+        _RECORDER.emit(events)
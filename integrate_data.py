@@ -11,13 +11,124 @@ Author: Econometrics Project
 Date: 2025-11-15
 """
 
+import contextlib
+import io
+import os
+import sys
 import pandas as pd
 import numpy as np
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 import warnings
+
+from listings_reader import (
+    COORDINATE_COLUMNS, detect_neighborhood_column, available_columns, iter_listing_chunks
+)
+from listing_features import (
+    LISTING_FEATURES, feature_columns, feature_names, parse_feature_columns, aggregate_listing_features
+)
+from text_keys import normalize_keys
+from stage_graph import StageGraph, code_digest
+from instrumentation import collecting, emit, record, span, enabled as instrumentation_enabled
+from keyed_merge import keyed_left_join, count_matched
+from crosswalk import crosswalk_files, load_crosswalks
+from fuzzy_match import NameMatcher
+from spatial_join import load_spatial_index
+from quality_report import CORE_COLUMNS, build_report, format_report, write_report_json
+from export_formats import (
+    DEFAULT_EXPORT_FORMATS, FORMAT_NAMES, export_paths, output_size, write_formats
+)
+from activity_measures import ACTIVITY_MEASURES, activity_names, aggregate_activity, find_activity_files
+from derived_variables import DERIVED_VARIABLES, derive_variables, variable_labels
+from estimation import MODELS, run_models, results_table
+from panel_store import PanelStore, discover_snapshots, partition_key
+from source_loader import (
+    MANIFEST_NAME, discover_source_files, load_source_directory, collapse_sources, read_source_file,
+    rename_source_columns
+)
+from validation import COLUMN_RULES, SCHEMAS, Validator
+
 warnings.filterwarnings('ignore')
 
 
+# Supplementary data files, relative to the data directory
+SUPPLEMENTARY_FILES = {
+    'demographics': "Census Demographics/neighborhood_demographics_acs_2023.csv",
+    'rent': "Rent Data/neighborhood_median_rent_2024.csv",
+    'housing': "Housing Units/neighborhood_housing_units.csv",
+    'tourism': "Tourist Area Indicator/neighborhood_tourist_classification.csv",
+}
+
+# Boundary polygons (<listings file prefix>.geojson or .shp, e.g.
+# austin.geojson); listings of a city with a boundary file are assigned to
+# its polygons by coordinates instead of by their neighbourhood label
+BOUNDARY_DIR = "Boundaries"
+
+# Crosswalk tables (ZIP/district/alias -> neighborhood) applied to the
+# supplementary files before merging and to the data collection round files
+# before they fill gaps; see crosswalk.py for the format
+CROSSWALK_DIR = "Crosswalks"
+
+# Dated listings snapshots for panel mode (<listings file prefix>_listings_
+# <YYYY-MM-DD>.csv, e.g. austin_listings_2024-09-15.csv); see panel_store.py
+SNAPSHOT_DIR = "Airbnb Listings Data/Snapshots"
+
+# Panel variables: name -> (operation, column), computed per neighborhood
+# against the previous quarter ('lag' = previous value, 'diff' = change);
+# missing when the neighborhood has no row for the previous quarter. Only
+# columns built from the snapshots vary by period: the covariates (rent,
+# income, ...) come from the cross-section, so their lags would just repeat
+# the current value
+PANEL_VARIABLES = {
+    'lag_airbnb_density': ('lag', 'airbnb_density'),
+    'd_airbnb_density': ('diff', 'airbnb_density'),
+    'd_log_airbnb_density': ('diff', 'log_airbnb_density'),
+}
+
+
+# Final column order (columns that do not exist are skipped)
+FINAL_COLUMNS = [
+    'city',
+    'neighborhood',
+    'median_rent',
+    'airbnb_count',
+    'housing_units',
+    'airbnb_density',
+    *feature_names(LISTING_FEATURES),
+    *activity_names(),
+    'median_household_income',
+    'population_density',
+    'pct_college',
+    'tourist_area',
+    'log_rent',
+    'log_income',
+    'log_airbnb_density'
+]
+
+# Columns filled from the data collection rounds
+FILL_COLUMNS = [
+    'median_rent',
+    'housing_units',
+    'median_household_income',
+    'population_density',
+    'pct_college',
+    'tourist_area'
+]
+
+# Source category directories and the columns each supplies, in fill
+# priority order. Every CSV in a directory is loaded, ordered by the
+# directory's sources.json manifest (see source_loader).
+SOURCE_DIRECTORIES = {
+    'demographics': (
+        "Census Demographics",
+        ['median_household_income', 'population_density', 'pct_college', 'housing_units']
+    ),
+    'rent': ("Rent Data", ['median_rent']),
+    'housing': ("Housing Units", ['housing_units']),
+    'tourism': ("Tourist Area Indicator", ['tourist_area']),
+}
+
+
 def standardize_text(text):
     """
     Standardize text: lowercase, strip whitespace, collapse multiple spaces.
@@ -40,69 +151,289 @@ def standardize_text(text):
     return text
 
 
-def load_and_process_airbnb_file(file_path, city_name):
+def _polygon_labeler(boundary_file, cache=None):
     """
-    Load a single Airbnb listings file and count listings per neighborhood.
+    Load a boundary file and return (index, locate), where locate maps a
+    chunk with coordinate columns to the standardized label of the polygon
+    containing each listing (None outside every polygon).
+    """
+    cache_dir = cache.cache_dir if cache is not None and cache.enabled else None
+    index = load_spatial_index(boundary_file, cache_dir=cache_dir)
+    polygon_labels = normalize_keys(pd.Series(index.labels, dtype=object)).to_numpy(dtype=object)
+    
+    def locate(chunk):
+        polygons = index.locate(chunk['longitude'].to_numpy(dtype=float),
+                                chunk['latitude'].to_numpy(dtype=float))
+        return pd.Series(np.where(polygons >= 0, polygon_labels[polygons], None))
+    
+    return index, locate
+
+
+def aggregate_listings(file_path, features=LISTING_FEATURES, boundary_file=None, cache=None):
+    """
+    Aggregate a listings file to neighborhood counts and features in one pass.
+    
+    Only the neighborhood column (or the coordinates) and the columns the
+    feature spec needs are read, chunk by chunk.
     
     Parameters:
     -----------
     file_path : str
         Path to Airbnb CSV file
-    city_name : str
-        Name of the city
+    features : list of dict
+        Feature spec (see listing_features.LISTING_FEATURES)
+    boundary_file : str, optional
+        Boundary polygons; if given, listings are grouped by the polygon
+        containing their coordinates instead of their neighbourhood label
+    cache : InputCache, optional
+        Columnar cache of parsed inputs (also holds the spatial index)
         
     Returns:
     --------
-    pd.DataFrame
-        DataFrame with columns: city, neighborhood, airbnb_count
+    tuple
+        (table, n_listings): table indexed by standardized neighborhood with
+        airbnb_count and one column per feature; n_listings is the total
+        number of rows read
     """
-    print(f"\nProcessing: {city_name}")
-    print(f"   File: {Path(file_path).name}")
+    columns = available_columns(file_path, feature_columns(features))
+    missing = [feature['name'] for feature in features if feature['column'] not in columns]
+    if missing:
+        print(f"   WARNING: Listing columns missing; left empty: {', '.join(missing)}")
     
-    df = pd.read_csv(file_path, low_memory=False)
-    print(f"   + Loaded {len(df):,} listings")
+    def prepare(chunk):
+        return parse_feature_columns(chunk, columns)
     
-    # Detect neighborhood column
-    if 'neighbourhood_cleansed' in df.columns:
-        neighborhood_col = 'neighbourhood_cleansed'
-    elif 'neighbourhood' in df.columns:
-        neighborhood_col = 'neighbourhood'
+    if boundary_file is None:
+        neighborhood_col = detect_neighborhood_column(file_path)
+        chunks = iter_listing_chunks(file_path, columns, neighborhood_col, prepare=prepare, cache=cache)
+        table, n_listings = aggregate_listing_features(
+            ((chunk['neighborhood'], chunk) for chunk in chunks), features
+        )
+        print(f"   + Loaded {n_listings:,} listings")
+        print(f"   + Using column: {neighborhood_col}")
+        return table, n_listings
+    
+    index, locate = _polygon_labeler(boundary_file, cache)
+    assigned = 0
+    
+    def by_polygon(chunks):
+        nonlocal assigned
+        for chunk in chunks:
+            labels = locate(chunk)
+            assigned += int(labels.notna().sum())
+            yield labels, chunk
+    
+    chunks = iter_listing_chunks(file_path, COORDINATE_COLUMNS + columns, prepare=prepare, cache=cache)
+    table, n_listings = aggregate_listing_features(by_polygon(chunks), features)
+    print(f"   + Using boundaries: {Path(boundary_file).name} ({len(index.labels)} polygons)")
+    print(f"   + Assigned {assigned:,} listings to polygons")
+    print(f"   + Loaded {n_listings:,} listings")
+    return table, n_listings
+
+
+def listing_neighborhoods(file_path, boundary_file=None, cache=None):
+    """
+    Standardized neighborhood of every listing, as aggregate_listings assigns it.
+    
+    Parameters:
+    -----------
+    file_path : str
+        Path to Airbnb CSV file (with an 'id' column)
+    boundary_file : str, optional
+        Boundary polygons; if given, listings are labeled by the polygon
+        containing their coordinates
+    cache : InputCache, optional
+        Columnar cache of parsed inputs
+        
+    Returns:
+    --------
+    pd.Series
+        Neighborhood label (None if unknown) indexed by listing id
+    """
+    if boundary_file is None:
+        chunks = iter_listing_chunks(file_path, ['id'], detect_neighborhood_column(file_path), cache=cache)
+        pairs = [(chunk['id'], chunk['neighborhood'].astype(object)) for chunk in chunks]
     else:
-        raise ValueError(f"No neighborhood column found in {file_path}")
+        _, locate = _polygon_labeler(boundary_file, cache)
+        chunks = iter_listing_chunks(file_path, ['id'] + COORDINATE_COLUMNS, cache=cache)
+        pairs = [(chunk['id'], locate(chunk)) for chunk in chunks]
     
-    print(f"   + Using column: {neighborhood_col}")
+    ids = np.concatenate([listing_ids.to_numpy() for listing_ids, _ in pairs])
+    labels = np.concatenate([chunk_labels.to_numpy(dtype=object) for _, chunk_labels in pairs])
+    return pd.Series(labels, index=ids, dtype=object)
+
+
+def load_and_process_airbnb_file(file_path, city_name, cache=None, boundary_file=None,
+                                 features=LISTING_FEATURES, activity_files=None, activity_backend='auto'):
+    """
+    Load a single Airbnb listings file and aggregate it per neighborhood.
     
-    # Extract neighborhood and standardize
-    df_clean = df[[neighborhood_col]].copy()
-    df_clean.columns = ['neighborhood']
-    df_clean['neighborhood'] = df_clean['neighborhood'].apply(standardize_text)
+    Parameters:
+    -----------
+    file_path : str
+        Path to Airbnb CSV file
+    city_name : str
+        Name of the city
+    cache : InputCache, optional
+        Columnar cache of parsed inputs
+    boundary_file : str, optional
+        Boundary polygons; if given, listings are assigned to polygons by
+        their coordinates and counted per polygon label
+    features : list of dict
+        Listing-level features to aggregate (see listing_features.py)
+    activity_files : dict, optional
+        The city's calendar and reviews files (see
+        activity_measures.find_activity_files), aggregated into activity
+        measures through the listing ids
+    activity_backend : str
+        Backend for the activity files (see activity_measures.ACTIVITY_BACKENDS)
+        
+    Returns:
+    --------
+    pd.DataFrame
+        DataFrame with columns: city, neighborhood, airbnb_count, one column
+        per feature and the activity measures of the given files
+    """
+    with span('load_and_process_airbnb_file', city=city_name):
+        print(f"\nProcessing: {city_name}")
+        print(f"   File: {Path(file_path).name}")
+        
+        table, n_listings = aggregate_listings(file_path, features, boundary_file=boundary_file, cache=cache)
+        if activity_files:
+            table = table.join(load_activity_measures(file_path, activity_files, boundary_file, cache,
+                                                      activity_backend))
+        
+        # Labels are standardized per chunk, so each row is one neighborhood
+        neighborhood_counts = table.rename_axis('neighborhood').reset_index()
+        
+        # Add city column
+        neighborhood_counts.insert(0, 'city', standardize_text(city_name))
+        
+        print(f"   + Found {len(neighborhood_counts)} unique neighborhoods")
+        print(f"   + Total listings: {neighborhood_counts['airbnb_count'].sum():,}")
+        if features:
+            print(f"   + Listing features: {', '.join(feature_names(features))}")
+        record(rows_in=n_listings, rows_out=len(neighborhood_counts))
     
-    # Remove missing neighborhoods
-    df_clean = df_clean.dropna(subset=['neighborhood'])
+    return neighborhood_counts
+
+
+def load_activity_measures(file_path, activity_files, boundary_file=None, cache=None, backend='auto'):
+    """
+    Aggregate a city's calendar and reviews files per neighborhood.
     
-    # Count listings per neighborhood
-    neighborhood_counts = df_clean.groupby('neighborhood').size().reset_index(name='airbnb_count')
+    Parameters:
+    -----------
+    file_path : str
+        Path to the city's Airbnb listings file
+    activity_files : dict
+        Source ('calendar', 'reviews') -> file path
+    boundary_file : str, optional
+        Boundary polygons the listings are assigned to
+    cache : InputCache, optional
+        Columnar cache of parsed inputs
+    backend : str
+        Backend for the activity files (see activity_measures.ACTIVITY_BACKENDS)
+        
+    Returns:
+    --------
+    pd.DataFrame
+        Activity measures indexed by standardized neighborhood
+    """
+    with span('aggregate_activity', backend=backend):
+        listings = listing_neighborhoods(file_path, boundary_file, cache)
+        table, n_rows = aggregate_activity(listings, activity_files, backend=backend)
+        for source, rows in n_rows.items():
+            print(f"   + {source.capitalize()}: {rows:,} rows from {Path(activity_files[source]).name}")
+        print(f"   + Activity measures: {', '.join(table.columns)}")
+        record(rows_in=sum(n_rows.values()), rows_out=len(table))
+    return table
+
+
+def _load_city_quietly(file_path, city_name, cache=None, boundary_file=None, features=LISTING_FEATURES,
+                       activity_files=None, activity_backend='auto', instrumented=False):
+    """
+    Worker entry point for parallel ingestion.
     
-    # Add city column
-    neighborhood_counts['city'] = standardize_text(city_name)
+    Runs load_and_process_airbnb_file with its progress messages (and, if
+    instrumented, its instrumentation events) captured so the parent process
+    can print and record them in a fixed order.
     
-    # Reorder columns
-    neighborhood_counts = neighborhood_counts[['city', 'neighborhood', 'airbnb_count']]
+    Returns:
+    --------
+    tuple
+        (neighborhood_counts, log_text, cache_events, instrumentation_events)
+    """
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer), collecting(instrumented) as events:
+        neighborhood_counts = load_and_process_airbnb_file(
+            file_path, city_name, cache=cache, boundary_file=boundary_file, features=features,
+            activity_files=activity_files, activity_backend=activity_backend
+        )
+    cache_events = cache.events if cache is not None else []
+    return neighborhood_counts, buffer.getvalue(), cache_events, events
+
+
+def find_boundary_files(base_path, airbnb_files):
+    """
+    Find the boundary file of each city, if any.
     
-    print(f"   + Found {len(neighborhood_counts)} unique neighborhoods")
-    print(f"   + Total listings: {neighborhood_counts['airbnb_count'].sum():,}")
+    A city's boundaries are <BOUNDARY_DIR>/<prefix>.geojson (or .shp), where
+    prefix is its listings file name without '_listings.csv'.
     
-    return neighborhood_counts
+    Parameters:
+    -----------
+    base_path : str
+        Base path to data directory
+    airbnb_files : dict
+        Dictionary mapping city names to file paths
+        
+    Returns:
+    --------
+    dict
+        City name -> boundary file path, for cities that have one
+    """
+    boundary_files = {}
+    for city_name, file_path in airbnb_files.items():
+        prefix = Path(file_path).name.replace('_listings.csv', '')
+        for suffix in ['.geojson', '.shp']:
+            candidate = Path(base_path) / BOUNDARY_DIR / f"{prefix}{suffix}"
+            if candidate.exists():
+                boundary_files[city_name] = str(candidate)
+                break
+    return boundary_files
 
 
-def load_all_airbnb_data(airbnb_files):
+def load_all_airbnb_data(airbnb_files, max_workers=None, cache=None, boundary_files=None,
+                         features=LISTING_FEATURES, activity_files=None, activity_backend='auto'):
     """
     Load and process all Airbnb listing files.
     
+    Cities are independent, so each file is processed on its own worker
+    process and only the small per-city count frames are sent back. Frames are
+    concatenated in the order of airbnb_files, so the result is identical to
+    a serial run.
+    
     Parameters:
     -----------
     airbnb_files : dict
         Dictionary mapping city names to file paths
+    max_workers : int, optional
+        Number of worker processes. Defaults to one per city, capped at the
+        CPU count. Use 1 to process cities serially in this process (useful
+        for debugging).
+    cache : InputCache, optional
+        Columnar cache of parsed inputs
+    boundary_files : dict, optional
+        City name -> boundary file, for cities whose listings are assigned
+        to polygons by coordinates (see find_boundary_files)
+    features : list of dict
+        Listing-level features aggregated per neighborhood
+    activity_files : dict, optional
+        City name -> calendar and reviews files (see find_activity_files),
+        for cities with activity measures
+    activity_backend : str
+        Backend for the activity files (see activity_measures.ACTIVITY_BACKENDS)
         
     Returns:
     --------
@@ -113,11 +444,37 @@ def load_all_airbnb_data(airbnb_files):
     print("STEP 1: LOADING AIRBNB DATA (NEIGHBORHOOD LEVEL)")
     print("="*80)
     
+    if max_workers is None:
+        max_workers = min(len(airbnb_files), os.cpu_count() or 1)
+    boundary_files = boundary_files or {}
+    activity_files = activity_files or {}
+    
     all_neighborhoods = []
     
-    for city_name, file_path in airbnb_files.items():
-        df = load_and_process_airbnb_file(file_path, city_name)
-        all_neighborhoods.append(df)
+    if max_workers <= 1 or len(airbnb_files) <= 1:
+        for city_name, file_path in airbnb_files.items():
+            df = load_and_process_airbnb_file(
+                file_path, city_name, cache=cache, boundary_file=boundary_files.get(city_name),
+                features=features, activity_files=activity_files.get(city_name),
+                activity_backend=activity_backend
+            )
+            all_neighborhoods.append(df)
+    else:
+        print(f"\nProcessing {len(airbnb_files)} cities on {max_workers} worker processes")
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(_load_city_quietly, file_path, city_name, cache, boundary_files.get(city_name),
+                                features, activity_files.get(city_name), activity_backend,
+                                instrumentation_enabled())
+                for city_name, file_path in airbnb_files.items()
+            ]
+            for future in futures:
+                df, log_text, cache_events, events = future.result()
+                print(log_text, end='')
+                emit(events)
+                all_neighborhoods.append(df)
+                if cache is not None:
+                    cache.events.extend(cache_events)
     
     # Combine all neighborhoods
     airbnb_neighborhoods = pd.concat(all_neighborhoods, ignore_index=True)
@@ -135,14 +492,118 @@ def load_all_airbnb_data(airbnb_files):
     return airbnb_neighborhoods
 
 
-def load_supplementary_data(base_path):
+def read_keyed_csv(file_path):
+    """
+    Read a supplementary CSV and standardize its city/neighborhood keys.
+    
+    Parameters:
+    -----------
+    file_path : str
+        Path to CSV file with city and neighborhood columns
+        
+    Returns:
+    --------
+    pd.DataFrame
+        Parsed data with standardized keys
+    """
+    df = pd.read_csv(file_path)
+    df['city'] = normalize_keys(df['city'])
+    df['neighborhood'] = normalize_keys(df['neighborhood'])
+    return df
+
+
+def _read_input(file_path, cache):
+    """
+    Read a keyed CSV through the input cache when one is given.
+    """
+    if cache is None:
+        return read_keyed_csv(file_path)
+    return cache.load(file_path, 'keyed-table', read_keyed_csv)
+
+
+def validate_inputs(base_path, cache=None, files=SUPPLEMENTARY_FILES, directories=None, mode='lazy',
+                    schemas=SCHEMAS, rules=COLUMN_RULES):
+    """
+    Check every supplementary and data collection round file against its schema.
+    
+    Runs before the listings are aggregated, so a bad file stops the run
+    early. Files are read as the loaders read them (through the input
+    cache, which the loaders then hit).
+    
+    Parameters:
+    -----------
+    base_path : str
+        Base path to data directory
+    cache : InputCache, optional
+        Columnar cache of parsed inputs
+    files : dict
+        Source name -> file path (see SUPPLEMENTARY_FILES); checked against
+        the schema of the same name
+    directories : dict, optional
+        Category -> (directory, columns) (default: SOURCE_DIRECTORIES); their
+        files are checked against the 'collection_round' schema
+    mode : str
+        'lazy', 'fail_fast' or 'warn' (see validation.VALIDATION_MODES)
+    schemas : dict
+        Frame schemas (see validation.SCHEMAS)
+    rules : dict
+        Column rules (see validation.COLUMN_RULES)
+        
+    Returns:
+    --------
+    dict
+        File -> rows checked
+    """
+    print("\n" + "="*80)
+    print("STEP 0: VALIDATING INPUT FILES")
+    print("="*80)
+    
+    validator = Validator(mode, rules)
+    checked = set()
+    for name, file_path in files.items():
+        file_path = os.path.join(base_path, file_path)
+        validator.check(_read_input(file_path, cache), schemas[name], f"{name} ({Path(file_path).name})")
+        checked.add(Path(file_path).resolve())
+    
+    directories = SOURCE_DIRECTORIES if directories is None else directories
+    for directory, _ in directories.values():
+        for path in discover_source_files(f"{base_path}/{directory}"):
+            if path.resolve() in checked:
+                continue
+            raw = rename_source_columns(read_source_file(path, cache))
+            validator.check(raw, schemas['collection_round'], f"{directory}/{path.name}")
+    
+    summary = validator.finish()
+    print(f"\n+ Checked {len(summary)} files ({sum(summary.values()):,} rows)"
+          + ("" if validator.violations else ": no problems found"))
+    record(validated_rows=sum(summary.values()), violations=len(validator.violations))
+    return summary
+
+
+def _load_crosswalk(base_path, cache=None):
+    """
+    Crosswalk tables of the data directory (None if there are none).
+    """
+    crosswalk_cache = cache.cache_dir if cache is not None and cache.enabled else None
+    return load_crosswalks(f"{base_path}/{CROSSWALK_DIR}", cache_dir=crosswalk_cache)
+
+
+def load_supplementary_data(base_path, cache=None, files=SUPPLEMENTARY_FILES):
     """
     Load all supplementary data files (demographics, rent, housing, tourism).
     
+    Sources keyed by ZIP code, council district or an alternate name are
+    remapped onto neighborhoods with the crosswalk tables, if any.
+    
     Parameters:
     -----------
     base_path : str
         Base path to data directory
+    cache : InputCache, optional
+        Columnar cache of parsed inputs
+    files : dict
+        Source name -> file path, relative to base_path or absolute (see
+        SUPPLEMENTARY_FILES)
         
     Returns:
     --------
@@ -153,45 +614,52 @@ def load_supplementary_data(base_path):
     print("STEP 2: LOADING SUPPLEMENTARY DATA")
     print("="*80)
     
+    crosswalk = _load_crosswalk(base_path, cache)
+    
+    def remap(df, label):
+        return df if crosswalk is None else crosswalk.remap(df, label)
+    
     # Load demographics
     print("\nMerging: Loading demographics data...")
-    demographics_path = f"{base_path}/Census Demographics/neighborhood_demographics_acs_2023.csv"
-    demographics_df = pd.read_csv(demographics_path)
-    demographics_df['city'] = demographics_df['city'].apply(standardize_text)
-    demographics_df['neighborhood'] = demographics_df['neighborhood'].apply(standardize_text)
+    demographics_path = os.path.join(base_path, files['demographics'])
+    demographics_df = _read_input(demographics_path, cache)
     print(f"   + Loaded {len(demographics_df)} demographic records")
+    demographics_df = remap(demographics_df, 'demographic')
     
     # Load rent data
     print("\nMerging: Loading rent data...")
-    rent_path = f"{base_path}/Rent Data/neighborhood_median_rent_2024.csv"
-    rent_df = pd.read_csv(rent_path)
-    rent_df['city'] = rent_df['city'].apply(standardize_text)
-    rent_df['neighborhood'] = rent_df['neighborhood'].apply(standardize_text)
+    rent_path = os.path.join(base_path, files['rent'])
+    rent_df = _read_input(rent_path, cache)
     print(f"   + Loaded {len(rent_df)} rent records")
+    rent_df = remap(rent_df, 'rent')
     
     # Load housing units
     print("\nMerging: Loading housing units data...")
-    housing_path = f"{base_path}/Housing Units/neighborhood_housing_units.csv"
-    housing_df = pd.read_csv(housing_path)
-    housing_df['city'] = housing_df['city'].apply(standardize_text)
-    housing_df['neighborhood'] = housing_df['neighborhood'].apply(standardize_text)
+    housing_path = os.path.join(base_path, files['housing'])
+    housing_df = _read_input(housing_path, cache)
     print(f"   + Loaded {len(housing_df)} housing records")
+    housing_df = remap(housing_df, 'housing')
     
     # Load tourism classification
     print("\nMerging: Loading tourism classification data...")
-    tourism_path = f"{base_path}/Tourist Area Indicator/neighborhood_tourist_classification.csv"
-    tourism_df = pd.read_csv(tourism_path)
-    tourism_df['city'] = tourism_df['city'].apply(standardize_text)
-    tourism_df['neighborhood'] = tourism_df['neighborhood'].apply(standardize_text)
+    tourism_path = os.path.join(base_path, files['tourism'])
+    tourism_df = _read_input(tourism_path, cache)
     print(f"   + Loaded {len(tourism_df)} tourism records")
+    tourism_df = remap(tourism_df, 'tourism')
     
+    record(source_rows={'demographics': len(demographics_df), 'rent': len(rent_df), 'housing': len(housing_df),
+                        'tourism': len(tourism_df)})
     return demographics_df, rent_df, housing_df, tourism_df
 
 
-def merge_all_datasets(airbnb_df, demographics_df, rent_df, housing_df, tourism_df):
+def merge_all_datasets(airbnb_df, demographics_df, rent_df, housing_df, tourism_df, matcher=None):
     """
     Merge all datasets at neighborhood level.
     
+    All sources are aligned on integer-encoded keys in a single multi-way
+    left join (see keyed_merge), which gives the same rows and columns as
+    merging them one after another.
+    
     Parameters:
     -----------
     airbnb_df : pd.DataFrame
@@ -204,6 +672,8 @@ def merge_all_datasets(airbnb_df, demographics_df, rent_df, housing_df, tourism_
         Housing units data
     tourism_df : pd.DataFrame
         Tourism data
+    matcher : NameMatcher, optional
+        Fuzzy matcher for neighborhood names without an exact match
         
     Returns:
     --------
@@ -214,71 +684,211 @@ def merge_all_datasets(airbnb_df, demographics_df, rent_df, housing_df, tourism_
     print("STEP 3: MERGING ALL DATASETS")
     print("="*80)
     
-    # Start with Airbnb data
-    merged = airbnb_df.copy()
-    print(f"\n+ Starting with Airbnb data: {len(merged)} neighborhoods")
+    print(f"\n+ Starting with Airbnb data: {len(airbnb_df)} neighborhoods")
     
-    # Merge demographics
-    print(f"\nMerging: Merging demographics...")
-    merged = merged.merge(
-        demographics_df, 
-        on=['city', 'neighborhood'], 
-        how='left'
-    )
-    matched = merged['median_household_income'].notna().sum()
-    print(f"   + Matched: {matched}/{len(merged)} neighborhoods")
-    
-    # Merge rent
-    print(f"\nMerging: Merging rent data...")
-    merged = merged.merge(
-        rent_df, 
-        on=['city', 'neighborhood'], 
-        how='left',
-        suffixes=('', '_rent')
-    )
-    # Use rent file data if both exist
-    if 'median_rent_rent' in merged.columns:
-        merged['median_rent'] = merged['median_rent_rent'].fillna(merged.get('median_rent', np.nan))
-        merged = merged.drop(columns=['median_rent_rent'])
-    matched = merged['median_rent'].notna().sum()
-    print(f"   + Matched: {matched}/{len(merged)} neighborhoods")
-    
-    # Merge housing units
-    print(f"\nMerging: Merging housing units...")
-    merged = merged.merge(
-        housing_df, 
-        on=['city', 'neighborhood'], 
-        how='left',
-        suffixes=('', '_housing')
-    )
-    # Use housing file data if both exist
-    if 'housing_units_housing' in merged.columns:
-        merged['housing_units'] = merged['housing_units_housing'].fillna(merged.get('housing_units', np.nan))
-        merged = merged.drop(columns=['housing_units_housing'])
-    matched = merged['housing_units'].notna().sum()
-    print(f"   + Matched: {matched}/{len(merged)} neighborhoods")
-    
-    # Merge tourism
-    print(f"\nMerging: Merging tourism data...")
-    merged = merged.merge(
-        tourism_df, 
-        on=['city', 'neighborhood'], 
-        how='left',
-        suffixes=('', '_tourism')
-    )
-    # Use tourism file data if both exist
-    if 'tourist_area_tourism' in merged.columns:
-        merged['tourist_area'] = merged['tourist_area_tourism'].fillna(merged.get('tourist_area', np.nan))
-        merged = merged.drop(columns=['tourist_area_tourism'])
-    matched = merged['tourist_area'].notna().sum()
-    print(f"   + Matched: {matched}/{len(merged)} neighborhoods")
+    # (log label, frame, suffixes, column whose source file value wins, matched column)
+    steps = [
+        ('demographics', demographics_df, ('_x', '_y'), None, 'median_household_income'),
+        ('rent data', rent_df, ('', '_rent'), 'median_rent', 'median_rent'),
+        ('housing units', housing_df, ('', '_housing'), 'housing_units', 'housing_units'),
+        ('tourism data', tourism_df, ('', '_tourism'), 'tourist_area', 'tourist_area'),
+    ]
+    
+    # Rename near-miss source keys ("st. george" -> "saint george") first
+    if matcher is not None:
+        print(f"\nMatching: Fuzzy-matching unmatched neighborhood names...")
+        with span('fuzzy_match'):
+            steps = [
+                (label, matcher.align(airbnb_df, frame, label), suffixes, prefer, matched_col)
+                for label, frame, suffixes, prefer, matched_col in steps
+            ]
+    
+    # Align every source on shared integer keys in one pass
+    with span('keyed_left_join', rows_in=len(airbnb_df)):
+        merged, step_rows = keyed_left_join(airbnb_df, [(frame, suffixes) for _, frame, suffixes, _, _ in steps])
+    
+    match_rates = {}
+    for i, (label, _, (_, suffix), prefer, matched_col) in enumerate(steps):
+        print(f"\nMerging: Merging {label}...")
+        # Use the source file's value if both exist
+        if prefer is not None and f"{prefer}{suffix}" in merged.columns:
+            source_values = merged.pop(f"{prefer}{suffix}")
+            merged[prefer] = source_values.fillna(merged[prefer])
+        matched, total = count_matched(step_rows, i, merged[matched_col].notna())
+        print(f"   + Matched: {matched}/{total} neighborhoods")
+        match_rates[label] = round(matched / total, 4) if total else None
     
     print(f"\n+ Final merged dataset: {len(merged)} neighborhoods")
+    record(match_rates=match_rates)
     
     return merged
 
 
-def compute_derived_variables(df):
+def fill_missing_from_sources(df, sources, columns=None, base_label='merge'):
+    """
+    Fill missing values from an ordered list of source frames.
+    
+    Sources are applied in priority order and only ever fill cells that are
+    still missing, so earlier sources win and existing values are never
+    overwritten. Each source is aligned on (city, neighborhood) once and
+    applied to all columns in a single masked pass, instead of looping over
+    its rows.
+    
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Dataset to fill, unique on (city, neighborhood)
+    sources : list of tuple
+        (label, frame) pairs in priority order; each frame has city and
+        neighborhood columns plus any of the fill columns. A third element,
+        a frame shaped like the source with a label per value, may be given
+        to record finer-grained provenance (e.g. the file within a category)
+    columns : list, optional
+        Columns eligible for filling (default: FILL_COLUMNS)
+    base_label : str
+        Provenance label for values already present in df
+        
+    Returns:
+    --------
+    tuple
+        (filled_df, provenance) where provenance has the same keys and fill
+        columns as filled_df and names the source that supplied each value
+        (None where the value is still missing)
+    """
+    keys = ['city', 'neighborhood']
+    columns = FILL_COLUMNS if columns is None else columns
+    
+    if df.duplicated(subset=keys).any():
+        raise ValueError("Dataset to fill has duplicate (city, neighborhood) keys")
+    
+    filled = df.set_index(keys)
+    columns = [col for col in columns if col in filled.columns]
+    provenance = pd.DataFrame(
+        np.where(filled[columns].notna(), base_label, None),
+        index=filled.index,
+        columns=columns
+    )
+    
+    filled_counts = {}
+    for label, source, *source_labels in sources:
+        source_columns = [col for col in columns if col in source.columns]
+        if not source_columns:
+            continue
+        
+        # First non-missing value per key, as a row-by-row fill would pick
+        aligned = source.groupby(keys, sort=False)[source_columns].first().reindex(filled.index)
+        fill_mask = filled[source_columns].isna() & aligned.notna()
+        
+        cell_labels = label
+        if source_labels:
+            cell_labels = source_labels[0].groupby(keys, sort=False)[source_columns].first().reindex(filled.index)
+        
+        filled[source_columns] = filled[source_columns].mask(fill_mask, aligned)
+        provenance[source_columns] = provenance[source_columns].mask(fill_mask, cell_labels)
+        filled_counts[label] = int(fill_mask.values.sum())
+        print(f"   + {label}: filled {filled_counts[label]} values")
+    
+    filled = filled.reset_index()[df.columns]
+    provenance = provenance.reset_index()
+    record(filled_values=filled_counts)
+    
+    return filled, provenance
+
+
+def source_directory_files(base_path):
+    """
+    List every file the source directories contribute (CSVs and manifests).
+    
+    Parameters:
+    -----------
+    base_path : str
+        Base path to data directory
+        
+    Returns:
+    --------
+    list of str
+        File paths, used to detect added, removed or edited source files
+    """
+    paths = []
+    for directory, _ in SOURCE_DIRECTORIES.values():
+        category_dir = Path(base_path) / directory
+        paths.extend(str(path) for path in sorted(category_dir.glob('*.csv')))
+        paths.extend(str(path) for path in category_dir.glob(MANIFEST_NAME))
+    return paths
+
+
+def fill_from_collection_rounds(merged_df, base_path, directories=None, cache=None):
+    """
+    Fill gaps left by the primary files from every file in the source directories.
+    
+    Each category directory is discovered, read in parallel and stacked
+    (see source_loader), with rows keyed by ZIP code, district or alias
+    remapped through the crosswalk tables file by file; duplicate keys are
+    resolved by file priority in one grouped pass, and the resolved
+    categories then fill the merged dataset.
+    
+    Parameters:
+    -----------
+    merged_df : pd.DataFrame
+        Merged neighborhood-level dataset
+    base_path : str
+        Base path to data directory
+    directories : dict, optional
+        Category -> (directory, columns) in fill priority order (default:
+        SOURCE_DIRECTORIES)
+    cache : InputCache, optional
+        Columnar cache of parsed inputs
+        
+    Returns:
+    --------
+    tuple
+        (filled_df, provenance) as returned by fill_missing_from_sources,
+        with provenance naming the source file of every value
+    """
+    print("\n" + "="*80)
+    print("STEP 3B: FILLING FROM DATA COLLECTION ROUNDS")
+    print("="*80)
+    
+    columns = [col for col in FILL_COLUMNS if col in merged_df.columns]
+    missing_before = int(merged_df[columns].isna().values.sum())
+    
+    directories = SOURCE_DIRECTORIES if directories is None else directories
+    crosswalk = _load_crosswalk(base_path, cache)
+    
+    sources = []
+    for category, (directory, category_columns) in directories.items():
+        print(f"\nLoading: {directory}/")
+        stacked = load_source_directory(f"{base_path}/{directory}", category_columns, cache=cache,
+                                        crosswalk=crosswalk)
+        resolved, resolved_sources = collapse_sources(stacked, category_columns)
+        sources.append((category, resolved, resolved_sources))
+    
+    print(f"\nFilling: {missing_before} missing values")
+    filled_df, provenance = fill_missing_from_sources(merged_df, sources, columns)
+    
+    missing_after = int(filled_df[columns].isna().values.sum())
+    print(f"\n+ Filled {missing_before - missing_after} values, {missing_after} still missing")
+    
+    return filled_df, provenance
+
+
+def export_provenance(fill_result, output_base_path):
+    """
+    Write the per-value provenance matrix next to the exported dataset.
+    
+    Parameters:
+    -----------
+    fill_result : tuple
+        (filled_df, provenance) as returned by fill_from_collection_rounds
+    output_base_path : str
+        Base path for output files (without extension)
+    """
+    provenance_path = f"{output_base_path}_provenance.csv"
+    fill_result[1].to_csv(provenance_path, index=False)
+    print(f"\nFiles: Provenance written to {provenance_path}")
+
+
+def compute_derived_variables(df, variables=DERIVED_VARIABLES):
     """
     Compute derived analysis variables.
     
@@ -286,6 +896,8 @@ def compute_derived_variables(df):
     -----------
     df : pd.DataFrame
         Merged dataset
+    variables : list of dict
+        Derived variable spec (see derived_variables.DERIVED_VARIABLES)
         
     Returns:
     --------
@@ -296,52 +908,17 @@ def compute_derived_variables(df):
     print("STEP 4: COMPUTING DERIVED VARIABLES")
     print("="*80)
     
-    df = df.copy()
-    
-    # Compute airbnb_density
-    print("\nComputing: airbnb_density = airbnb_count / housing_units")
-    df['airbnb_density'] = np.where(
-        df['housing_units'].notna() & (df['housing_units'] > 0),
-        df['airbnb_count'] / df['housing_units'],
-        np.nan
-    )
-    valid = df['airbnb_density'].notna().sum()
-    print(f"   + Valid values: {valid}/{len(df)}")
-    
-    # Compute log_rent
-    print("\nComputing: log_rent = log(median_rent)")
-    df['log_rent'] = np.where(
-        df['median_rent'].notna() & (df['median_rent'] > 0),
-        np.log(df['median_rent']),
-        np.nan
-    )
-    valid = df['log_rent'].notna().sum()
-    print(f"   + Valid values: {valid}/{len(df)}")
-    
-    # Compute log_income
-    print("\nComputing: log_income = log(median_household_income)")
-    df['log_income'] = np.where(
-        df['median_household_income'].notna() & (df['median_household_income'] > 0),
-        np.log(df['median_household_income']),
-        np.nan
-    )
-    valid = df['log_income'].notna().sum()
-    print(f"   + Valid values: {valid}/{len(df)}")
-    
-    # Compute log_airbnb_density
-    print("\nComputing: log_airbnb_density = log(airbnb_density)")
-    df['log_airbnb_density'] = np.where(
-        df['airbnb_density'].notna() & (df['airbnb_density'] > 0),
-        np.log(df['airbnb_density']),
-        np.nan
-    )
-    valid = df['log_airbnb_density'].notna().sum()
-    print(f"   + Valid values: {valid}/{len(df)}")
+    df, valid = derive_variables(df, variables)
+    expressions = {variable['name']: variable['expr'] for variable in variables}
+    for name, count in valid.items():
+        print(f"\nComputing: {name} = {expressions[name]}")
+        print(f"   + Valid values: {count}/{len(df)}")
+    record(valid_values=valid)
     
     return df
 
 
-def create_final_dataset(df):
+def create_final_dataset(df, validation='lazy', schema=SCHEMAS['final'], rules=COLUMN_RULES):
     """
     Select final columns and prepare for export.
     
@@ -349,6 +926,13 @@ def create_final_dataset(df):
     -----------
     df : pd.DataFrame
         Dataset with all variables
+    validation : str
+        How schema violations are handled: 'lazy', 'fail_fast' or 'warn'
+        (see validation.VALIDATION_MODES)
+    schema : dict
+        Schema of the final dataset (see validation.SCHEMAS)
+    rules : dict
+        Column rules (see validation.COLUMN_RULES)
         
     Returns:
     --------
@@ -359,33 +943,20 @@ def create_final_dataset(df):
     print("STEP 5: CREATING FINAL DATASET")
     print("="*80)
     
-    # Define final column order
-    final_columns = [
-        'city',
-        'neighborhood',
-        'median_rent',
-        'airbnb_count',
-        'housing_units',
-        'airbnb_density',
-        'median_household_income',
-        'population_density',
-        'pct_college',
-        'tourist_area',
-        'log_rent',
-        'log_income',
-        'log_airbnb_density'
-    ]
-    
     # Select only columns that exist
-    available_columns = [col for col in final_columns if col in df.columns]
+    available_columns = [col for col in FINAL_COLUMNS if col in df.columns]
     df_final = df[available_columns].copy()
     
     print(f"\n+ Final dataset shape: {len(df_final)} neighborhoods × {len(df_final.columns)} variables")
     
+    validator = Validator(validation, rules)
+    validator.check(df_final, schema, 'final dataset')
+    validator.finish()
+    
     return df_final
 
 
-def print_data_quality_report(df):
+def print_data_quality_report(df, json_path=None):
     """
     Print comprehensive data quality report.
     
@@ -393,61 +964,23 @@ def print_data_quality_report(df):
     -----------
     df : pd.DataFrame
         Final dataset
+    json_path : str, optional
+        Also write the report as JSON to this path
     """
-    print("\n" + "="*80)
-    print("DATA QUALITY REPORT")
-    print("="*80)
+    report = build_report(df, group='city', core=CORE_COLUMNS)
+    print(format_report(report))
     
-    # Basic info
-    print(f"\nMerging: DATASET DIMENSIONS")
-    print("-"*80)
-    print(f"Neighborhoods: {len(df)}")
-    print(f"Variables: {len(df.columns)}")
-    print(f"Total data points: {len(df) * len(df.columns)}")
-    
-    # Complete neighborhoods
-    complete = df.dropna(subset=['median_rent', 'housing_units', 'median_household_income'])
-    print(f"\nMerging: COMPLETE NEIGHBORHOODS")
-    print("-"*80)
-    print(f"Neighborhoods with core variables: {len(complete)} ({len(complete)/len(df)*100:.1f}%)")
-    
-    # Neighborhoods per city
-    print(f"\nMerging: NEIGHBORHOODS BY CITY")
-    print("-"*80)
-    city_counts = df.groupby('city').size().sort_values(ascending=False)
-    for city, count in city_counts.items():
-        complete_city = df[df['city'] == city].dropna(subset=['median_rent', 'housing_units', 'median_household_income']).shape[0]
-        pct = (complete_city / count * 100) if count > 0 else 0
-        print(f"  {city.title():20s}: {count:3d} total, {complete_city:3d} complete ({pct:.1f}%)")
-    
-    # Missing values
-    print(f"\nMerging: MISSING VALUES")
-    print("-"*80)
-    missing = df.isnull().sum()
-    missing_pct = (missing / len(df) * 100).round(1)
-    
-    for col in df.columns:
-        miss_count = missing[col]
-        miss_pct = missing_pct[col]
-        status = "+" if miss_count == 0 else ("WARNING: " if miss_pct < 50 else "ERROR:")
-        print(f"  {status} {col:30s}: {miss_count:4d} missing ({miss_pct:5.1f}%)")
-    
-    total_missing = missing.sum()
-    total_cells = len(df) * len(df.columns)
-    total_pct = (total_missing / total_cells * 100).round(1)
-    print(f"\n  Total missing: {total_missing:,} / {total_cells:,} ({total_pct}%)")
-    
-    # Summary statistics
-    print(f"\nMerging: SUMMARY STATISTICS")
-    print("-"*80)
-    numeric_cols = df.select_dtypes(include=[np.number]).columns
-    summary = df[numeric_cols].describe().round(2)
-    print(summary.to_string())
+    if json_path is not None:
+        write_report_json(report, json_path)
+        print(f"\n+ Quality report: {json_path}")
 
 
-def export_dataset(df, output_base_path):
+def export_dataset(df, output_base_path, formats=DEFAULT_EXPORT_FORMATS, partition_by=None):
     """
-    Export dataset to Stata and CSV formats.
+    Export dataset to Stata, CSV, Parquet and Feather formats.
+    
+    All formats are written concurrently from the same frame, each to a
+    temporary file that replaces the previous export only once complete.
     
     Parameters:
     -----------
@@ -455,112 +988,459 @@ def export_dataset(df, output_base_path):
         Final dataset
     output_base_path : str
         Base path for output files (without extension)
+    formats : iterable of str
+        Formats to write (see export_formats.EXPORT_FORMATS)
+    partition_by : str, optional
+        Column to partition the Parquet output by (e.g. 'city')
     """
     print("\n" + "="*80)
     print("STEP 6: EXPORTING DATASET")
     print("="*80)
     
-    # Export to Stata
-    stata_path = f"{output_base_path}.dta"
-    print(f"\nExporting: Exporting to Stata format...")
-    print(f"   File: {stata_path}")
-    df.to_stata(stata_path, write_index=False, version=118)
-    print(f"   + Stata file created!")
+    labels = {feature['name']: feature['label'] for feature in LISTING_FEATURES}
+    labels.update({measure['name']: measure['label'] for measure in ACTIVITY_MEASURES})
+    labels.update(variable_labels(DERIVED_VARIABLES))
+    labels = {name: label for name, label in labels.items() if name in df.columns}
     
-    # Export to CSV
-    csv_path = f"{output_base_path}.csv"
-    print(f"\nExporting: Exporting to CSV format...")
-    print(f"   File: {csv_path}")
-    df.to_csv(csv_path, index=False)
-    print(f"   + CSV file created!")
+    print(f"\nExporting: Writing {', '.join(FORMAT_NAMES[fmt] for fmt in formats)} formats...")
+    paths = write_formats(df, output_base_path, formats, labels=labels, partition_by=partition_by)
+    for fmt, path in paths.items():
+        partitioned = f" (partitioned by {partition_by})" if fmt == 'parquet' and partition_by else ""
+        print(f"   + {FORMAT_NAMES[fmt]} file created: {path}{partitioned}")
     
     # Print file sizes
-    import os
-    stata_size = os.path.getsize(stata_path) / 1024
-    csv_size = os.path.getsize(csv_path) / 1024
     print(f"\nFiles: File sizes:")
-    print(f"   Stata: {stata_size:.1f} KB")
-    print(f"   CSV:   {csv_size:.1f} KB")
+    sizes = {fmt: output_size(path) for fmt, path in paths.items()}
+    for fmt, size in sizes.items():
+        print(f"   {FORMAT_NAMES[fmt] + ':':8s} {size / 1024:.1f} KB")
+    record(output_bytes=sizes)
 
 
-def main():
+def estimate_models(df, output_base_path, models=None):
     """
-    Main execution function.
+    Estimate the rent models on the final dataset and write the results.
+    
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Final dataset
+    output_base_path : str
+        Base path for output files (without extension)
+    models : dict, optional
+        Model specifications (defaults to estimation.MODELS)
+        
+    Returns:
+    --------
+    dict
+        Model name -> RegressionResult
     """
     print("\n" + "="*80)
-    print("NEIGHBORHOOD-LEVEL AIRBNB DATASET CREATION")
+    print("STEP 6B: ESTIMATING MODELS (CITY FIXED EFFECTS)")
     print("="*80)
-    print("\nThis script creates a neighborhood-level dataset by merging:")
-    print("  • Airbnb listings data")
-    print("  • Census demographics (ACS 2023)")
-    print("  • Median rent data (2024)")
-    print("  • Housing units data")
-    print("  • Tourism classification")
-    
-    # Define file paths
-    base_path = "/Users/samsonbui/Documents/EconometricsProject/data"
-    
-    # Airbnb files
-    airbnb_files = {
-        'Austin': f"{base_path}/Airbnb Listings Data/austin_listings.csv",
-        'Dallas': f"{base_path}/Airbnb Listings Data/dallas_listings.csv",
-        'Los Angeles': f"{base_path}/Airbnb Listings Data/los-angeles_listings.csv",
-        'New York City': f"{base_path}/Airbnb Listings Data/new-york-city_listings.csv",
-        'Broward County': f"{base_path}/Airbnb Listings Data/broward-county_listings.csv",
-    }
-    
-    # Output path
-    output_base = f"{base_path}/airbnb_neighborhood_panel"
-    
-    try:
-        # Step 1: Load Airbnb data
-        airbnb_df = load_all_airbnb_data(airbnb_files)
-        
-        # Step 2: Load supplementary data
-        demographics_df, rent_df, housing_df, tourism_df = load_supplementary_data(base_path)
-        
-        # Step 3: Merge all datasets
-        merged_df = merge_all_datasets(airbnb_df, demographics_df, rent_df, housing_df, tourism_df)
-        
-        # Step 4: Compute derived variables
-        computed_df = compute_derived_variables(merged_df)
-        
-        # Step 5: Create final dataset
-        final_df = create_final_dataset(computed_df)
-        
-        # Print data quality report
-        print_data_quality_report(final_df)
+    
+    results = run_models(df, models)
+    if not results:
+        print("\n   WARNING: No model could be estimated")
+        return results
+    
+    robust = results_table(results, se='hc1')
+    clustered = results_table(results, se='cluster')
+    print("\n" + robust.expandtabs(14))
+    
+    results_path = f"{output_base_path}_results.txt"
+    with open(results_path, 'w') as f:
+        f.write(robust + "\n" + clustered)
+    estimates_path = f"{output_base_path}_estimates.csv"
+    pd.concat([result.to_frame() for result in results.values()], ignore_index=True) \
+        .to_csv(estimates_path, index=False)
+    print(f"Files: Results written to {results_path} and {estimates_path}")
+    
+    return results
+
+
+def ingest_snapshots(snapshots, store, max_workers=None, cache=None, boundary_files=None,
+                     features=LISTING_FEATURES):
+    """
+    Aggregate every snapshot not yet in the panel store and append it.
+    
+    Snapshots already stored from the same file, feature spec, boundary
+    file and aggregation code are not read at all, so adding a quarter
+    costs one aggregation per new file.
+    New snapshots are aggregated in parallel like load_all_airbnb_data.
+    
+    Parameters:
+    -----------
+    snapshots : list of dict
+        As returned by panel_store.discover_snapshots
+    store : PanelStore
+        Partitioned store of snapshot aggregates
+    max_workers : int, optional
+        Number of worker processes (1 = serial)
+    cache : InputCache, optional
+        Columnar cache of parsed inputs
+    boundary_files : dict, optional
+        City name -> boundary file (see find_boundary_files)
+    features : list of dict
+        Listing-level features aggregated per neighborhood
         
-        # Step 6: Export
-        export_dataset(final_df, output_base)
+    Returns:
+    --------
+    int
+        Number of snapshots aggregated
+    """
+    boundary_files = boundary_files or {}
+    code = code_digest(load_and_process_airbnb_file)
+    keys = {city: partition_key(features, boundary_files.get(city), code)
+            for city in {snapshot['city'] for snapshot in snapshots}}
+    pending = [snapshot for snapshot in snapshots if not store.is_current(snapshot, keys[snapshot['city']])]
+    print(f"\n+ {len(snapshots) - len(pending)} snapshot(s) already stored, {len(pending)} to aggregate")
+    
+    if max_workers is None:
+        max_workers = min(len(pending), os.cpu_count() or 1)
+    
+    if max_workers <= 1 or len(pending) <= 1:
+        for snapshot in pending:
+            df = load_and_process_airbnb_file(
+                snapshot['path'], snapshot['city'], cache=cache,
+                boundary_file=boundary_files.get(snapshot['city']), features=features
+            )
+            store.write(snapshot, df, keys[snapshot['city']])
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(_load_city_quietly, snapshot['path'], snapshot['city'], cache,
+                                boundary_files.get(snapshot['city']), features,
+                                instrumented=instrumentation_enabled())
+                for snapshot in pending
+            ]
+            for snapshot, future in zip(pending, futures):
+                df, log_text, cache_events, events = future.result()
+                print(log_text, end='')
+                emit(events)
+                store.write(snapshot, df, keys[snapshot['city']])
+                if cache is not None:
+                    cache.events.extend(cache_events)
+    
+    return len(pending)
+
+
+def compute_panel_variables(panel, variables=None):
+    """
+    Compute lags and changes against each neighborhood's previous quarter.
+    
+    Rows are sorted once by neighborhood and period and every variable is
+    a single grouped shift, so the cost is linear in the panel size.
+    
+    Parameters:
+    -----------
+    panel : pd.DataFrame
+        Long panel with city, neighborhood and period ('YYYYQn') columns
+    variables : dict, optional
+        name -> (operation, column); defaults to PANEL_VARIABLES
         
-        # Success message
-        print("\n" + "="*80)
-        print("+ SUCCESS!")
-        print("="*80)
-        complete_count = final_df.dropna(subset=['median_rent', 'housing_units', 'median_household_income']).shape[0]
-        complete_pct = (complete_count / len(final_df) * 100)
+    Returns:
+    --------
+    pd.DataFrame
+        Panel sorted by city, neighborhood and period, with the variables
+        added (missing if the previous quarter is not in the panel)
+    """
+    variables = PANEL_VARIABLES if variables is None else variables
+    panel = panel.sort_values(['city', 'neighborhood', 'period'], kind='stable').reset_index(drop=True)
+    
+    columns = sorted({column for _, column in variables.values() if column in panel.columns})
+    ordinal = pd.Series(pd.PeriodIndex(panel['period'], freq='Q').asi8, index=panel.index)
+    shifted = pd.concat([panel[columns], ordinal.rename('_ordinal')], axis=1) \
+        .groupby([panel['city'], panel['neighborhood']], sort=False).shift(1)
+    consecutive = (ordinal - shifted['_ordinal']) == 1
+    
+    for name, (operation, column) in variables.items():
+        if column not in columns:
+            continue
+        previous = shifted[column].where(consecutive)
+        panel[name] = previous if operation == 'lag' else panel[column] - previous
+    
+    return panel
+
+
+def build_panel(fill_result, snapshots, store_dir, boundary_files=None, features=LISTING_FEATURES,
+                variables=DERIVED_VARIABLES, max_workers=None, cache=None):
+    """
+    Update the panel store and assemble the neighborhood x period panel.
+    
+    Listing aggregates come from the store, one partition per city and
+    quarter; the neighborhood covariates (rent, income, housing units, ...)
+    come from the filled cross-section.
+    
+    Parameters:
+    -----------
+    fill_result : tuple
+        Output of fill_from_collection_rounds
+    snapshots : list of dict
+        As returned by panel_store.discover_snapshots
+    store_dir : str
+        Panel store directory
+    boundary_files : dict, optional
+        City name -> boundary file
+    features : list of dict
+        Listing-level features aggregated per neighborhood
+    variables : list of dict
+        Derived variables computed per neighborhood and period
+    max_workers : int, optional
+        Worker processes for snapshot aggregation
+    cache : InputCache, optional
+        Columnar cache of parsed inputs
         
-        print(f"\nMerging: Created neighborhood-level dataset:")
-        print(f"   • {len(final_df)} neighborhoods")
-        print(f"   • {len(final_df.columns)} variables")
-        print(f"   • {complete_count} complete neighborhoods ({complete_pct:.1f}%)")
-        print(f"   • Ready for econometric analysis")
+    Returns:
+    --------
+    pd.DataFrame
+        One row per neighborhood and period
+    """
+    print("\n" + "="*80)
+    print("STEP 7: BUILDING NEIGHBORHOOD x PERIOD PANEL")
+    print("="*80)
+    
+    store = PanelStore(store_dir)
+    ingest_snapshots(snapshots, store, max_workers=max_workers, cache=cache,
+                     boundary_files=boundary_files, features=features)
+    
+    listings = store.read()
+    covariates = fill_result[0].drop(
+        columns=['airbnb_count', *feature_names(features)], errors='ignore'
+    ).drop_duplicates(subset=['city', 'neighborhood'])
+    panel = listings.merge(covariates, on=['city', 'neighborhood'], how='left')
+    
+    # Derived variables per row, then lags and changes across periods
+    with contextlib.redirect_stdout(io.StringIO()):
+        panel = compute_derived_variables(panel, variables)
+    panel = compute_panel_variables(panel)
+    
+    columns = ['city', 'neighborhood', 'period', 'snapshot_date']
+    columns += [col for col in FINAL_COLUMNS + list(PANEL_VARIABLES) if col in panel.columns and col not in columns]
+    panel = panel[columns]
+    
+    n_periods = panel['period'].nunique()
+    print(f"\n+ Panel: {len(panel)} rows, {panel[['city', 'neighborhood']].drop_duplicates().shape[0]} "
+          f"neighborhoods, {n_periods} periods (store: {store_dir})")
+    
+    return panel
+
+
+def scanned_directories(base_path, airbnb_files=None):
+    """
+    Directories whose listing (not only their files' contents) shapes the
+    pipeline graph: boundaries, crosswalks, snapshots, source directories
+    and the directories of the listings files (for calendar and reviews files).
+    
+    Parameters:
+    -----------
+    base_path : str
+        Base path to data directory
+    airbnb_files : dict, optional
+        Dictionary mapping city names to file paths
         
-        print(f"\nFiles: Output files:")
-        print(f"   • {output_base}.dta")
-        print(f"   • {output_base}.csv")
+    Returns:
+    --------
+    list of str
+        Directory paths (some may not exist)
+    """
+    directories = [BOUNDARY_DIR, CROSSWALK_DIR, SNAPSHOT_DIR]
+    directories += [directory for directory, _ in SOURCE_DIRECTORIES.values()]
+    directories = [str(Path(base_path) / directory) for directory in directories]
+    listing_directories = {str(Path(file_path).parent) for file_path in (airbnb_files or {}).values()}
+    return directories + sorted(listing_directories - set(directories))
+
+
+def _merge_stage(airbnb_df, supplementary, fuzzy=True, review_path=None, cache=None):
+    """
+    Stage adapter: unpack the supplementary tuple for merge_all_datasets and
+    write the fuzzy matches left for review.
+    """
+    if not fuzzy:
+        return merge_all_datasets(airbnb_df, *supplementary)
+    
+    matcher = NameMatcher(cache_dir=cache.cache_dir if cache is not None and cache.enabled else None)
+    merged = merge_all_datasets(airbnb_df, *supplementary, matcher=matcher)
+    if review_path is not None:
+        n_review = matcher.write_review(review_path)
+        print(f"\n+ {n_review} fuzzy matches to review: {review_path}")
+    return merged
+
+
+def _derived_stage(fill_result, variables=DERIVED_VARIABLES):
+    """
+    Stage adapter: compute derived variables on the filled dataset.
+    """
+    return compute_derived_variables(fill_result[0], variables)
+
+
+def build_pipeline_graph(airbnb_files, base_path, output_base, store_dir, max_workers=None, cache=None,
+                         fuzzy=True, panel_store=None, formats=DEFAULT_EXPORT_FORMATS, partition_by=None,
+                         sources=SUPPLEMENTARY_FILES, activity_backend='auto', validation='lazy'):
+    """
+    Describe the integration pipeline as a content-hashed stage graph.
+    
+    Parameters:
+    -----------
+    airbnb_files : dict
+        Dictionary mapping city names to file paths
+    base_path : str
+        Base path to data directory
+    output_base : str
+        Base path for output files (without extension)
+    store_dir : str
+        Directory for stored stage outputs
+    max_workers : int, optional
+        Worker processes for Airbnb ingestion
+    cache : InputCache, optional
+        Columnar cache of parsed inputs
+    fuzzy : bool
+        Fuzzy-match neighborhood names that have no exact match
+    panel_store : str, optional
+        Panel store directory; if given, the dated snapshots in SNAPSHOT_DIR
+        are appended to it and a neighborhood x period panel is exported
+    formats : iterable of str
+        Export formats (see export_formats.EXPORT_FORMATS)
+    partition_by : str, optional
+        Column to partition the Parquet exports by (e.g. 'city')
+    sources : dict
+        Supplementary source name -> file path (see SUPPLEMENTARY_FILES)
+    activity_backend : str
+        Backend for calendar and reviews files (see
+        activity_measures.ACTIVITY_BACKENDS); all backends give the same result
+    validation : str
+        How schema violations of the inputs and the final dataset are
+        handled (see validation.VALIDATION_MODES)
         
-    except Exception as e:
-        print("\n" + "="*80)
-        print("ERROR: ERROR OCCURRED")
-        print("="*80)
-        print(f"\nError: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        raise
+    Returns:
+    --------
+    StageGraph
+        Graph with one stage per pipeline step
+    """
+    graph = StageGraph(store_dir)
+    
+    # First, so a bad supplementary file stops the run before the listings
+    # are aggregated
+    graph.add(
+        'validate',
+        validate_inputs,
+        inputs=[os.path.join(base_path, path) for path in sources.values()] + source_directory_files(base_path),
+        params={'base_path': base_path, 'files': sources, 'directories': SOURCE_DIRECTORIES, 'mode': validation,
+                'schemas': SCHEMAS, 'rules': COLUMN_RULES},
+        context={'cache': cache}
+    )
+    
+    boundary_files = find_boundary_files(base_path, airbnb_files)
+    activity_files = {city: find_activity_files(file_path) for city, file_path in airbnb_files.items()}
+    activity_files = {city: files for city, files in activity_files.items() if files}
+    graph.add(
+        'airbnb',
+        load_all_airbnb_data,
+        inputs=list(airbnb_files.values()) + list(boundary_files.values())
+               + [path for files in activity_files.values() for path in files.values()],
+        params={'airbnb_files': airbnb_files, 'boundary_files': boundary_files, 'features': LISTING_FEATURES,
+                'activity_files': activity_files},
+        context={'max_workers': max_workers, 'cache': cache, 'activity_backend': activity_backend}
+    )
+    graph.add(
+        'supplementary',
+        load_supplementary_data,
+        inputs=[os.path.join(base_path, path) for path in sources.values()]
+               + crosswalk_files(f"{base_path}/{CROSSWALK_DIR}"),
+        params={'base_path': base_path, 'files': sources},
+        context={'cache': cache}
+    )
+    review_path = f"{output_base}_match_review.csv"
+    graph.add(
+        'merge',
+        _merge_stage,
+        deps=['airbnb', 'supplementary'],
+        params={'fuzzy': fuzzy, 'review_path': review_path if fuzzy else None},
+        context={'cache': cache},
+        outputs=[review_path] if fuzzy else []
+    )
+    graph.add(
+        'fill',
+        fill_from_collection_rounds,
+        deps=['merge'],
+        inputs=source_directory_files(base_path) + crosswalk_files(f"{base_path}/{CROSSWALK_DIR}"),
+        params={'base_path': base_path, 'directories': SOURCE_DIRECTORIES},
+        context={'cache': cache}
+    )
+    graph.add(
+        'derived',
+        _derived_stage,
+        deps=['fill'],
+        params={'variables': DERIVED_VARIABLES}
+    )
+    graph.add(
+        'final',
+        create_final_dataset,
+        deps=['derived'],
+        params={'validation': validation, 'schema': SCHEMAS['final'], 'rules': COLUMN_RULES}
+    )
+    graph.add(
+        'quality_report',
+        print_data_quality_report,
+        deps=['final'],
+        params={'json_path': f"{output_base}_quality.json"},
+        outputs=[f"{output_base}_quality.json"]
+    )
+    graph.add(
+        'export',
+        export_dataset,
+        deps=['final'],
+        params={'output_base_path': output_base, 'formats': list(formats), 'partition_by': partition_by},
+        outputs=list(export_paths(output_base, formats).values())
+    )
+    graph.add(
+        'estimation',
+        estimate_models,
+        deps=['final'],
+        params={'output_base_path': output_base, 'models': MODELS},
+        outputs=[f"{output_base}_results.txt", f"{output_base}_estimates.csv"]
+    )
+    graph.add(
+        'provenance',
+        export_provenance,
+        deps=['fill'],
+        params={'output_base_path': output_base},
+        outputs=[f"{output_base}_provenance.csv"]
+    )
+    
+    if panel_store is not None:
+        prefixes = {Path(path).name.replace('_listings.csv', ''): city for city, path in airbnb_files.items()}
+        snapshots = discover_snapshots(f"{base_path}/{SNAPSHOT_DIR}", prefixes)
+        graph.add(
+            'panel',
+            build_panel,
+            deps=['fill'],
+            inputs=[snapshot['path'] for snapshot in snapshots] + list(boundary_files.values()),
+            params={'snapshots': snapshots, 'store_dir': panel_store, 'boundary_files': boundary_files,
+                    'features': LISTING_FEATURES, 'variables': DERIVED_VARIABLES},
+            context={'max_workers': max_workers, 'cache': cache}
+        )
+        graph.add(
+            'panel_export',
+            export_dataset,
+            deps=['panel'],
+            params={'output_base_path': f"{output_base}_by_period", 'formats': list(formats),
+                    'partition_by': partition_by},
+            outputs=list(export_paths(f"{output_base}_by_period", formats).values())
+        )
+    
+    return graph
 
 
-if __name__ == "__main__":
-    main()
+def main(argv=None):
+    """
+    Main execution function.
+    
+    Runs the pipeline through the airbnb_panel command line, by default on
+    configs/five_cities.json (see python -m airbnb_panel --help).
+    """
+    from airbnb_panel.cli import main as run_cli
+    return run_cli(argv)
 
+
+if __name__ == "__main__":
+    sys.exit(main())
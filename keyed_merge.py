@@ -0,0 +1,217 @@
+"""
+Multi-Way Left Join on Integer-Encoded Keys
+===========================================
+Joins several supplementary tables onto the Airbnb neighborhoods in one
+step. The (city, neighborhood) keys of every table are encoded once into a
+shared integer key dictionary, each source gets a sorted index over its
+codes, and every join only produces arrays of row positions. Columns are
+gathered from the sources once at the end, so no intermediate merged frame
+is ever copied.
+
+The result is the same as chaining DataFrame.merge(how='left') calls:
+same rows in the same order (a source with repeated keys repeats the
+matching rows, as merge would), same column order and same suffixes.
+
+Author: Econometrics Project
+Date: 2026-10-16
+"""
+
+import numpy as np
+import pandas as pd
+
+
+KEYS = ['city', 'neighborhood']
+
+
+def encode_keys(frames, keys=None):
+    """
+    Encode the key columns of several frames with one shared dictionary.
+    
+    Parameters:
+    -----------
+    frames : list of pd.DataFrame
+        Frames holding the key columns
+    keys : list, optional
+        Key columns (default: city, neighborhood)
+        
+    Returns:
+    --------
+    list of np.ndarray
+        One int64 code array per frame; equal keys get equal codes across
+        frames. Missing keys are coded like any other value, since merge
+        also matches missing keys with each other
+    """
+    keys = KEYS if keys is None else list(keys)
+    lengths = [len(frame) for frame in frames]
+    
+    combined = np.zeros(sum(lengths), dtype=np.int64)
+    for key in keys:
+        values = np.concatenate([frame[key].to_numpy(dtype=object) for frame in frames])
+        codes, uniques = pd.factorize(values, use_na_sentinel=False)
+        # Re-factorize after each key so the combined codes stay dense
+        combined, _ = pd.factorize(combined * len(uniques) + codes)
+    
+    return np.split(combined.astype(np.int64), np.cumsum(lengths)[:-1])
+
+
+class KeyIndex:
+    """
+    Sorted index over one source's key codes.
+    
+    Parameters:
+    -----------
+    codes : np.ndarray
+        Key codes of the source rows (from encode_keys)
+    """
+    
+    def __init__(self, codes):
+        self.order = np.argsort(codes, kind='stable')
+        self.sorted_codes = codes[self.order]
+    
+    def lookup(self, codes):
+        """
+        Locate every code in the index.
+        
+        Returns:
+        --------
+        tuple
+            (starts, counts): position of the first match in the sorted
+            order and the number of matching source rows
+        """
+        starts = np.searchsorted(self.sorted_codes, codes, side='left')
+        ends = np.searchsorted(self.sorted_codes, codes, side='right')
+        return starts, ends - starts
+    
+    def expand(self, codes):
+        """
+        Pair every code with all of its matches (many-to-many lookup).
+        
+        Returns:
+        --------
+        tuple
+            (left, pos): for each pair, the position in codes and the
+            matching source row (-1 for codes without a match, which keep
+            one unmatched pair, as in a left join)
+        """
+        starts, counts = self.lookup(codes)
+        repeats = np.maximum(counts, 1)
+        left = np.repeat(np.arange(len(codes)), repeats)
+        offsets = np.arange(len(left)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+        matched = np.repeat(counts, repeats) > 0
+        pos = np.full(len(left), -1, dtype=np.int64)
+        pos[matched] = self.order[np.repeat(starts, repeats)[matched] + offsets[matched]]
+        return left, pos
+
+
+def align_left(base_codes, source_codes):
+    """
+    Compute the row positions of a chain of left joins.
+    
+    Parameters:
+    -----------
+    base_codes : np.ndarray
+        Key codes of the left table
+    source_codes : list of np.ndarray
+        Key codes of each right table, in join order
+        
+    Returns:
+    --------
+    tuple
+        (rows, positions, step_rows): rows holds the left-table position of
+        every output row, positions one array per source with the matching
+        source row (-1 where none), and step_rows, per source, the row each
+        output row had right after that join (rows only repeat after it when
+        a later source has repeated keys)
+    """
+    current = base_codes
+    rows = np.arange(len(base_codes))
+    positions = []
+    step_rows = []
+    
+    for codes in source_codes:
+        index = KeyIndex(codes)
+        starts, counts = index.lookup(current)
+        
+        if (counts <= 1).all():
+            matched = counts == 1
+            pos = np.full(len(current), -1, dtype=np.int64)
+            pos[matched] = index.order[starts[matched]]
+        else:
+            # Repeated source keys: repeat each left row once per match
+            left, pos = index.expand(current)
+            current = current[left]
+            rows = rows[left]
+            positions = [p[left] for p in positions]
+            step_rows = [s[left] for s in step_rows]
+        
+        positions.append(pos)
+        step_rows.append(np.arange(len(current)))
+    
+    return rows, positions, step_rows
+
+
+def keyed_left_join(base, sources, keys=None):
+    """
+    Left-join several sources onto base in one multi-way alignment.
+    
+    Parameters:
+    -----------
+    base : pd.DataFrame
+        Left table
+    sources : list of tuple
+        (frame, suffixes) pairs in join order; suffixes are applied to
+        overlapping column names exactly as DataFrame.merge applies them
+    keys : list, optional
+        Key columns (default: city, neighborhood)
+        
+    Returns:
+    --------
+    tuple
+        (merged, step_rows) where merged equals the chained merges and
+        step_rows is returned by align_left (see count_matched)
+    """
+    keys = KEYS if keys is None else list(keys)
+    frames = [base] + [frame for frame, _ in sources]
+    base_codes, *source_codes = encode_keys(frames, keys)
+    rows, positions, step_rows = align_left(base_codes, source_codes)
+    
+    # Track (name -> column) in output order, renaming overlaps per join
+    columns = {name: base[name].iloc[rows].reset_index(drop=True) for name in base.columns}
+    for (frame, (left_suffix, right_suffix)), pos in zip(sources, positions):
+        right_columns = [col for col in frame.columns if col not in keys]
+        overlap = set(right_columns) & (set(columns) - set(keys))
+        
+        columns = {
+            (name + left_suffix if name in overlap else name): values
+            for name, values in columns.items()
+        }
+        aligned = frame[right_columns].reset_index(drop=True).reindex(pos).reset_index(drop=True)
+        for col in right_columns:
+            columns[col + right_suffix if col in overlap else col] = aligned[col]
+    
+    merged = pd.DataFrame(columns, index=pd.RangeIndex(len(rows)))
+    return merged, step_rows
+
+
+def count_matched(step_rows, step, mask):
+    """
+    Count rows matching mask as they were right after one join.
+    
+    Parameters:
+    -----------
+    step_rows : list of np.ndarray
+        As returned by keyed_left_join
+    step : int
+        Index of the join in the source list
+    mask : pd.Series or np.ndarray
+        Boolean per output row, for a column set by that join or earlier
+        
+    Returns:
+    --------
+    tuple
+        (matched, total) rows of the joined table at that step
+    """
+    step_ids = step_rows[step]
+    total = int(step_ids.max()) + 1 if len(step_ids) else 0
+    matched = len(np.unique(step_ids[np.asarray(mask)]))
+    return matched, total
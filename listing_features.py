@@ -0,0 +1,307 @@
+"""
+Neighborhood Features from Listing-Level Data
+=============================================
+Aggregates listing-level columns of the Inside Airbnb files into
+neighborhood-level features (price median and IQR, entire-home share,
+availability, reviews per month, multi-listing host share) in one grouped
+pass over column-pruned chunks.
+
+Features are declared in LISTING_FEATURES. Every chunk updates running
+per-neighborhood sums and counts with np.bincount, and quantiles come from
+a mergeable log-bucketed histogram (QuantileSketch), so no feature needs the
+whole file in memory or its own groupby.
+
+Author: Econometrics Project
+Date: 2026-10-16
+"""
+
+import numpy as np
+import pandas as pd
+
+
+# Declarative feature spec. 'stat' is one of:
+#   quantile - q-th quantile of a numeric column (approximate, see QuantileSketch)
+#   iqr      - 75th minus 25th percentile
+#   mean     - mean of non-missing values ('fill' replaces missing first,
+#              'scale' multiplies the result)
+#   share    - share of non-missing values equal to 'equals' or greater
+#              than 'greater_than'
+LISTING_FEATURES = [
+    {'name': 'price_median', 'column': 'price', 'stat': 'quantile', 'q': 0.5,
+     'label': 'Median nightly price (USD)'},
+    {'name': 'price_iqr', 'column': 'price', 'stat': 'iqr',
+     'label': 'Interquartile range of nightly price (USD)'},
+    {'name': 'entire_home_share', 'column': 'room_type', 'stat': 'share', 'equals': 'Entire home/apt',
+     'label': 'Share of entire-home listings'},
+    {'name': 'availability_share', 'column': 'availability_365', 'stat': 'mean', 'scale': 1 / 365,
+     'label': 'Mean share of the year available (availability_365 / 365)'},
+    {'name': 'reviews_per_month', 'column': 'reviews_per_month', 'stat': 'mean', 'fill': 0.0,
+     'label': 'Mean reviews per month (0 if no reviews)'},
+    {'name': 'multi_listing_host_share', 'column': 'calculated_host_listings_count', 'stat': 'share',
+     'greater_than': 1, 'label': 'Share of listings whose host has several listings'},
+]
+
+# Relative accuracy of sketched quantiles (bucket width in log space)
+SKETCH_RELATIVE_ACCURACY = 0.01
+
+# Values at or below this land in the sketch's lowest bucket
+SKETCH_MIN_VALUE = 1.0
+
+
+def feature_columns(spec):
+    """
+    Listing columns needed by a feature spec, in spec order.
+    """
+    return list(dict.fromkeys(feature['column'] for feature in spec))
+
+
+def feature_names(spec):
+    """
+    Output column names of a feature spec.
+    """
+    return [feature['name'] for feature in spec]
+
+
+def parse_feature_columns(frame, columns):
+    """
+    Parse listing columns for aggregation.
+    
+    Prices like "$1,250.00" become floats, other text columns become
+    categoricals and numeric columns are left as they are.
+    
+    Parameters:
+    -----------
+    frame : pd.DataFrame
+        Chunk of a listings file
+    columns : list
+        Columns to parse (other columns are kept unchanged)
+        
+    Returns:
+    --------
+    pd.DataFrame
+        Copy of frame with the columns parsed
+    """
+    frame = frame.copy()
+    for col in columns:
+        if col == 'price' and not pd.api.types.is_numeric_dtype(frame[col]):
+            frame[col] = pd.to_numeric(frame[col].astype(str).str.replace(r'[$,]', '', regex=True),
+                                       errors='coerce')
+        elif frame[col].dtype == object:
+            frame[col] = frame[col].astype('category')
+    return frame
+
+
+class QuantileSketch:
+    """
+    Mergeable per-group quantile sketch on log-spaced buckets.
+    
+    Each value is counted in the bucket ceil(log(x / min_value) / log(gamma)),
+    so a quantile read back from its bucket is within the relative accuracy
+    of the true value. Bucket counts are kept sparse, as (group, bucket) keys
+    per chunk, and combined once when quantiles are requested; sketches of
+    separate chunks or files merge by concatenating their counts.
+    
+    Parameters:
+    -----------
+    relative_accuracy : float
+        Maximum relative error of returned quantiles
+    min_value : float
+        Values at or below this share the lowest bucket
+    """
+    
+    def __init__(self, relative_accuracy=SKETCH_RELATIVE_ACCURACY, min_value=SKETCH_MIN_VALUE):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.min_value = min_value
+        self._keys = []
+        self._counts = []
+    
+    def add(self, groups, values):
+        """
+        Count values (non-missing) into their groups' buckets.
+        """
+        present = ~np.isnan(values)
+        groups, values = groups[present], values[present]
+        if len(values) == 0:
+            return
+        with np.errstate(divide='ignore'):
+            buckets = np.ceil(np.log(np.maximum(values, self.min_value) / self.min_value) / np.log(self.gamma))
+        # Bucket in the low bits, group in the high bits
+        keys, counts = np.unique((groups.astype(np.int64) << 20) | buckets.astype(np.int64), return_counts=True)
+        self._keys.append(keys)
+        self._counts.append(counts)
+    
+    def merge(self, other):
+        """
+        Add another sketch's counts (with the same group numbering).
+        """
+        self._keys.extend(other._keys)
+        self._counts.extend(other._counts)
+    
+    def quantiles(self, q, n_groups):
+        """
+        Approximate q-th quantile per group (NaN for groups without values).
+        """
+        result = np.full(n_groups, np.nan)
+        if not self._keys:
+            return result
+        
+        keys, inverse = np.unique(np.concatenate(self._keys), return_inverse=True)
+        counts = np.bincount(inverse.ravel(), weights=np.concatenate(self._counts))
+        groups, buckets = keys >> 20, keys & ((1 << 20) - 1)
+        
+        # Per group: interpolate between the values of ranks floor and ceil of
+        # q * (n - 1), as numpy's default (linear) quantile does
+        cumulative = np.cumsum(counts)
+        group_ids, starts = np.unique(groups, return_index=True)
+        ends = np.append(starts[1:], len(keys))
+        before = np.where(starts > 0, cumulative[starts - 1], 0)
+        rank = q * (cumulative[ends - 1] - before - 1)
+        
+        values = []
+        for k in (np.floor(rank), np.ceil(rank)):
+            bucket = buckets[np.searchsorted(cumulative, before + k + 1)]
+            representative = self.min_value * 2 * self.gamma ** bucket / (self.gamma + 1)
+            values.append(np.where(bucket == 0, self.min_value, representative))
+        
+        fraction = rank - np.floor(rank)
+        result[group_ids] = values[0] * (1 - fraction) + values[1] * fraction
+        return result
+
+
+class FeatureAccumulator:
+    """
+    Running per-neighborhood state of every feature in a spec.
+    
+    Parameters:
+    -----------
+    spec : list of dict
+        Feature spec (see LISTING_FEATURES)
+    """
+    
+    def __init__(self, spec):
+        self.spec = list(spec)
+        self.labels = {}
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.sums = {feature['name']: np.zeros(0) for feature in self.spec}
+        self.present = {feature['name']: np.zeros(0) for feature in self.spec}
+        self.sketches = {
+            feature['column']: QuantileSketch()
+            for feature in self.spec if feature['stat'] in ('quantile', 'iqr')
+        }
+    
+    def _group_ids(self, labels):
+        """
+        Map chunk labels to running group ids (-1 for missing labels).
+        """
+        if isinstance(labels.dtype, pd.CategoricalDtype):
+            codes, uniques = labels.cat.codes.to_numpy(), labels.cat.categories
+        else:
+            codes, uniques = pd.factorize(labels)
+        lookup = np.array([self.labels.setdefault(label, len(self.labels)) for label in uniques] + [-1],
+                          dtype=np.int64)
+        return lookup[codes]
+    
+    def _grow(self):
+        """
+        Extend per-group arrays to the current number of groups.
+        """
+        n_new = len(self.labels) - len(self.counts)
+        if n_new <= 0:
+            return
+        self.counts = np.append(self.counts, np.zeros(n_new, dtype=np.int64))
+        for name in self.sums:
+            self.sums[name] = np.append(self.sums[name], np.zeros(n_new))
+            self.present[name] = np.append(self.present[name], np.zeros(n_new))
+    
+    def add(self, labels, frame):
+        """
+        Fold one chunk into the running state.
+        
+        Parameters:
+        -----------
+        labels : pd.Series
+            Neighborhood label per listing (missing labels are skipped)
+        frame : pd.DataFrame
+            Parsed feature columns of the same listings
+        """
+        groups = self._group_ids(labels)
+        self._grow()
+        keep = groups >= 0
+        groups = groups[keep]
+        n_groups = len(self.labels)
+        self.counts += np.bincount(groups, minlength=n_groups)
+        
+        for column, sketch in self.sketches.items():
+            if column in frame.columns:
+                sketch.add(groups, frame[column].to_numpy(dtype=float)[keep])
+        
+        for feature in self.spec:
+            if feature['column'] not in frame.columns or feature['stat'] not in ('mean', 'share'):
+                continue
+            values = frame[feature['column']][keep]
+            if feature['stat'] == 'share':
+                present = values.notna().to_numpy()
+                if 'equals' in feature:
+                    hits = (values == feature['equals']).to_numpy()
+                else:
+                    hits = (pd.to_numeric(values, errors='coerce') > feature['greater_than']).to_numpy()
+                values = hits.astype(float)
+            else:
+                values = pd.to_numeric(values, errors='coerce')
+                if 'fill' in feature:
+                    values = values.fillna(feature['fill'])
+                present = values.notna().to_numpy()
+                values = values.fillna(0).to_numpy(dtype=float)
+            name = feature['name']
+            self.sums[name] += np.bincount(groups, weights=values * present, minlength=n_groups)
+            self.present[name] += np.bincount(groups, weights=present.astype(float), minlength=n_groups)
+    
+    def result(self):
+        """
+        Final per-neighborhood table: airbnb_count plus one column per feature.
+        """
+        n_groups = len(self.labels)
+        table = pd.DataFrame({'airbnb_count': self.counts}, index=pd.Index(list(self.labels), dtype=object))
+        
+        for feature in self.spec:
+            name = feature['name']
+            if feature['stat'] in ('quantile', 'iqr'):
+                sketch = self.sketches[feature['column']]
+                if feature['stat'] == 'quantile':
+                    values = sketch.quantiles(feature['q'], n_groups)
+                else:
+                    values = sketch.quantiles(0.75, n_groups) - sketch.quantiles(0.25, n_groups)
+            else:
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    values = np.where(self.present[name] > 0, self.sums[name] / self.present[name], np.nan)
+                values = values * feature.get('scale', 1)
+            table[name] = values
+        
+        table = table[table['airbnb_count'] > 0]
+        return table.sort_index()
+
+
+def aggregate_listing_features(chunks, spec=LISTING_FEATURES):
+    """
+    Aggregate listing chunks into neighborhood features in one pass.
+    
+    Parameters:
+    -----------
+    chunks : iterable of tuple
+        (labels, frame) pairs as yielded by listings_reader.iter_listing_chunks
+    spec : list of dict
+        Feature spec (see LISTING_FEATURES)
+        
+    Returns:
+    --------
+    tuple
+        (table, n_listings): table indexed by neighborhood label with
+        airbnb_count and one column per feature (NaN for features whose
+        column the file lacks); n_listings counts every row read
+    """
+    accumulator = FeatureAccumulator(spec)
+    n_listings = 0
+    for labels, frame in chunks:
+        n_listings += len(frame)
+        accumulator.add(labels, frame)
+    return accumulator.result(), n_listings
@@ -0,0 +1,113 @@
+"""
+Streaming Reader for Inside Airbnb Listings Files
+=================================================
+Reads only the columns the pipeline needs from an Inside Airbnb listings file,
+chunk by chunk, for the per-neighborhood counts and features to be folded in
+as they arrive (see listing_features.py), so peak memory stays flat no matter
+how many listings (or free-text columns) the file contains.
+
+Author: Econometrics Project
+Date: 2026-10-16
+"""
+
+import pandas as pd
+
+from text_keys import normalize_keys
+
+
+# Candidate neighborhood columns, in order of preference
+NEIGHBORHOOD_COLUMNS = ['neighbourhood_cleansed', 'neighbourhood']
+
+# Rows parsed per chunk; bounds peak memory independently of file size
+LISTINGS_CHUNKSIZE = 50_000
+
+# Listing coordinate columns
+COORDINATE_COLUMNS = ['longitude', 'latitude']
+
+
+def detect_neighborhood_column(file_path):
+    """
+    Detect the neighborhood column by reading only the file header.
+    
+    Parameters:
+    -----------
+    file_path : str
+        Path to Airbnb CSV file
+        
+    Returns:
+    --------
+    str
+        Name of the neighborhood column
+    """
+    header = pd.read_csv(file_path, nrows=0).columns
+    
+    for col in NEIGHBORHOOD_COLUMNS:
+        if col in header:
+            return col
+    
+    raise ValueError(f"No neighborhood column found in {file_path}")
+
+
+def available_columns(file_path, columns):
+    """
+    Return the requested columns present in a file's header, in request order.
+    """
+    header = set(pd.read_csv(file_path, nrows=0).columns)
+    return [col for col in columns if col in header]
+
+
+def iter_listing_chunks(file_path, columns, neighborhood_col=None, prepare=None,
+                        chunksize=LISTINGS_CHUNKSIZE, cache=None):
+    """
+    Stream a listings file as column-pruned chunks.
+    
+    Only the neighborhood column and the requested columns are parsed. With
+    an input cache, the chunks are also stored to the cache as they are
+    parsed, and later runs read them back from it chunk by chunk.
+    
+    Parameters:
+    -----------
+    file_path : str
+        Path to Airbnb CSV file
+    columns : list
+        Listing columns to read besides the neighborhood
+    neighborhood_col : str, optional
+        Neighborhood column, yielded as a standardized categorical
+        'neighborhood' column (omitted if None)
+    prepare : callable, optional
+        Applied to every chunk after reading (e.g. to parse prices)
+    chunksize : int, optional
+        Number of rows parsed per chunk (the whole file if None)
+    cache : InputCache, optional
+        Columnar cache of parsed inputs
+        
+    Yields:
+    -------
+    pd.DataFrame
+        Chunk with the neighborhood column (if any) followed by columns
+    """
+    if cache is not None and cache.enabled:
+        yield from cache.load_chunks(
+            file_path,
+            f"listing-chunks[{neighborhood_col or ''};{','.join(columns)};{chunksize}]",
+            lambda path: iter_listing_chunks(path, columns, neighborhood_col, prepare=prepare, chunksize=chunksize)
+        )
+        return
+    
+    usecols = ([neighborhood_col] if neighborhood_col else []) + list(columns)
+    dtype = {neighborhood_col: 'category'} if neighborhood_col else None
+    
+    def tidy(chunk):
+        chunk = chunk[usecols]
+        if neighborhood_col:
+            chunk = chunk.rename(columns={neighborhood_col: 'neighborhood'})
+            chunk['neighborhood'] = normalize_keys(chunk['neighborhood'], as_category=True)
+        return prepare(chunk) if prepare is not None else chunk
+    
+    if chunksize is None:
+        yield tidy(pd.read_csv(file_path, usecols=usecols, dtype=dtype))
+        return
+    
+    with pd.read_csv(file_path, usecols=usecols, dtype=dtype, chunksize=chunksize) as reader:
+        for chunk in reader:
+            yield tidy(chunk)
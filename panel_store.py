@@ -0,0 +1,247 @@
+"""
+Partitioned Store of Snapshot Aggregates
+========================================
+Keeps the neighborhood-level aggregates of every dated listings snapshot
+(one Inside Airbnb scrape per city and quarter) so that a neighborhood x
+period panel can grow one quarter at a time.
+
+Snapshot files are named <prefix>_listings_<YYYY-MM-DD>.csv, where prefix is
+the city's listings file prefix (austin, new-york-city, ...). Each snapshot
+is aggregated once and written to its own partition:
+
+    <root>/city=<city>/period=<YYYYQn>/part.arrow
+    <root>/city=<city>/period=<YYYYQn>/source.json
+
+source.json records the snapshot file's size, modification time and content
+hash plus a key of everything else the table depends on (the feature spec,
+the city's boundary file and a digest of the aggregation code, see
+partition_key), so an unchanged snapshot is never re-read, a replaced one
+rewrites only its own partition and a changed boundary file or aggregation
+code rebuilds the partitions it affects.
+
+Author: Econometrics Project
+Date: 2026-10-16
+"""
+
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+import pandas as pd
+
+from cache_layout import file_fingerprint, file_sha256
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # pragma: no cover - optional dependency
+    feather = None
+
+
+# Bump when the partition layout changes so old partitions are rebuilt
+PANEL_STORE_VERSION = 2
+
+# Default store location, relative to the data directory
+DEFAULT_PANEL_SUBDIR = 'Panel Store'
+
+SNAPSHOT_PATTERN = re.compile(r'^(?P<prefix>.+)_listings_(?P<date>\d{4}-\d{2}-\d{2})\.csv$')
+
+
+def snapshot_period(date):
+    """
+    Quarter label of a snapshot date, e.g. '2024-08-15' -> '2024Q3'.
+    """
+    return str(pd.Period(date, freq='Q'))
+
+
+def spec_key(spec):
+    """
+    Short hash of an aggregation spec.
+    """
+    payload = json.dumps(spec, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def partition_key(spec, boundary_file=None, code=None):
+    """
+    Short hash of what a partition's table depends on besides its snapshot
+    file, stored with every partition.
+    
+    Parameters:
+    -----------
+    spec : list of dict
+        Aggregation spec (see listing_features.LISTING_FEATURES)
+    boundary_file : str, optional
+        The city's boundary polygons, hashed by content
+    code : str, optional
+        Digest of the aggregation code (see stage_graph.code_digest), so
+        edits elsewhere in its modules keep the partitions
+        
+    Returns:
+    --------
+    str
+        Key compared by PanelStore.is_current
+    """
+    return spec_key({
+        'spec': spec,
+        'boundary': file_sha256(boundary_file) if boundary_file else None,
+        'code': code,
+    })
+
+
+def discover_snapshots(directory, prefixes):
+    """
+    Find the dated listings snapshots of each city.
+    
+    Parameters:
+    -----------
+    directory : str
+        Snapshot directory
+    prefixes : dict
+        Listings file prefix -> city name
+        
+    Returns:
+    --------
+    list of dict
+        One {'city', 'period', 'date', 'path'} per city and quarter, sorted
+        by city and date. Of several snapshots in one quarter, the latest
+        is used
+    """
+    directory = Path(directory)
+    if not directory.is_dir():
+        return []
+    
+    latest = {}
+    for path in sorted(directory.glob('*_listings_*.csv')):
+        match = SNAPSHOT_PATTERN.match(path.name)
+        if match is None or match['prefix'] not in prefixes:
+            continue
+        city = prefixes[match['prefix']]
+        key = (city, snapshot_period(match['date']))
+        if key in latest:
+            print(f"   WARNING: Several {city} snapshots in {key[1]}; using the latest")
+        if key not in latest or match['date'] > latest[key]['date']:
+            latest[key] = {'city': city, 'period': key[1], 'date': match['date'], 'path': str(path)}
+    
+    return sorted(latest.values(), key=lambda snapshot: (snapshot['city'], snapshot['date']))
+
+
+class PanelStore:
+    """
+    Partitioned (city / period) store of per-snapshot neighborhood tables.
+    
+    Parameters:
+    -----------
+    root : str
+        Store directory
+    """
+    
+    def __init__(self, root):
+        self.root = Path(root)
+    
+    def _partition_dir(self, city, period):
+        """
+        Directory of one city/period partition.
+        """
+        return self.root / f"city={quote(city, safe='')}" / f"period={period}"
+    
+    def is_current(self, snapshot, key):
+        """
+        Check whether a snapshot's partition was built from this exact file
+        and partition key (see partition_key).
+        """
+        source_path = self._partition_dir(snapshot['city'], snapshot['period']) / 'source.json'
+        if not source_path.exists():
+            return False
+        
+        with open(source_path) as f:
+            source = json.load(f)
+        if source.get('version') != PANEL_STORE_VERSION or source.get('key') != key:
+            return False
+        if source.get('date') != snapshot['date']:
+            return False
+        
+        fingerprint = file_fingerprint(snapshot['path'])
+        if fingerprint['size'] != source['size']:
+            return False
+        if fingerprint['mtime_ns'] == source['mtime_ns']:
+            return True
+        # Touched but possibly identical: fall back to the content hash
+        return file_sha256(snapshot['path']) == source['sha256']
+    
+    def write(self, snapshot, frame, key):
+        """
+        Write (or replace) a snapshot's partition.
+        
+        The table is written first and source.json last, so an interrupted
+        write leaves a partition that is simply rebuilt on the next run.
+        
+        Parameters:
+        -----------
+        snapshot : dict
+            As returned by discover_snapshots
+        frame : pd.DataFrame
+            Neighborhood table aggregated from the snapshot
+        key : str
+            Partition key the table was built under (see partition_key)
+        """
+        partition = self._partition_dir(snapshot['city'], snapshot['period'])
+        partition.mkdir(parents=True, exist_ok=True)
+        
+        source_path = partition / 'source.json'
+        source_path.unlink(missing_ok=True)
+        
+        data_path = partition / 'part.arrow'
+        tmp_path = partition / f"part.arrow.tmp{os.getpid()}"
+        feather.write_feather(frame.reset_index(drop=True), tmp_path, compression='uncompressed')
+        os.replace(tmp_path, data_path)
+        
+        source = dict(
+            file_fingerprint(snapshot['path']),
+            version=PANEL_STORE_VERSION,
+            key=key,
+            date=snapshot['date'],
+            path=str(Path(snapshot['path']).resolve()),
+            sha256=file_sha256(snapshot['path']),
+            rows=len(frame),
+        )
+        tmp_path = partition / f"source.json.tmp{os.getpid()}"
+        with open(tmp_path, 'w') as f:
+            json.dump(source, f, indent=2)
+        os.replace(tmp_path, source_path)
+    
+    def partitions(self):
+        """
+        List the complete partitions as (city, period, partition dir).
+        """
+        found = []
+        for source_path in self.root.glob('city=*/period=*/source.json'):
+            partition = source_path.parent
+            city = unquote(partition.parent.name[len('city='):])
+            found.append((city, partition.name[len('period='):], partition))
+        return sorted(found)
+    
+    def read(self):
+        """
+        Read every partition into one long table.
+        
+        Returns:
+        --------
+        pd.DataFrame
+            Stored columns plus period and snapshot_date, sorted by city and
+            period (empty if the store has no partitions)
+        """
+        frames = []
+        for city, period, partition in self.partitions():
+            with open(partition / 'source.json') as f:
+                source = json.load(f)
+            frame = feather.read_table(partition / 'part.arrow', memory_map=True).to_pandas()
+            frame.insert(2, 'period', period)
+            frame.insert(3, 'snapshot_date', source['date'])
+            frames.append(frame)
+        
+        if not frames:
+            return pd.DataFrame(columns=['city', 'neighborhood', 'period', 'snapshot_date'])
+        return pd.concat(frames, ignore_index=True)
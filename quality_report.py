@@ -0,0 +1,398 @@
+"""
+Data Quality Report Engine
+==========================
+Computes the data quality report of a neighborhood dataset (missing values,
+completeness by city, summary statistics and outlier counts) in one grouped
+pass and renders it as text and as JSON.
+
+The pass produces QualityStats: per-city partial aggregates (row and
+complete-row counts, missing counts, count / mean / sum of squared
+deviations / min / max per numeric column, and the sorted values per city)
+that merge exactly. Global figures are the merge of the per-city partials,
+and partials of separate chunks or periods of a panel merge the same way,
+so the report costs about one sort per numeric column regardless of the
+number of cities.
+
+Outliers are values outside [Q1 - 1.5 IQR, Q3 + 1.5 IQR], counted against
+the city's own quartiles.
+
+Author: Econometrics Project
+Date: 2026-10-16
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+
+# Variables a neighborhood needs to count as complete
+CORE_COLUMNS = ['median_rent', 'housing_units', 'median_household_income']
+
+# Quantiles reported for numeric columns (as in DataFrame.describe)
+REPORT_QUANTILES = (0.25, 0.5, 0.75)
+
+# Outlier fence, in interquartile ranges beyond the quartiles
+OUTLIER_IQR_FACTOR = 1.5
+
+# Stands in for the missing group label while merging: NaN labels of
+# different aggregates are not equal to each other, so would not combine
+_MISSING_GROUP = object()
+
+
+def _sort_runs(values, offsets):
+    """
+    Sort each run values[offsets[i]:offsets[i+1]] in place.
+    """
+    for start, end in zip(offsets[:-1], offsets[1:]):
+        if end - start > 1:
+            values[start:end].sort()
+    return values
+
+
+def _sorted_quantiles(values, offsets, q):
+    """
+    Linear-interpolated q-th quantile of each sorted run values[offsets[i]:offsets[i+1]].
+    """
+    counts = np.diff(offsets)
+    result = np.full(len(counts), np.nan)
+    has = counts > 0
+    position = offsets[:-1][has] + q * (counts[has] - 1)
+    low = np.floor(position).astype(np.int64)
+    high = np.ceil(position).astype(np.int64)
+    fraction = position - low
+    result[has] = values[low] * (1 - fraction) + values[high] * fraction
+    return result
+
+
+class QualityStats:
+    """
+    Mergeable per-group quality aggregates of a dataset.
+    
+    Attributes:
+    -----------
+    groups : list
+        Group labels (cities)
+    columns, numeric : list of str
+        All columns, and the numeric ones
+    rows, complete : np.ndarray
+        Rows and rows with every core column present, per group
+    missing : np.ndarray
+        Missing values per group (rows) and column
+    count, mean, m2, minimum, maximum : np.ndarray
+        Non-missing count, mean, sum of squared deviations from the mean,
+        min and max per group and numeric column
+    values, offsets : dict
+        Per numeric column: non-missing values sorted by group, then value,
+        and the start of every group's run (length groups + 1)
+    """
+    
+    def __init__(self, groups, columns, numeric, rows, complete, missing, count, mean, m2, minimum, maximum,
+                 values, offsets):
+        self.groups = list(groups)
+        self.columns = list(columns)
+        self.numeric = list(numeric)
+        self.rows = rows
+        self.complete = complete
+        self.missing = missing
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.minimum = minimum
+        self.maximum = maximum
+        self.values = values
+        self.offsets = offsets
+    
+    @classmethod
+    def from_frame(cls, df, group='city', core=CORE_COLUMNS):
+        """
+        Aggregate a frame in one grouped pass.
+        
+        Rows are ordered by group once; each column is then read once and
+        its per-group statistics come from its sorted per-group runs.
+        
+        Parameters:
+        -----------
+        df : pd.DataFrame
+            Dataset
+        group : str
+            Grouping column (missing labels form their own group)
+        core : list of str
+            Columns a complete row needs (those present in df)
+            
+        Returns:
+        --------
+        QualityStats
+        """
+        codes, labels = pd.factorize(df[group], sort=True, use_na_sentinel=False)
+        n_groups = len(labels)
+        # Order rows by group once; every group is then one contiguous run
+        # (small integer codes make the stable sort a radix sort)
+        order = np.argsort(codes.astype(np.min_scalar_type(n_groups)), kind='stable')
+        codes = codes[order]
+        rows = np.bincount(codes, minlength=n_groups)
+        
+        numeric = list(df.select_dtypes(include=[np.number]).columns)
+        shape = (n_groups, len(numeric))
+        count, mean, m2 = np.zeros(shape, dtype=np.int64), np.full(shape, np.nan), np.zeros(shape)
+        minimum, maximum = np.full(shape, np.nan), np.full(shape, np.nan)
+        values, offsets = {}, {}
+        missing = np.zeros((n_groups, len(df.columns)), dtype=np.int64)
+        is_complete = np.ones(len(df), dtype=bool)
+        
+        for k, col in enumerate(df.columns):
+            if col not in numeric:
+                isna = df[col].isna().to_numpy()[order]
+                missing[:, k] = np.bincount(codes, weights=isna, minlength=n_groups)
+                if col in core:
+                    is_complete &= ~isna
+                continue
+            
+            j = numeric.index(col)
+            column = df[col].to_numpy(dtype=float, na_value=np.nan)[order]
+            present = ~np.isnan(column)
+            ids = codes[present]
+            count[:, j] = np.bincount(ids, minlength=n_groups)
+            missing[:, k] = rows - count[:, j]
+            if col in core:
+                is_complete &= present
+            
+            offsets[col] = np.concatenate([[0], np.cumsum(count[:, j])])
+            values[col] = run = _sort_runs(column[present], offsets[col])
+            has = count[:, j] > 0
+            minimum[has, j] = run[offsets[col][:-1][has]]
+            maximum[has, j] = run[offsets[col][1:][has] - 1]
+            mean[has, j] = np.bincount(ids, weights=run, minlength=n_groups)[has] / count[has, j]
+            deviation = run - mean[ids, j]
+            m2[:, j] = np.bincount(ids, weights=deviation * deviation, minlength=n_groups)
+        
+        complete = np.bincount(codes, weights=is_complete, minlength=n_groups).astype(np.int64)
+        
+        return cls(labels, df.columns, numeric, rows, complete, missing, count, mean, m2, minimum, maximum,
+                   values, offsets)
+    
+    def merge(self, other):
+        """
+        Combine with the aggregates of other rows of the same columns.
+        
+        Groups present in both are combined (counts add, means and squared
+        deviations combine exactly, sorted values are merged); the others
+        are kept as they are.
+        """
+        return QualityStats._combine([self, other])
+    
+    def total(self, label='All'):
+        """
+        Merge every group into one.
+        """
+        return QualityStats._combine([self], relabel=lambda group: label)
+    
+    @staticmethod
+    def _combine(parts, relabel=None):
+        """
+        Combine aggregates group by group (optionally after relabelling groups).
+        """
+        if any(stats.columns != parts[0].columns for stats in parts):
+            raise ValueError("Cannot merge quality aggregates of different columns")
+        keys = [[relabel(group) if relabel else group for group in stats.groups] for stats in parts]
+        keys = [[_MISSING_GROUP if pd.isna(key) else key for key in part_keys] for part_keys in keys]
+        groups = list(dict.fromkeys(key for part_keys in keys for key in part_keys))
+        index = {key: i for i, key in enumerate(groups)}
+        ids = [np.array([index[key] for key in part_keys], dtype=np.int64) for part_keys in keys]
+        n_groups = len(groups)
+        groups = [np.nan if key is _MISSING_GROUP else key for key in groups]
+        
+        def combine(name, ufunc=np.add, fill=0):
+            arrays = [getattr(stats, name) for stats in parts]
+            out = np.full((n_groups,) + arrays[0].shape[1:], fill, dtype=np.result_type(*arrays))
+            for array, idx in zip(arrays, ids):
+                ufunc.at(out, idx, array)
+            return out
+        
+        rows, complete, missing, count = (combine(name) for name in ('rows', 'complete', 'missing', 'count'))
+        # Pairwise combination of means and squared deviations (Chan et al.)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = combine('sums') / count
+        m2 = combine('m2')
+        for stats, idx in zip(parts, ids):
+            delta = np.nan_to_num(stats.mean - mean[idx])
+            np.add.at(m2, idx, stats.count * delta * delta)
+        minimum = combine('minimum', np.fmin, np.nan)
+        maximum = combine('maximum', np.fmax, np.nan)
+        
+        values, offsets = {}, {}
+        for j, col in enumerate(parts[0].numeric):
+            run_ids = np.concatenate([np.repeat(idx, stats.count[:, j]) for stats, idx in zip(parts, ids)])
+            run = np.concatenate([stats.values[col] for stats in parts])
+            offsets[col] = np.concatenate([[0], np.cumsum(count[:, j])])
+            values[col] = _sort_runs(run[np.argsort(run_ids.astype(np.min_scalar_type(n_groups)), kind='stable')],
+                                     offsets[col])
+        
+        return QualityStats(groups, parts[0].columns, parts[0].numeric, rows, complete, missing, count, mean,
+                            m2, minimum, maximum, values, offsets)
+    
+    @property
+    def sums(self):
+        """
+        Sum of the non-missing values per group and numeric column.
+        """
+        return np.nan_to_num(self.mean) * self.count
+    
+    def summary(self):
+        """
+        describe()-style statistics per group: dict of numeric column ->
+        DataFrame indexed by group (count, mean, std, min, quartiles, max).
+        """
+        tables = {}
+        for j, col in enumerate(self.numeric):
+            count = self.count[:, j]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                std = np.sqrt(self.m2[:, j] / (count - 1))
+            table = {'count': count, 'mean': self.mean[:, j], 'std': np.where(count > 1, std, np.nan),
+                     'min': self.minimum[:, j]}
+            for q in REPORT_QUANTILES:
+                table[f"{q:.0%}"] = _sorted_quantiles(self.values[col], self.offsets[col], q)
+            table['max'] = self.maximum[:, j]
+            tables[col] = pd.DataFrame(table, index=pd.Index(self.groups))
+        return tables
+    
+    def outliers(self, factor=OUTLIER_IQR_FACTOR):
+        """
+        Values outside the IQR fences of their own group, per group and
+        numeric column.
+        """
+        flagged = np.zeros((len(self.groups), len(self.numeric)), dtype=np.int64)
+        for j, col in enumerate(self.numeric):
+            values, offsets = self.values[col], self.offsets[col]
+            q1 = _sorted_quantiles(values, offsets, 0.25)
+            q3 = _sorted_quantiles(values, offsets, 0.75)
+            low, high = q1 - factor * (q3 - q1), q3 + factor * (q3 - q1)
+            # Runs are sorted, so the values inside the fences are a contiguous slice
+            for g in np.flatnonzero(np.diff(offsets) > 0):
+                run = values[offsets[g]:offsets[g + 1]]
+                inside = np.searchsorted(run, high[g], side='right') - np.searchsorted(run, low[g], side='left')
+                flagged[g, j] = len(run) - inside
+        return flagged
+
+
+def build_report(df, group='city', core=CORE_COLUMNS):
+    """
+    Compute the quality report of a dataset.
+    
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Dataset (e.g. from create_final_dataset)
+    group : str
+        City column
+    core : list of str
+        Columns a complete neighborhood needs
+        
+    Returns:
+    --------
+    dict
+        JSON-serializable report: dimensions, completeness (overall and by
+        city), missing values per column, summary statistics per column
+        (overall and by city) and outlier counts
+    """
+    by_city = QualityStats.from_frame(df, group=group, core=core)
+    overall = by_city.total()
+    n_rows, n_cols = len(df), len(df.columns)
+    
+    city_summary = by_city.summary()
+    overall_summary = overall.summary()
+    city_outliers = by_city.outliers()
+    overall_outliers = overall.outliers()
+    
+    def clean(value):
+        value = value.item() if hasattr(value, 'item') else value
+        return None if isinstance(value, float) and not np.isfinite(value) else value
+    
+    report = {
+        'dimensions': {'rows': n_rows, 'columns': n_cols, 'cells': n_rows * n_cols},
+        'core_columns': [col for col in core if col in df.columns],
+        'complete': {'rows': clean(overall.complete[0]) if n_rows else 0},
+        'cities': [],
+        'missing': {},
+        'statistics': {},
+        'outliers': {'iqr_factor': OUTLIER_IQR_FACTOR, 'columns': {}},
+    }
+    for g, city in enumerate(by_city.groups):
+        report['cities'].append({
+            'city': clean(city) if pd.notna(city) else None,
+            'rows': clean(by_city.rows[g]),
+            'complete': clean(by_city.complete[g]),
+            'missing': {col: clean(by_city.missing[g, k]) for k, col in enumerate(by_city.columns)},
+        })
+    for k, col in enumerate(by_city.columns):
+        total = int(by_city.missing[:, k].sum())
+        report['missing'][col] = {'count': total, 'share': total / n_rows if n_rows else None}
+    for j, col in enumerate(by_city.numeric):
+        report['statistics'][col] = {
+            'overall': {stat: clean(value) for stat, value in overall_summary[col].iloc[0].items()}
+                       if n_rows else {},
+            'by_city': {str(city): {stat: clean(value) for stat, value in row.items()}
+                        for city, row in city_summary[col].iterrows()},
+        }
+        report['outliers']['columns'][col] = {
+            'overall': clean(overall_outliers[0, j]) if n_rows else 0,
+            'within_city': clean(city_outliers[:, j].sum()),
+            'by_city': {str(city): clean(city_outliers[g, j]) for g, city in enumerate(by_city.groups)},
+        }
+    return report
+
+
+def format_report(report):
+    """
+    Render a report from build_report as text.
+    """
+    n_rows, n_cols = report['dimensions']['rows'], report['dimensions']['columns']
+    lines = ["\n" + "="*80, "DATA QUALITY REPORT", "="*80]
+    
+    lines += [f"\nMerging: DATASET DIMENSIONS", "-"*80,
+              f"Neighborhoods: {n_rows}", f"Variables: {n_cols}", f"Total data points: {n_rows * n_cols}"]
+    
+    complete = report['complete']['rows']
+    lines += [f"\nMerging: COMPLETE NEIGHBORHOODS", "-"*80,
+              f"Neighborhoods with core variables: {complete} ({complete / n_rows * 100 if n_rows else 0:.1f}%)"]
+    
+    lines += [f"\nMerging: NEIGHBORHOODS BY CITY", "-"*80]
+    for city in sorted(report['cities'], key=lambda entry: -entry['rows']):
+        pct = (city['complete'] / city['rows'] * 100) if city['rows'] > 0 else 0
+        lines.append(f"  {str(city['city']).title():20s}: {city['rows']:3d} total, "
+                     f"{city['complete']:3d} complete ({pct:.1f}%)")
+    
+    lines += [f"\nMerging: MISSING VALUES", "-"*80]
+    for col, missing in report['missing'].items():
+        miss_count, miss_pct = missing['count'], round((missing['share'] or 0) * 100, 1)
+        status = "+" if miss_count == 0 else ("WARNING: " if miss_pct < 50 else "ERROR:")
+        lines.append(f"  {status} {col:30s}: {miss_count:4d} missing ({miss_pct:5.1f}%)")
+    total_missing = sum(missing['count'] for missing in report['missing'].values())
+    total_cells = report['dimensions']['cells']
+    total_pct = round(total_missing / total_cells * 100, 1) if total_cells else 0.0
+    lines.append(f"\n  Total missing: {total_missing:,} / {total_cells:,} ({total_pct}%)")
+    
+    lines += [f"\nMerging: SUMMARY STATISTICS", "-"*80]
+    summary = pd.DataFrame({col: stats['overall'] for col, stats in report['statistics'].items()}, dtype=float)
+    lines.append(summary.round(2).to_string())
+    
+    flagged = {col: counts for col, counts in report['outliers']['columns'].items() if counts['within_city']}
+    lines += [f"\nMerging: OUTLIERS (beyond {report['outliers']['iqr_factor']} IQR of the city quartiles)", "-"*80]
+    if not flagged:
+        lines.append("  + None")
+    for col, counts in flagged.items():
+        worst = sorted(counts['by_city'].items(), key=lambda item: -item[1])[:3]
+        detail = ", ".join(f"{city.title()} {n}" for city, n in worst if n)
+        lines.append(f"  {col:30s}: {counts['within_city']:4d} ({detail})")
+    return "\n".join(lines)
+
+
+def write_report_json(report, path):
+    """
+    Write a report as JSON (atomically).
+    """
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    os.replace(tmp_path, path)
@@ -0,0 +1,237 @@
+"""
+Batch Loader for Multi-File Source Directories
+==============================================
+Discovers every CSV in a source category directory (e.g. the 27 Census
+Demographics round files), reads them in parallel, normalizes their columns
+to a shared schema and stacks them into one frame tagged with the source
+file. Duplicate (city, neighborhood) rows are then resolved in a single
+grouped pass by source priority.
+
+Priority comes from an optional sources.json manifest in the directory:
+
+    {"files": ["neighborhood_demographics_acs_2023.csv", "austin_zip_...csv"]}
+
+Files listed earlier win. CSVs in the directory that the manifest does not
+list are still loaded, after the listed ones in alphabetical order, so a new
+round of data only has to be dropped into the folder.
+
+Author: Econometrics Project
+Date: 2026-10-16
+"""
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from text_keys import normalize_keys
+
+
+# Name of the optional priority manifest inside a category directory
+MANIFEST_NAME = 'sources.json'
+
+# Column name variants seen across source files, mapped to the shared schema
+COLUMN_ALIASES = {
+    'neighbourhood': 'neighborhood',
+    'neighborhood_name': 'neighborhood',
+    'city_name': 'city',
+    'median_income': 'median_household_income',
+    'household_income': 'median_household_income',
+    'pop_density': 'population_density',
+    'pct_bachelors': 'pct_college',
+    'total_housing_units': 'housing_units',
+    'rent': 'median_rent',
+    'is_tourist_area': 'tourist_area',
+}
+
+KEYS = ['city', 'neighborhood']
+
+
+def discover_source_files(directory, pattern='*.csv'):
+    """
+    List the source files of a category directory in priority order.
+    
+    Parameters:
+    -----------
+    directory : str
+        Category directory
+    pattern : str
+        Glob pattern for source files
+        
+    Returns:
+    --------
+    list of Path
+        Files in priority order (manifest order first, then unlisted files
+        alphabetically)
+    """
+    directory = Path(directory)
+    found = {path.name: path for path in sorted(directory.glob(pattern))}
+    
+    listed = []
+    manifest_path = directory / MANIFEST_NAME
+    if manifest_path.exists():
+        with open(manifest_path) as f:
+            listed = json.load(f).get('files', [])
+    
+    ordered = []
+    for name in listed:
+        if name in found:
+            ordered.append(found.pop(name))
+        else:
+            print(f"   WARNING: {MANIFEST_NAME} lists a missing file: {name}")
+    
+    if listed and found:
+        print(f"   + {len(found)} file(s) not in {MANIFEST_NAME}, loaded last: {', '.join(found)}")
+    
+    return ordered + list(found.values())
+
+
+def rename_source_columns(df):
+    """
+    Lowercase and alias a source file's column names (first of duplicates kept).
+    """
+    df = df.copy()
+    df.columns = [
+        COLUMN_ALIASES.get(name, name)
+        for name in (str(col).strip().lower().replace(' ', '_').replace('-', '_') for col in df.columns)
+    ]
+    return df.loc[:, ~df.columns.duplicated()]
+
+
+def read_source_file(path, cache=None, quiet=True):
+    """
+    Read one source file as it stands, through the input cache when given.
+    """
+    if cache is not None:
+        return cache.load(str(path), 'source-table', pd.read_csv, quiet=quiet)
+    return pd.read_csv(path)
+
+
+def normalize_source_columns(df, columns):
+    """
+    Normalize one source file to the shared schema.
+    
+    Column names are lowercased and aliased, keys are standardized, schema
+    columns the file lacks are added as missing, and value columns are
+    coerced to numbers (stripping '$' and ',' from formatted strings).
+    
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Raw source frame
+    columns : list
+        Value columns of the shared schema
+        
+    Returns:
+    --------
+    pd.DataFrame
+        Frame with exactly KEYS + columns
+    """
+    df = rename_source_columns(df)
+    
+    missing_keys = [key for key in KEYS if key not in df.columns]
+    if missing_keys:
+        raise ValueError(f"Source file has no {' / '.join(missing_keys)} column")
+    
+    df = df.reindex(columns=KEYS + list(columns))
+    df['city'] = normalize_keys(df['city'])
+    df['neighborhood'] = normalize_keys(df['neighborhood'])
+    
+    for col in columns:
+        if not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = df[col].astype(str).str.replace(r'[$,]', '', regex=True)
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    
+    return df
+
+
+def load_source_directory(directory, columns, cache=None, max_workers=8, crosswalk=None):
+    """
+    Read every source file of a category directory into one stacked frame.
+    
+    Rows keyed by ZIP code, council district or an alternate name are
+    remapped onto neighborhoods file by file when a crosswalk is given.
+    
+    Parameters:
+    -----------
+    directory : str
+        Category directory
+    columns : list
+        Value columns of the shared schema
+    cache : InputCache, optional
+        Columnar cache of parsed inputs
+    max_workers : int
+        Threads used to read files concurrently
+    crosswalk : Crosswalk, optional
+        Crosswalk applied to each file (see crosswalk.Crosswalk.remap)
+        
+    Returns:
+    --------
+    pd.DataFrame
+        KEYS + columns + ['source_file', 'source_priority'], one row per
+        source row, in priority order
+    """
+    files = discover_source_files(directory)
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(files)))) as executor:
+        raw_frames = list(executor.map(lambda path: read_source_file(path, cache), files))
+    
+    frames = []
+    for priority, (path, raw) in enumerate(zip(files, raw_frames)):
+        df = normalize_source_columns(raw, columns)
+        print(f"   + {path.name}: {len(df)} rows")
+        if crosswalk is not None:
+            df = crosswalk.remap(df, path.name)
+        df['source_file'] = path.name
+        df['source_priority'] = priority
+        frames.append(df)
+    
+    if not frames:
+        return pd.DataFrame(columns=KEYS + list(columns) + ['source_file', 'source_priority'])
+    
+    return pd.concat(frames, ignore_index=True)
+
+
+def collapse_sources(stacked, columns):
+    """
+    Resolve duplicate keys across stacked source files in one grouped pass.
+    
+    For every (city, neighborhood) and column, the value from the
+    highest-priority file that has one is kept, which is the same as filling
+    file by file without overwriting.
+    
+    Parameters:
+    -----------
+    stacked : pd.DataFrame
+        Output of load_source_directory
+    columns : list
+        Value columns to resolve
+        
+    Returns:
+    --------
+    tuple
+        (resolved, provenance): both unique on KEYS with the given columns;
+        provenance holds the source file of each resolved value
+    """
+    stacked = stacked.dropna(subset=KEYS).sort_values('source_priority', kind='stable')
+    
+    # Pair every value column with its source file (only where it has a value)
+    source_columns = [f"{col}__source" for col in columns]
+    source_labels = {
+        label: stacked['source_file'].where(stacked[col].notna())
+        for col, label in zip(columns, source_columns)
+    }
+    combined = stacked[KEYS + list(columns)].assign(**source_labels)
+    
+    # One grouped pass: first non-missing value (and its source) per key
+    first = combined.groupby(KEYS, sort=False).first().reset_index()
+    
+    resolved = first[KEYS + list(columns)]
+    provenance = first[KEYS + source_columns].rename(columns=dict(zip(source_columns, columns)))
+    
+    n_duplicates = len(stacked) - len(first)
+    if n_duplicates > 0:
+        print(f"   + Resolved {n_duplicates} duplicate rows by source priority")
+    
+    return resolved, provenance
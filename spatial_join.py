@@ -0,0 +1,361 @@
+"""
+Spatial Join of Listings to Boundary Polygons
+=============================================
+Assigns every listing to the polygon (ZIP code, council district, census
+tract, neighborhood) that contains its latitude/longitude, so listings line
+up with the geography of the demographic and rent data without relying on
+neighborhood names.
+
+Boundaries are read from a GeoJSON file or, if the optional pyshp package is
+installed, an ESRI shapefile. A uniform grid index is built over them: grid
+cells that no polygon edge crosses are labelled once with the polygon they
+lie in (or none), so points in those cells are assigned with a single array
+lookup. Only points in cells crossed by an edge run a vectorized
+point-in-polygon (even-odd ray casting) test against the few polygons
+touching their cell. The built index is cached on disk as an .npz file,
+keyed by the boundary file's content.
+
+Author: Econometrics Project
+Date: 2026-10-16
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from cache_layout import file_sha256
+
+try:
+    import shapefile  # pyshp
+except ImportError:  # pragma: no cover - optional dependency
+    shapefile = None
+
+
+# Bump when the index layout changes so cached indexes are rebuilt
+SPATIAL_INDEX_VERSION = 1
+
+# Feature properties tried, in order, for the unit label of a polygon
+NAME_PROPERTIES = ['neighborhood', 'neighbourhood', 'name', 'NAME', 'zcta', 'ZCTA5CE20', 'GEOID', 'district']
+
+# Upper bound on grid cells per side
+MAX_GRID_SIZE = 1024
+
+# Point-edge pairs tested per vectorized block, to bound memory
+TEST_BLOCK_SIZE = 4_000_000
+
+
+def _feature_label(properties, name_property=None):
+    """
+    Unit label of a feature from its properties.
+    """
+    if name_property is not None:
+        return str(properties[name_property])
+    for key in NAME_PROPERTIES:
+        if properties.get(key) is not None:
+            return str(properties[key])
+    raise ValueError(f"Boundary feature has none of the label properties {NAME_PROPERTIES}")
+
+
+def read_boundaries(path, name_property=None):
+    """
+    Read polygon boundaries from a GeoJSON file or shapefile.
+    
+    Parameters:
+    -----------
+    path : str
+        .geojson/.json or .shp file
+    name_property : str, optional
+        Feature property holding the unit label (default: first of
+        NAME_PROPERTIES present)
+        
+    Returns:
+    --------
+    tuple
+        (labels, rings) where labels holds one label per polygon and rings
+        one list of (n, 2) lon/lat arrays per polygon (outer rings and holes
+        together; holes are handled by the even-odd rule)
+    """
+    path = Path(path)
+    labels, rings = [], []
+    
+    if path.suffix.lower() == '.shp':
+        if shapefile is None:
+            raise ImportError("Reading shapefiles requires pyshp (pip install pyshp); "
+                              "or convert the boundaries to GeoJSON")
+        reader = shapefile.Reader(str(path))
+        for record in reader.iterShapeRecords():
+            points = np.asarray(record.shape.points, dtype=float)
+            parts = list(record.shape.parts) + [len(points)]
+            labels.append(_feature_label(record.record.as_dict(), name_property))
+            rings.append([points[start:end] for start, end in zip(parts[:-1], parts[1:])])
+        return labels, rings
+    
+    with open(path) as f:
+        collection = json.load(f)
+    
+    for feature in collection.get('features', []):
+        geometry = feature.get('geometry') or {}
+        if geometry.get('type') == 'Polygon':
+            polygons = [geometry['coordinates']]
+        elif geometry.get('type') == 'MultiPolygon':
+            polygons = geometry['coordinates']
+        else:
+            continue
+        labels.append(_feature_label(feature.get('properties') or {}, name_property))
+        rings.append([np.asarray(ring, dtype=float)[:, :2] for polygon in polygons for ring in polygon])
+    
+    return labels, rings
+
+
+class SpatialIndex:
+    """
+    Uniform grid index over polygon edges for point-in-polygon lookups.
+    
+    Parameters:
+    -----------
+    labels : np.ndarray
+        Unit label per polygon
+    edges : np.ndarray
+        (n_edges, 4) array of x0, y0, x1, y1
+    edge_poly : np.ndarray
+        Polygon of each edge; edges are sorted by polygon
+    bounds : np.ndarray
+        Grid extent: min_x, min_y, max_x, max_y
+    cell_owner : np.ndarray
+        Per cell: polygon containing the whole cell, -1 for none, -2 if the
+        cell is crossed by an edge
+    cell_ptr, cell_polys : np.ndarray
+        CSR lists of the polygons touching each crossed cell
+    """
+    
+    def __init__(self, labels, edges, edge_poly, bounds, cell_owner, cell_ptr, cell_polys):
+        self.labels = labels
+        self.edges = edges
+        self.edge_poly = edge_poly
+        self.bounds = bounds
+        self.cell_owner = cell_owner
+        self.cell_ptr = cell_ptr
+        self.cell_polys = cell_polys
+        self.grid_size = int(round(np.sqrt(len(cell_owner))))
+        self.edge_ptr = np.searchsorted(edge_poly, np.arange(len(labels) + 1))
+    
+    @classmethod
+    def build(cls, labels, rings, grid_size=None):
+        """
+        Build the index from read_boundaries output.
+        """
+        edge_blocks, poly_blocks = [], []
+        for poly, poly_rings in enumerate(rings):
+            for ring in poly_rings:
+                if len(ring) < 3:
+                    continue
+                closed = ring if np.array_equal(ring[0], ring[-1]) else np.vstack([ring, ring[:1]])
+                edge_blocks.append(np.hstack([closed[:-1], closed[1:]]))
+                poly_blocks.append(np.full(len(closed) - 1, poly, dtype=np.int32))
+        edges = np.vstack(edge_blocks)
+        edge_poly = np.concatenate(poly_blocks)
+        
+        min_x, min_y = edges[:, [0, 2]].min(), edges[:, [1, 3]].min()
+        max_x, max_y = edges[:, [0, 2]].max(), edges[:, [1, 3]].max()
+        pad = 1e-9 + 1e-6 * max(max_x - min_x, max_y - min_y)
+        bounds = np.array([min_x - pad, min_y - pad, max_x + pad, max_y + pad])
+        
+        if grid_size is None:
+            grid_size = int(np.clip(2 * np.sqrt(len(edges)), 16, MAX_GRID_SIZE))
+        
+        # Cells overlapped by each edge's bounding box
+        cell_w = (bounds[2] - bounds[0]) / grid_size
+        cell_h = (bounds[3] - bounds[1]) / grid_size
+        ix0 = ((np.minimum(edges[:, 0], edges[:, 2]) - bounds[0]) // cell_w).astype(np.int64)
+        ix1 = ((np.maximum(edges[:, 0], edges[:, 2]) - bounds[0]) // cell_w).astype(np.int64)
+        iy0 = ((np.minimum(edges[:, 1], edges[:, 3]) - bounds[1]) // cell_h).astype(np.int64)
+        iy1 = ((np.maximum(edges[:, 1], edges[:, 3]) - bounds[1]) // cell_h).astype(np.int64)
+        nx, ny = ix1 - ix0 + 1, iy1 - iy0 + 1
+        n_cells = nx * ny
+        edge_ids = np.repeat(np.arange(len(edges)), n_cells)
+        offsets = np.arange(n_cells.sum()) - np.repeat(np.cumsum(n_cells) - n_cells, n_cells)
+        cell_x = ix0[edge_ids] + offsets % nx[edge_ids]
+        cell_y = iy0[edge_ids] + offsets // nx[edge_ids]
+        cells = cell_y * grid_size + cell_x
+        
+        crossing = np.unique(cells * len(labels) + edge_poly[edge_ids])
+        
+        # A polygon whose edges do not cross a cell contains either all of it
+        # or none of it, so testing cell centers finds the remaining
+        # (cell, polygon) pairs: whole cells inside a polygon
+        n_grid = grid_size * grid_size
+        index = cls(np.asarray(labels, dtype=str), edges, edge_poly, bounds,
+                    np.zeros(n_grid, dtype=np.int32), np.zeros(n_grid + 1, dtype=np.int64),
+                    np.zeros(0, dtype=np.int32))
+        all_cells = np.arange(n_grid)
+        center_cells, center_polys = index._containing(
+            bounds[0] + (all_cells % grid_size + 0.5) * cell_w,
+            bounds[1] + (all_cells // grid_size + 0.5) * cell_h
+        )
+        
+        # Unique (cell, polygon) pairs as CSR lists
+        pairs = np.union1d(crossing, center_cells * len(labels) + center_polys)
+        pair_cells, pair_polys = pairs // len(labels), (pairs % len(labels)).astype(np.int32)
+        cell_ptr = np.searchsorted(pair_cells, np.arange(n_grid + 1))
+        
+        # Cells crossed by no edge are owned by their first containing polygon
+        # (or none) and need no test at lookup time
+        cell_owner = np.full(n_grid, -2, dtype=np.int32)
+        crossed = np.zeros(n_grid, dtype=bool)
+        crossed[crossing // len(labels)] = True
+        n_pairs = np.diff(cell_ptr)
+        cell_owner[~crossed & (n_pairs == 0)] = -1
+        owned = ~crossed & (n_pairs > 0)
+        cell_owner[owned] = pair_polys[cell_ptr[:-1][owned]]
+        
+        return cls(index.labels, edges, edge_poly, bounds, cell_owner, cell_ptr, pair_polys)
+    
+    def _test(self, px, py, poly):
+        """
+        Even-odd ray casting of points against one polygon.
+        """
+        edges = self.edges[self.edge_ptr[poly]:self.edge_ptr[poly + 1]]
+        inside = np.zeros(len(px), dtype=bool)
+        block = max(1, TEST_BLOCK_SIZE // max(1, len(edges)))
+        for start in range(0, len(px), block):
+            x = px[start:start + block, None]
+            y = py[start:start + block, None]
+            x0, y0, x1, y1 = edges[:, 0], edges[:, 1], edges[:, 2], edges[:, 3]
+            crosses = (y0 > y) != (y1 > y)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                x_cross = x0 + (y - y0) * (x1 - x0) / (y1 - y0)
+            inside[start:start + block] = np.logical_xor.reduce(crosses & (x < x_cross), axis=1)
+        return inside
+    
+    def _containing(self, px, py):
+        """
+        Every (point, polygon) pair where the polygon contains the point,
+        testing each polygon against the points within its extent (used only
+        while building the index).
+        """
+        hit_points, hit_polys = [], []
+        for poly in range(len(self.labels)):
+            edges = self.edges[self.edge_ptr[poly]:self.edge_ptr[poly + 1]]
+            candidates = np.flatnonzero(
+                (px >= edges[:, [0, 2]].min()) & (px <= edges[:, [0, 2]].max())
+                & (py >= edges[:, [1, 3]].min()) & (py <= edges[:, [1, 3]].max())
+            )
+            if len(candidates):
+                found = candidates[self._test(px[candidates], py[candidates], poly)]
+                hit_points.append(found)
+                hit_polys.append(np.full(len(found), poly, dtype=np.int64))
+        if not hit_points:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return np.concatenate(hit_points), np.concatenate(hit_polys)
+    
+    def locate(self, lon, lat):
+        """
+        Find the polygon containing each point.
+        
+        Parameters:
+        -----------
+        lon, lat : np.ndarray
+            Point coordinates
+            
+        Returns:
+        --------
+        np.ndarray
+            Polygon position per point (-1 outside every polygon or missing)
+        """
+        lon = np.asarray(lon, dtype=float)
+        lat = np.asarray(lat, dtype=float)
+        cell_w = (self.bounds[2] - self.bounds[0]) / self.grid_size
+        cell_h = (self.bounds[3] - self.bounds[1]) / self.grid_size
+        
+        with np.errstate(invalid='ignore'):
+            ix = np.floor((lon - self.bounds[0]) / cell_w)
+            iy = np.floor((lat - self.bounds[1]) / cell_h)
+        in_grid = (ix >= 0) & (ix < self.grid_size) & (iy >= 0) & (iy < self.grid_size)
+        
+        result = np.full(len(lon), -1, dtype=np.int32)
+        cells = np.where(in_grid, iy * self.grid_size + ix, 0).astype(np.int64)
+        owner = np.where(in_grid, self.cell_owner[cells], -1)
+        result[owner >= 0] = owner[owner >= 0]
+        
+        # Points in crossed cells: test against the polygons touching the cell
+        boundary = np.flatnonzero(owner == -2)
+        counts = np.diff(self.cell_ptr)[cells[boundary]]
+        points = np.repeat(boundary, counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        polys = self.cell_polys[np.repeat(self.cell_ptr[cells[boundary]], counts) + offsets]
+        
+        # Lowest polygon wins where polygons overlap
+        order = np.lexsort((points, polys))
+        points, polys = points[order], polys[order]
+        splits = np.flatnonzero(np.diff(polys)) + 1
+        for block_points, block_polys in zip(np.split(points, splits), np.split(polys, splits)):
+            if len(block_points) == 0:
+                continue
+            hit = self._test(lon[block_points], lat[block_points], block_polys[0])
+            found = block_points[hit]
+            unset = result[found] < 0
+            result[found[unset]] = block_polys[0]
+        
+        return result
+    
+    def save(self, path):
+        """
+        Store the index arrays as an uncompressed .npz file.
+        
+        Written under a per-process temp name and renamed into place, so
+        concurrent runs sharing the cache never clobber each other's file.
+        """
+        tmp_path = Path(f"{path}.tmp{os.getpid()}.npz")
+        np.savez(tmp_path, version=SPATIAL_INDEX_VERSION, labels=self.labels, edges=self.edges,
+                 edge_poly=self.edge_poly, bounds=self.bounds, cell_owner=self.cell_owner,
+                 cell_ptr=self.cell_ptr, cell_polys=self.cell_polys)
+        tmp_path.replace(path)
+    
+    @classmethod
+    def load(cls, path):
+        """
+        Load an index stored by save() (None if the layout is outdated).
+        """
+        with np.load(path, allow_pickle=False) as arrays:
+            if int(arrays['version']) != SPATIAL_INDEX_VERSION:
+                return None
+            return cls(*(arrays[name] for name in
+                         ['labels', 'edges', 'edge_poly', 'bounds', 'cell_owner', 'cell_ptr', 'cell_polys']))
+
+
+def load_spatial_index(path, cache_dir=None, name_property=None):
+    """
+    Load the spatial index of a boundary file, building and caching it if needed.
+    
+    Parameters:
+    -----------
+    path : str
+        Boundary file (GeoJSON or shapefile)
+    cache_dir : str, optional
+        Where built indexes are cached (no caching if None)
+    name_property : str, optional
+        Feature property holding the unit label
+        
+    Returns:
+    --------
+    SpatialIndex
+        Index over the file's polygons
+    """
+    cache_path = None
+    if cache_dir is not None:
+        key = f"{file_sha256(path)[:16]}-{name_property or 'auto'}"
+        cache_path = Path(cache_dir) / f"{Path(path).stem}-spatial-{key}.npz"
+        if cache_path.exists():
+            index = SpatialIndex.load(cache_path)
+            if index is not None:
+                return index
+    
+    index = SpatialIndex.build(*read_boundaries(path, name_property))
+    
+    if cache_path is not None:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        index.save(cache_path)
+    
+    return index
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Specification Sweep over the Neighborhood Dataset
+=================================================
+Runs a grid of OLS specifications (levels vs logs, optional controls,
+per-city and leave-one-city-out subsamples, trimmed outliers) on the
+exported dataset and writes one tidy results table.
+
+Every variable any specification uses is put in one matrix Z next to the
+city dummies, and the cross-product Z'Z is computed once per city. The
+cross-products of a sample are then derived rather than recomputed: the
+full sample sums the per-city blocks, a city subsample is its own block, a
+leave-one-city-out sample subtracts one block, and a trimmed sample
+subtracts the rank-one terms z_i z_i' of the trimmed rows. Each
+specification only solves its own small sub-block of the matching
+cross-product matrix; the data rows are touched again just for the robust
+and clustered variance.
+
+City fixed effects are partialled out of each sample's cross-product
+(a constant in one-city samples), so estimates equal estimation.estimate()
+on the same sample.
+
+Author: Econometrics Project
+Date: 2026-10-16
+"""
+
+import argparse
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from estimation import t_pvalue
+from export_formats import read_dataset
+
+
+# Specification grid: every combination of depvar, density and income
+# term, with the fixed controls, any subset of the optional controls and
+# every sample in 'samples'
+SWEEP_GRID = {
+    'depvar': ['median_rent', 'log_rent'],
+    'density': ['airbnb_density', 'log_airbnb_density'],
+    'income': ['median_household_income', 'log_income'],
+    'fixed': ['tourist_area'],
+    'optional': ['pct_college', 'population_density', 'housing_units'],
+    # all, city (each city alone), drop_city (leave one city out) and trim
+    # (drop the dependent variable's tails)
+    'samples': ['all', 'city', 'drop_city', 'trim'],
+}
+
+# Share of each tail of the dependent variable dropped in 'trim' samples
+TRIM_QUANTILE = 0.01
+
+RESULT_COLUMNS = ['spec_id', 'depvar', 'sample', 'regressors', 'term', 'coef', 'se_hc1', 'p_hc1',
+                  'se_cluster', 'p_cluster', 'nobs', 'r2']
+
+# Worker state, set once per process by _init_worker
+_STATE = {}
+
+
+def build_specs(grid, cities):
+    """
+    Expand a grid into a list of specifications.
+    
+    Parameters:
+    -----------
+    grid : dict
+        Grid definition (see SWEEP_GRID)
+    cities : list
+        Cities of the dataset, for per-city samples
+        
+    Returns:
+    --------
+    list of dict
+        One {'spec_id', 'depvar', 'terms', 'sample'} per specification;
+        sample is a (kind, city) tuple
+    """
+    samples = []
+    for kind in grid['samples']:
+        if kind in ('city', 'drop_city'):
+            samples += [(kind, city) for city in cities]
+        else:
+            samples.append((kind, None))
+    
+    optional = grid.get('optional', [])
+    control_sets = [list(subset) for size in range(len(optional) + 1)
+                    for subset in itertools.combinations(optional, size)]
+    
+    specs = []
+    for depvar, density, income, controls, sample in itertools.product(
+            grid['depvar'], grid['density'], grid['income'], control_sets, samples):
+        terms = [density, income] + list(grid.get('fixed', [])) + controls
+        specs.append({'spec_id': len(specs), 'depvar': depvar, 'terms': terms, 'sample': sample})
+    return specs
+
+
+def sample_grams(Z, codes, cities, samples, trim_masks):
+    """
+    Cross-product matrices of every sample from the per-city blocks.
+    
+    Parameters:
+    -----------
+    Z : np.ndarray
+        City dummies followed by every grid variable
+    codes : np.ndarray
+        City code of each row
+    cities : list
+        City labels
+    samples : list of tuple
+        (kind, city) samples needed
+    trim_masks : dict
+        depvar column position -> boolean mask of rows kept when trimming
+        
+    Returns:
+    --------
+    dict
+        (kind, city or depvar position) -> (gram, row mask)
+    """
+    blocks = [Z[codes == c].T @ Z[codes == c] for c in range(len(cities))]
+    total = np.sum(blocks, axis=0)
+    everyone = np.ones(len(Z), dtype=bool)
+    
+    grams = {}
+    for kind, city in samples:
+        if kind == 'all':
+            grams[(kind, None)] = (total, everyone)
+        elif kind == 'city':
+            c = cities.index(city)
+            grams[(kind, city)] = (blocks[c], codes == c)
+        elif kind == 'drop_city':
+            c = cities.index(city)
+            grams[(kind, city)] = (total - blocks[c], codes != c)
+        elif kind == 'trim':
+            for y, keep in trim_masks.items():
+                # Downdate the full cross-product by each trimmed row
+                gram = total.copy()
+                for row in Z[~keep]:
+                    gram -= np.outer(row, row)
+                grams[(kind, y)] = (gram, keep)
+    return grams
+
+
+def _init_worker(Z, codes, n_cities):
+    """
+    Store the data matrix in a worker process.
+    """
+    _STATE.update(Z=Z, codes=codes, n_cities=n_cities)
+
+
+def _solve_specs(gram, mask, jobs):
+    """
+    Fit the specifications that share one sample.
+    
+    Parameters:
+    -----------
+    gram : np.ndarray
+        Cross-product matrix of the sample
+    mask : np.ndarray
+        Rows of the sample
+    jobs : list of tuple
+        (spec_id, y position, term positions) per specification
+        
+    Returns:
+    --------
+    list of tuple
+        (spec_id, coef, se_hc1, se_cluster, df_resid, n_groups, nobs, r2)
+        per specification, with arrays over its terms (p-values are
+        computed for all specifications at once by the caller)
+    """
+    n_cities = _STATE['n_cities']
+    codes = _STATE['codes'][mask]
+    
+    # The dummy block of the cross-product is diagonal (city counts), so
+    # the city effects are partialled out of the variable block directly:
+    # W = V - S' diag(1 / counts) S, with S the per-city column sums
+    counts = np.diag(gram)[:n_cities]
+    present = counts > 0
+    n, n_groups = int(counts.sum()), int(present.sum())
+    S = gram[:n_cities, n_cities:][present]
+    W = gram[n_cities:, n_cities:] - S.T @ (S / counts[present, None])
+    tss = np.diag(gram)[n_cities:] - S.sum(axis=0) ** 2 / n
+    
+    means = np.zeros((n_cities, W.shape[0]))
+    means[present] = S / counts[present, None]
+    Z = _STATE['Z'][mask][:, n_cities:] - means[codes]
+    
+    output = []
+    for spec_id, y, terms in jobs:
+        y, terms = y - n_cities, terms - n_cities
+        k = len(terms)
+        empty = np.full(k, np.nan)
+        df_resid = n - k - n_groups
+        try:
+            bread = np.linalg.inv(W[np.ix_(terms, terms)])
+        except np.linalg.LinAlgError:
+            bread = None
+        if bread is None or df_resid <= 0 or not np.isfinite(bread).all():
+            output.append((spec_id, empty, empty, empty, df_resid, n_groups, n, np.nan))
+            continue
+        
+        beta = bread @ W[terms, y]
+        rss = W[y, y] - W[terms, y] @ beta
+        X = Z[:, terms]
+        scores = X * (Z[:, y] - X @ beta)[:, None]
+        
+        cov_hc1 = bread @ (scores.T @ scores) @ bread * (n / df_resid)
+        se_hc1 = np.sqrt(np.diag(cov_hc1))
+        
+        if n_groups > 1:
+            cluster_scores = np.stack([
+                np.bincount(codes, weights=scores[:, j], minlength=n_cities) for j in range(k)
+            ], axis=1)
+            factor = n_groups / (n_groups - 1) * (n - 1) / df_resid
+            cov_cluster = bread @ (cluster_scores.T @ cluster_scores) @ bread * factor
+            se_cluster = np.sqrt(np.diag(cov_cluster))
+        else:
+            se_cluster = empty
+        
+        output.append((spec_id, beta, se_hc1, se_cluster, df_resid, n_groups, n, 1 - rss / tss[y]))
+    return output
+
+
+def _solve_chunk(chunk):
+    """
+    Worker entry point: fit one sample's specifications.
+    """
+    return _solve_specs(*chunk)
+
+
+def run_sweep(df, grid=None, group='city', max_workers=None):
+    """
+    Run every specification of a grid.
+    
+    Rows missing any grid variable are dropped once up front, so all
+    specifications share the same base sample.
+    
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Dataset (e.g. the exported airbnb_neighborhood_panel)
+    grid : dict, optional
+        Grid definition (defaults to SWEEP_GRID)
+    group : str
+        City column (fixed effects, clusters and per-city samples)
+    max_workers : int, optional
+        Worker processes (default: CPU count; 1 = run in this process)
+        
+    Returns:
+    --------
+    pd.DataFrame
+        RESULT_COLUMNS, one row per specification and regressor term
+    """
+    grid = SWEEP_GRID if grid is None else grid
+    variables = list(dict.fromkeys(
+        grid['depvar'] + grid['density'] + grid['income'] + grid.get('fixed', []) + grid.get('optional', [])
+    ))
+    data = df.dropna(subset=variables + [group]).reset_index(drop=True)
+    if len(data) < len(df):
+        print(f"   + Dropped {len(df) - len(data)} rows missing a grid variable")
+    
+    codes, cities = pd.factorize(data[group])
+    cities = list(cities)
+    dummies = (codes[:, None] == np.arange(len(cities))).astype(float)
+    Z = np.column_stack([dummies, data[variables].to_numpy(dtype=float)])
+    position = {name: len(cities) + i for i, name in enumerate(variables)}
+    
+    specs = build_specs(grid, cities)
+    trim_masks = {}
+    for depvar in grid['depvar']:
+        low, high = data[depvar].quantile([TRIM_QUANTILE, 1 - TRIM_QUANTILE])
+        trim_masks[position[depvar]] = data[depvar].between(low, high).to_numpy()
+    grams = sample_grams(Z, codes, cities, {spec['sample'] for spec in specs}, trim_masks)
+    
+    # One chunk per sample (trim samples also differ by depvar)
+    chunks = {}
+    for spec in specs:
+        kind, city = spec['sample']
+        key = (kind, position[spec['depvar']]) if kind == 'trim' else spec['sample']
+        job = (spec['spec_id'], position[spec['depvar']], np.array([position[t] for t in spec['terms']]))
+        chunks.setdefault(key, []).append(job)
+    tasks = [(grams[key][0], grams[key][1], jobs) for key, jobs in chunks.items()]
+    
+    if max_workers is None:
+        max_workers = min(len(tasks), os.cpu_count() or 1)
+    if max_workers <= 1:
+        _init_worker(Z, codes, len(cities))
+        fitted = [row for task in tasks for row in _solve_chunk(task)]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(Z, codes, len(cities))) as executor:
+            fitted = [row for rows in executor.map(_solve_chunk, tasks) for row in rows]
+    
+    fitted.sort(key=lambda row: row[0])
+    spec_ids, coef, se_hc1, se_cluster, df_resid, n_groups, nobs, r2 = zip(*fitted)
+    sizes = [len(row) for row in coef]
+    coef, se_hc1, se_cluster = (np.concatenate(values) for values in (coef, se_hc1, se_cluster))
+    
+    def per_term(values):
+        return np.repeat(np.asarray(values), sizes)
+    
+    samples = [specs[i]['sample'] for i in spec_ids]
+    results = pd.DataFrame({
+        'spec_id': per_term(spec_ids),
+        'depvar': per_term([specs[i]['depvar'] for i in spec_ids]),
+        'sample': per_term([kind if city is None else f"{kind}:{city}" for kind, city in samples]),
+        'regressors': per_term([' + '.join(specs[i]['terms']) for i in spec_ids]),
+        'term': [term for i in spec_ids for term in specs[i]['terms']],
+        'coef': coef,
+        'se_hc1': se_hc1,
+        'p_hc1': t_pvalue(coef / se_hc1, per_term(df_resid)),
+        'se_cluster': se_cluster,
+        'p_cluster': t_pvalue(coef / se_cluster, per_term(n_groups) - 1),
+        'nobs': per_term(nobs),
+        'r2': per_term(r2),
+    })
+    return results[RESULT_COLUMNS]
+
+
+def main(argv=None):
+    """
+    Run the default grid on an exported dataset and write the results.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('dataset', help="Exported dataset (e.g. data/airbnb_neighborhood_panel.feather)")
+    parser.add_argument('--output', default=None,
+                        help="Results CSV (default: <dataset>_sweep.csv)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Worker processes (default: CPU count; 1 = serial)")
+    args = parser.parse_args(argv)
+    
+    df = read_dataset(args.dataset)
+    results = run_sweep(df, max_workers=args.workers)
+    output = args.output or f"{os.path.splitext(args.dataset)[0]}_sweep.csv"
+    results.to_csv(output, index=False)
+    print(f"+ {results['spec_id'].nunique()} specifications, {len(results)} estimates: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,718 @@
+"""
+Content-Hashed Pipeline Stage Graph
+===================================
+Runs the integration pipeline as a small dependency graph. Each stage's
+output is stored under a hash of everything that determines it:
+
+  - the content hashes of the stage's input files
+  - the stage's parameters
+  - the content hashes of the pipeline source files the stage function
+    uses, and the stage's version number
+  - the keys of its upstream stages
+
+A run recomputes only the stages whose key changed (i.e. the stages
+downstream of an edited file, parameter or function) and loads every other
+stage's output from the store. A dry run reports which stages would run and
+why, without running anything.
+
+The graph's layout (stages, dependencies, files and the code and parameter
+hashes) can be saved next to the stage records and restored without
+importing the stage functions, so a plan can be made without loading the
+pipeline modules, as long as the code that built the graph is unchanged.
+
+The source files of a stage are found by following the names its function
+refers to: the globals and default arguments it uses, the attributes it
+takes from imported modules, and in turn the names used by every function
+and class these resolve to, as long as they are defined in a module under
+this directory. Every such module's whole file is hashed, so a change to
+any helper, constant or class a stage reaches reruns the stage. Code
+reached only by name at run time (e.g. through getattr) is not found; bump
+the stage's version (or run with force=True) after changing such code.
+
+code_digest() hashes the same code at function granularity instead (the
+source of each function and class reached, and the values of the constants
+they use), for caches that should survive unrelated edits to a module.
+
+Author: Econometrics Project
+Date: 2026-10-16
+"""
+
+import functools
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import re
+import sys
+from pathlib import Path
+
+from cache_layout import file_fingerprint, file_sha256
+import instrumentation
+
+
+# Bump when the stored stage layout changes so old outputs are ignored
+STAGE_FORMAT_VERSION = 2
+
+# Modules under this directory are pipeline code, hashed into stage keys
+CODE_ROOT = Path(__file__).resolve().parent
+
+# Saved graph layout, in the store directory
+LAYOUT_FILE = 'layout.json'
+
+
+def _stable_hash(obj):
+    """
+    Hash a JSON-serializable object independently of dict ordering.
+    """
+    payload = json.dumps(obj, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _pipeline_file(obj):
+    """
+    Source file of the module an object is defined in, if that module is
+    pipeline code (None for library and built-in objects).
+    """
+    module = obj if inspect.ismodule(obj) else sys.modules.get(getattr(obj, '__module__', None) or '')
+    path = getattr(module, '__file__', None)
+    return _pipeline_path(path) if path else None
+
+
+@functools.lru_cache(maxsize=None)
+def _pipeline_path(path):
+    """
+    Resolved path of a module file under CODE_ROOT (None outside it).
+    """
+    path = Path(path).resolve()
+    if not path.is_file() or not path.is_relative_to(CODE_ROOT) or 'site-packages' in path.parts:
+        return None
+    return path
+
+
+def _code_names(code):
+    """
+    Global and attribute names used by a code object and by the functions,
+    lambdas and comprehensions nested in it.
+    """
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            names |= _code_names(const)
+    return names
+
+
+def _reachable(func):
+    """
+    Pipeline functions, classes and modules a function reaches (see the
+    module docstring), with the constants each of them takes from a module.
+    
+    Returns:
+    --------
+    tuple
+        (objects, constants): the reached objects in visiting order, and
+        {'module.name': value} for every non-callable global or module
+        attribute a reached function uses
+    """
+    reached = []
+    constants = {}
+    seen = {}
+    pending = [func]
+    while pending:
+        obj = pending.pop()
+        if id(obj) in seen:
+            continue
+        # Keep visited objects alive so their ids are not reused
+        seen[id(obj)] = obj
+        
+        if isinstance(obj, dict):
+            pending.extend(obj.values())
+            continue
+        if isinstance(obj, (list, tuple, set, frozenset)):
+            pending.extend(obj)
+            continue
+        if isinstance(obj, functools.partial):
+            pending.extend([obj.func, obj.args, obj.keywords])
+            continue
+        if isinstance(obj, (staticmethod, classmethod)):
+            pending.append(obj.__func__)
+            continue
+        if isinstance(obj, property):
+            pending.extend([obj.fget, obj.fset, obj.fdel])
+            continue
+        
+        if _pipeline_file(obj) is None:
+            continue
+        reached.append(obj)
+        
+        if inspect.isclass(obj):
+            pending.extend(vars(obj).values())
+            pending.extend(obj.__bases__)
+        elif inspect.isfunction(obj):
+            names = _code_names(obj.__code__)
+            pending.extend([obj.__defaults__ or (), obj.__kwdefaults__ or {}, getattr(obj, '__wrapped__', None)])
+            for cell in obj.__closure__ or ():
+                try:
+                    pending.append(cell.cell_contents)
+                except ValueError:
+                    # Cell of a variable not assigned yet
+                    pass
+            for name in names:
+                if name not in obj.__globals__:
+                    continue
+                value = obj.__globals__[name]
+                pending.append(value)
+                if not _is_code(value):
+                    constants[f"{obj.__module__}.{name}"] = value
+                # module.attr: follow the attributes taken from a pipeline module
+                if inspect.ismodule(value) and _pipeline_file(value) is not None:
+                    for attr in names:
+                        if not hasattr(value, attr):
+                            continue
+                        pending.append(getattr(value, attr))
+                        if not _is_code(getattr(value, attr)):
+                            constants[f"{value.__name__}.{attr}"] = getattr(value, attr)
+    
+    return reached, constants
+
+
+def _is_code(value):
+    """
+    True for modules, classes and callables (hashed by source, if at all).
+    """
+    return inspect.ismodule(value) or inspect.isclass(value) or callable(value)
+
+
+def _describe(value):
+    """
+    Stable text form of a constant, or None if it is not plain data (e.g.
+    runtime state such as a recorder or a cache), which is not hashed.
+    Functions and classes inside containers are named, not described.
+    """
+    if isinstance(value, (str, bytes, int, float, bool)):
+        return repr(value)
+    if isinstance(value, re.Pattern):
+        return f"re.compile({value.pattern!r}, {value.flags})"
+    if inspect.isfunction(value) or inspect.isclass(value):
+        return f"{value.__module__}.{value.__qualname__}"
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [_describe(item) for item in value]
+        if None in items:
+            return None
+        if isinstance(value, (set, frozenset)):
+            items.sort()
+        return f"{type(value).__name__}({', '.join(items)})"
+    if isinstance(value, dict):
+        items = [(_describe(key), _describe(item)) for key, item in value.items()]
+        if any(None in pair for pair in items):
+            return None
+        return '{' + ', '.join(f"{key}: {item}" for key, item in items) + '}'
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def _source(obj):
+    """
+    Source text of a pipeline function or class (its bytecode if the
+    source cannot be read).
+    """
+    try:
+        return inspect.getsource(obj)
+    except (OSError, TypeError):
+        return obj.__code__.co_code.hex() if inspect.isfunction(obj) else ''
+
+
+def code_files(func):
+    """
+    Source files of the pipeline modules a function uses (see the module
+    docstring for how they are found).
+    
+    Parameters:
+    -----------
+    func : callable
+        Stage function
+        
+    Returns:
+    --------
+    list of Path
+        Sorted source files, including the function's own module
+    """
+    reached, _ = _reachable(func)
+    return sorted({_pipeline_file(obj) for obj in reached})
+
+
+def code_digest(func):
+    """
+    Hash of the code a function runs, at function rather than file
+    granularity: the source of every pipeline function and class it
+    reaches (found as for code_files), and the values of the constants
+    these take from their modules. Edits elsewhere in the same files leave
+    the digest unchanged.
+    
+    Parameters:
+    -----------
+    func : callable
+        Function whose behavior is hashed (e.g. the builder of a cached frame)
+        
+    Returns:
+    --------
+    str
+        Hex digest
+    """
+    reached, constants = _reachable(func)
+    parts = []
+    for obj in reached:
+        if inspect.ismodule(obj):
+            continue
+        if not (inspect.isfunction(obj) or inspect.isclass(obj)):
+            # Instance of a pipeline class: hash its class
+            obj = type(obj)
+        parts.append(f"{obj.__module__}.{obj.__qualname__}\n{_source(obj)}")
+    for name, value in constants.items():
+        text = _describe(value)
+        if text is not None:
+            parts.append(f"{name} = {text}")
+    return hashlib.sha256('\n'.join(sorted(set(parts))).encode()).hexdigest()
+
+
+def _row_count(output):
+    """
+    Rows of a stage output: a frame's length, or the sum over a tuple of
+    frames (None for anything else).
+    """
+    if hasattr(output, 'shape') and len(output.shape) > 0:
+        return int(output.shape[0])
+    if isinstance(output, (tuple, list)):
+        counts = [_row_count(part) for part in output]
+        counts = [count for count in counts if count is not None]
+        return sum(counts) if counts else None
+    return None
+
+
+class Stage:
+    """
+    One node of the pipeline graph.
+    
+    Parameters:
+    -----------
+    name : str
+        Unique stage name
+    func : callable
+        func(*upstream_outputs, **params, **context) -> output
+    deps : list of str
+        Names of upstream stages, whose outputs are passed positionally
+    inputs : list of str
+        Files read by the stage (content-hashed)
+    params : dict
+        JSON-serializable parameters that determine the output (hashed)
+    context : dict
+        Extra keyword arguments that do not affect the output, such as worker
+        counts or caches (not hashed)
+    outputs : list of str
+        Files written by the stage; the stage reruns if any is missing
+    version : int
+        Bump to invalidate stored outputs after a change the source hashes
+        miss (see the module docstring)
+    """
+    
+    def __init__(self, name, func, deps=(), inputs=(), params=None, context=None,
+                 outputs=(), version=1):
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        self.inputs = [str(path) for path in inputs]
+        self.params = dict(params or {})
+        self.context = dict(context or {})
+        self.outputs = [str(path) for path in outputs]
+        self.version = version
+    
+    def code_hashes(self):
+        """
+        Content hashes of the pipeline source files the stage function uses,
+        keyed by path relative to CODE_ROOT.
+        """
+        return {str(path.relative_to(CODE_ROOT)): file_sha256(path) for path in code_files(self.func)}
+    
+    def params_hash(self):
+        """
+        Hash of the stage parameters.
+        """
+        return _stable_hash(self.params)
+
+
+class RecordedStage(Stage):
+    """
+    A stage restored from a saved graph layout.
+    
+    Its code and parameter hashes are the saved ones, so it can be planned
+    but not run.
+    
+    Parameters:
+    -----------
+    entry : dict
+        Layout entry written by StageGraph.save_layout()
+    """
+    
+    def __init__(self, entry):
+        super().__init__(entry['name'], None, deps=entry['deps'], inputs=entry['inputs'],
+                         outputs=entry['outputs'], version=entry['version'])
+        self._code_hashes = dict(entry['code'])
+        self._params_hash = entry['params']
+    
+    def code_hashes(self):
+        """
+        Saved content hashes of the stage's source files.
+        """
+        return self._code_hashes
+    
+    def params_hash(self):
+        """
+        Saved hash of the stage parameters.
+        """
+        return self._params_hash
+
+
+class StageGraph:
+    """
+    Dependency graph of pipeline stages with a content-addressed output store.
+    
+    Parameters:
+    -----------
+    store_dir : str
+        Directory holding stored stage outputs and run records
+    """
+    
+    def __init__(self, store_dir):
+        self.store_dir = Path(store_dir)
+        self.stages = {}
+        self._results = {}
+        self._hash_memo_path = self.store_dir / 'file_hashes.json'
+        self._hash_memo = None
+    
+    def add(self, name, func, **kwargs):
+        """
+        Add a stage; upstream stages must already be in the graph.
+        
+        Parameters:
+        -----------
+        name : str
+            Unique stage name
+        func : callable
+            Stage function (see Stage)
+        **kwargs
+            Remaining Stage arguments (deps, inputs, params, context, outputs,
+            version)
+        """
+        if name in self.stages:
+            raise ValueError(f"Duplicate stage: {name}")
+        stage = Stage(name, func, **kwargs)
+        missing = [dep for dep in stage.deps if dep not in self.stages]
+        if missing:
+            raise ValueError(f"Stage '{name}' depends on unknown stage(s): {', '.join(missing)}")
+        self.stages[name] = stage
+        return stage
+    
+    def _file_hash(self, path):
+        """
+        Content hash of an input file, memoized by (size, mtime).
+        """
+        if self._hash_memo is None:
+            self._hash_memo = {}
+            if self._hash_memo_path.exists():
+                with open(self._hash_memo_path) as f:
+                    self._hash_memo = json.load(f)
+        
+        if not os.path.exists(path):
+            return 'missing'
+        
+        fingerprint = file_fingerprint(path)
+        memo_key = str(Path(path).resolve())
+        entry = self._hash_memo.get(memo_key)
+        if entry and entry['size'] == fingerprint['size'] and entry['mtime_ns'] == fingerprint['mtime_ns']:
+            return entry['sha256']
+        
+        digest = file_sha256(path)
+        self._hash_memo[memo_key] = dict(fingerprint, sha256=digest)
+        return digest
+    
+    def _components(self, stage, keys):
+        """
+        Everything that determines a stage's output.
+        """
+        return {
+            'format': STAGE_FORMAT_VERSION,
+            'version': stage.version,
+            'code': stage.code_hashes(),
+            'params': stage.params_hash(),
+            'inputs': {path: self._file_hash(path) for path in stage.inputs},
+            'deps': {dep: keys[dep] for dep in stage.deps},
+        }
+    
+    def _output_path(self, name, key):
+        """
+        Path of the stored output for a stage key.
+        """
+        return self.store_dir / f"{name}-{key[:16]}.pkl"
+    
+    def _record_path(self, name):
+        """
+        Path of the record holding a stage's last key and its components.
+        """
+        return self.store_dir / f"{name}.json"
+    
+    def _load_record(self, name):
+        """
+        Load a stage's last run record (None if it never ran).
+        """
+        path = self._record_path(name)
+        if not path.exists():
+            return None
+        with open(path) as f:
+            return json.load(f)
+    
+    def _write_atomic(self, path, write):
+        """
+        Write a file through a temp file and rename.
+        """
+        tmp_path = path.with_name(f"{path.name}.tmp{os.getpid()}")
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    
+    def _store(self, stage, key, components, output):
+        """
+        Store a stage output and record the key it was computed under.
+        """
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Drop the previous output of this stage; keys are content addresses
+        record = self._load_record(stage.name)
+        if record and record['key'] != key:
+            self._output_path(stage.name, record['key']).unlink(missing_ok=True)
+        
+        def write_output(path):
+            with open(path, 'wb') as f:
+                pickle.dump(output, f, protocol=pickle.HIGHEST_PROTOCOL)
+        
+        def write_record(path):
+            with open(path, 'w') as f:
+                json.dump({'key': key, 'components': components}, f, indent=2)
+        
+        self._write_atomic(self._output_path(stage.name, key), write_output)
+        self._write_atomic(self._record_path(stage.name), write_record)
+    
+    def _save_hash_memo(self):
+        """
+        Persist the memo of input file content hashes.
+        """
+        if self._hash_memo is None:
+            return
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        
+        def write_memo(path):
+            with open(path, 'w') as f:
+                json.dump(self._hash_memo, f, indent=2)
+        
+        self._write_atomic(self._hash_memo_path, write_memo)
+    
+    def _reasons(self, stage, components, record, will_run):
+        """
+        Explain why a stage has to run by diffing against its last record.
+        """
+        if record is None:
+            return ['no previous run']
+        
+        previous = record['components']
+        reasons = []
+        if previous.get('format') != components['format'] or previous.get('version') != components['version']:
+            reasons.append('stage version changed')
+        else:
+            code, previous_code = components['code'], previous['code']
+            changed = [path for path in sorted(set(code) | set(previous_code))
+                       if code.get(path) != previous_code.get(path)]
+            if changed:
+                reasons.append(f"code changed: {', '.join(Path(path).name for path in changed)}")
+        if previous.get('params') != components['params']:
+            reasons.append('parameters changed')
+        for path, digest in components['inputs'].items():
+            if previous.get('inputs', {}).get(path) != digest:
+                reasons.append(f"input changed: {Path(path).name}")
+        for dep, dep_key in components['deps'].items():
+            if previous.get('deps', {}).get(dep) != dep_key or will_run.get(dep):
+                reasons.append(f"upstream changed: {dep}")
+        
+        return reasons
+    
+    def plan(self, force=False):
+        """
+        Decide which stages must run.
+        
+        Parameters:
+        -----------
+        force : bool
+            Run every stage regardless of stored outputs
+            
+        Returns:
+        --------
+        list of dict
+            One entry per stage in run order with keys: name, key, run,
+            reasons, components
+        """
+        keys = {}
+        will_run = {}
+        plan = []
+        
+        for name, stage in self.stages.items():
+            components = self._components(stage, keys)
+            key = _stable_hash(components)
+            keys[name] = key
+            
+            record = self._load_record(name)
+            stored = (
+                record is not None
+                and record['key'] == key
+                and self._output_path(name, key).exists()
+                and all(os.path.exists(path) for path in stage.outputs)
+            )
+            
+            if force:
+                run, reasons = True, ['forced']
+            elif stored:
+                run, reasons = False, ['up to date']
+            else:
+                run = True
+                reasons = self._reasons(stage, components, record, will_run)
+                reasons += [f"output missing: {Path(path).name}"
+                            for path in stage.outputs if not os.path.exists(path)]
+                if not reasons:
+                    reasons = ['stored output missing']
+            
+            will_run[name] = run
+            plan.append({'name': name, 'key': key, 'run': run, 'reasons': reasons,
+                         'components': components})
+        
+        return plan
+    
+    def print_plan(self, plan):
+        """
+        Print which stages would run and why.
+        """
+        print("\n" + "="*80)
+        print("PIPELINE PLAN")
+        print("="*80)
+        for entry in plan:
+            action = "run " if entry['run'] else "skip"
+            print(f"  {action}  {entry['name']:20s} [{entry['key'][:8]}]  {'; '.join(entry['reasons'])}")
+        
+        n_run = sum(entry['run'] for entry in plan)
+        print(f"\n  {n_run} of {len(plan)} stages would run")
+    
+    def save_layout(self, extra=None):
+        """
+        Save the graph layout to the store directory.
+        
+        Parameters:
+        -----------
+        extra : dict, optional
+            JSON-serializable details stored alongside, e.g. what the caller
+            needs to tell whether the layout is still current
+        """
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        layout = {
+            'format': STAGE_FORMAT_VERSION,
+            'stages': [
+                {'name': stage.name, 'deps': stage.deps, 'inputs': stage.inputs, 'outputs': stage.outputs,
+                 'version': stage.version, 'code': stage.code_hashes(), 'params': stage.params_hash()}
+                for stage in self.stages.values()
+            ],
+            'extra': extra or {},
+        }
+        
+        def write_layout(path):
+            with open(path, 'w') as f:
+                json.dump(layout, f, indent=2)
+        
+        self._write_atomic(self.store_dir / LAYOUT_FILE, write_layout)
+    
+    @classmethod
+    def load_layout(cls, store_dir):
+        """
+        Restore a graph from its saved layout.
+        
+        Parameters:
+        -----------
+        store_dir : str
+            Directory holding stored stage outputs and run records
+            
+        Returns:
+        --------
+        tuple or None
+            (StageGraph of RecordedStage, extra details passed to
+            save_layout), or None if no current layout was saved
+        """
+        path = Path(store_dir) / LAYOUT_FILE
+        if not path.exists():
+            return None
+        with open(path) as f:
+            layout = json.load(f)
+        if layout.get('format') != STAGE_FORMAT_VERSION:
+            return None
+        
+        graph = cls(store_dir)
+        for entry in layout['stages']:
+            graph.stages[entry['name']] = RecordedStage(entry)
+        return graph, layout['extra']
+    
+    def output(self, name):
+        """
+        Return a stage's output, loading it from the store if needed.
+        """
+        if name not in self._results:
+            record = self._load_record(name)
+            with instrumentation.span(f"load_stored:{name}"), open(self._output_path(name, record['key']), 'rb') as f:
+                self._results[name] = pickle.load(f)
+        return self._results[name]
+    
+    def run(self, force=False, dry_run=False):
+        """
+        Run every stage whose key changed, in dependency order.
+        
+        Outputs of skipped stages are loaded lazily, only when a stage that
+        runs needs them (or when requested through output()).
+        
+        Parameters:
+        -----------
+        force : bool
+            Run every stage regardless of stored outputs
+        dry_run : bool
+            Only print the plan
+            
+        Returns:
+        --------
+        list of dict
+            The executed plan (see plan())
+        """
+        with instrumentation.span('plan'):
+            plan = self.plan(force=force)
+        self.print_plan(plan)
+        
+        if dry_run:
+            return plan
+        
+        for entry in plan:
+            if not entry['run']:
+                continue
+            stage = self.stages[entry['name']]
+            if stage.func is None:
+                raise RuntimeError(f"Stage '{stage.name}' was restored from a saved layout and cannot run")
+            upstream = [self.output(dep) for dep in stage.deps]
+            with instrumentation.span(stage.name, key=entry['key'][:16], reasons=entry['reasons']):
+                if upstream:
+                    instrumentation.record(rows_in=_row_count(upstream))
+                output = stage.func(*upstream, **stage.params, **stage.context)
+                if _row_count(output) is not None:
+                    instrumentation.record(rows_out=_row_count(output))
+            self._results[stage.name] = output
+            self._store(stage, entry['key'], entry['components'], output)
+        
+        self._save_hash_memo()
+        return plan
@@ -0,0 +1,10 @@
+"""
+Tests
+=====
+Run from the repository root:
+
+  python -m pytest tests
+
+Author: Econometrics Project
+Date: 2026-10-16
+"""
@@ -0,0 +1,70 @@
+"""
+Input Cache Invalidation
+========================
+A cached copy of an input must be rebuilt when the code that built it
+changes (the prepare function, or anything it calls), not only when the
+source file changes.
+
+Author: Econometrics Project
+Date: 2026-10-16
+"""
+
+import sys
+
+import pandas as pd
+import pytest
+
+from input_cache import InputCache
+from listings_reader import iter_listing_chunks
+
+
+def _parse_price(chunk):
+    chunk['price'] = chunk['price'].str.lstrip('$').astype(float)
+    return chunk
+
+
+def _parse_price_doubled(chunk):
+    chunk['price'] = chunk['price'].str.lstrip('$').astype(float) * 2
+    return chunk
+
+
+def _prepare(chunk):
+    return _parse_price(chunk)
+
+
+@pytest.fixture
+def listings(tmp_path):
+    path = tmp_path / 'listings.csv'
+    pd.DataFrame({
+        'neighbourhood': ['Hyde Park', 'Zilker', 'Hyde Park'],
+        'price': ['$100', '$150', '$200'],
+    }).to_csv(path, index=False)
+    return str(path)
+
+
+def _read(path, cache, prepare):
+    chunks = iter_listing_chunks(path, ['price'], 'neighbourhood', prepare=prepare, chunksize=2, cache=cache)
+    return pd.concat(list(chunks), ignore_index=True)['price'].tolist()
+
+
+def test_unchanged_code_hits_cache(listings, tmp_path):
+    cache = InputCache(tmp_path / 'cache')
+    assert _read(listings, cache, _parse_price) == [100.0, 150.0, 200.0]
+    assert _read(listings, cache, _parse_price) == [100.0, 150.0, 200.0]
+    assert [event for event, _ in cache.events] == ['miss', 'hit']
+
+
+def test_changed_prepare_misses_cache(listings, tmp_path):
+    cache = InputCache(tmp_path / 'cache')
+    _read(listings, cache, _parse_price)
+    assert _read(listings, cache, _parse_price_doubled) == [200.0, 300.0, 400.0]
+    assert _read(listings, cache, _parse_price_doubled) == [200.0, 300.0, 400.0]
+    assert [event for event, _ in cache.events] == ['miss', 'miss', 'hit']
+
+
+def test_changed_helper_misses_cache(listings, tmp_path, monkeypatch):
+    cache = InputCache(tmp_path / 'cache')
+    _read(listings, cache, _prepare)
+    monkeypatch.setattr(sys.modules[__name__], '_parse_price', _parse_price_doubled)
+    assert _read(listings, cache, _prepare) == [200.0, 300.0, 400.0]
+    assert [event for event, _ in cache.events] == ['miss', 'miss']
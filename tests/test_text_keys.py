@@ -0,0 +1,110 @@
+"""
+Equivalence of normalize_keys and standardize_text
+==================================================
+normalize_keys must give, for every value of a column, exactly what
+standardize_text gives for that value alone: missing values unchanged,
+everything else through str(), lower(), strip() and space collapsing.
+
+Author: Econometrics Project
+Date: 2026-10-16
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from integrate_data import standardize_text
+from text_keys import normalize_keys
+
+
+COLUMNS = {
+    'strings': ['Austin', '  Bedford  Stuyvesant ', 'SOHO', 'soho', 'a    b', 'tab\there', '', ' '],
+    'missing': [None, np.nan, pd.NA, 'Hyde Park', None],
+    'all_missing': [None, np.nan],
+    'integers': [78701, 78702, 78701, 10001],
+    'floats': [1.0, 2.5, np.nan, -0.0, 1e20],
+    'mixed': ['1', 1, 1.0, True, None, 'A  B', 2.5, False, np.nan],
+    'numpy_scalars': [np.int64(7), np.float64(7.0), np.bool_(True), 'x'],
+}
+
+# Column dtype -> test columns whose values it can hold (None = object)
+DTYPES = {
+    None: list(COLUMNS),
+    'string': ['strings', 'missing', 'all_missing'],
+    'category': list(COLUMNS),
+}
+
+CASES = [(name, dtype) for dtype, names in DTYPES.items() for name in names]
+
+
+def _column(name, dtype=None):
+    """
+    Test column, on a non-default index.
+    """
+    values = pd.Series(COLUMNS[name], dtype=object, index=range(10, 10 + len(COLUMNS[name])), name=name)
+    return values if dtype is None else values.astype(dtype)
+
+
+def _expected(values):
+    """
+    standardize_text applied value by value, without any dtype inference.
+    """
+    return [standardize_text(value) for value in values.tolist()]
+
+
+def _same(actual, expected):
+    """
+    Equal values, or both missing.
+    """
+    if pd.isna(expected):
+        return bool(pd.isna(actual))
+    return type(actual) is str and actual == expected
+
+
+@pytest.mark.parametrize('name, dtype', CASES)
+def test_matches_standardize_text(name, dtype):
+    values = _column(name, dtype)
+    
+    result = normalize_keys(values)
+    
+    assert list(result.index) == list(values.index)
+    assert result.name == values.name
+    for actual, expected in zip(result.tolist(), _expected(values)):
+        assert _same(actual, expected), (actual, expected)
+
+
+@pytest.mark.parametrize('name', list(COLUMNS))
+def test_missing_values_are_returned_unchanged(name):
+    values = _column(name)
+    result = normalize_keys(values)
+    
+    for original, actual in zip(values.tolist(), result.tolist()):
+        if pd.isna(original):
+            assert actual is original
+
+
+@pytest.mark.parametrize('name, dtype', CASES)
+def test_matches_standardize_text_as_category(name, dtype):
+    values = _column(name, dtype)
+    
+    result = normalize_keys(values, as_category=True)
+    expected = _expected(values)
+    
+    assert isinstance(result.dtype, pd.CategoricalDtype)
+    assert list(result.index) == list(values.index)
+    for actual, wanted in zip(result.tolist(), expected):
+        assert _same(actual, wanted), (actual, wanted)
+    assert sorted(result.cat.categories) == sorted({value for value in expected if not pd.isna(value)})
+
+
+def test_plain_list_input():
+    values = ['  New  York ', None, 'new york']
+    
+    assert normalize_keys(values).tolist() == ['new york', None, 'new york']
+    assert normalize_keys(values, as_category=True).cat.categories.tolist() == ['new york']
+
+
+def test_equal_keys_share_one_string():
+    result = normalize_keys(pd.Series(['Hyde  Park', 'hyde park ', 'HYDE PARK']))
+    
+    assert result[0] is result[1] is result[2]
@@ -0,0 +1,78 @@
+"""
+Vectorized Geographic Key Normalization
+=======================================
+Normalizes whole columns of city/neighborhood labels the same way
+standardize_text does for a single value (lowercase, strip whitespace,
+collapse runs of spaces), but normalizes each distinct label only once and
+shares one interned string object per distinct key.
+
+Author: Econometrics Project
+Date: 2026-10-16
+"""
+
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+
+
+# Runs of two or more spaces (standardize_text collapses only ' ', not tabs)
+_MULTIPLE_SPACES = re.compile(' {2,}')
+
+
+def _normalize_label(value):
+    """
+    Normalize one non-missing label exactly like standardize_text.
+    """
+    return sys.intern(_MULTIPLE_SPACES.sub(' ', str(value).lower().strip()))
+
+
+def normalize_keys(values, as_category=False):
+    """
+    Standardize a column of geographic labels in one vectorized pass.
+    
+    Equivalent to values.apply(standardize_text): missing values are returned
+    unchanged and every other value goes through str(), lower(), strip() and
+    space collapsing. Labels are factorized first, so the string work runs
+    once per distinct label instead of once per row.
+    
+    Parameters:
+    -----------
+    values : pd.Series or array-like
+        Labels to standardize
+    as_category : bool
+        Return a categorical Series instead of an object Series of interned
+        strings
+        
+    Returns:
+    --------
+    pd.Series
+        Standardized labels, aligned with the input index
+    """
+    if not isinstance(values, pd.Series):
+        values = pd.Series(values)
+    
+    # 1, 1.0 and True hash alike but print differently, so keep their types apart
+    if pd.api.types.infer_dtype(values, skipna=True).startswith('mixed'):
+        typed = values.map(lambda v: v if pd.isna(v) else (type(v).__name__, v))
+        codes, uniques = pd.factorize(typed)
+        uniques = [u[1] for u in uniques]
+    else:
+        codes, uniques = pd.factorize(values)
+    
+    normalized = np.array([_normalize_label(u) for u in uniques], dtype=object)
+    missing = codes < 0
+    
+    if as_category:
+        categories, inverse = np.unique(normalized.astype(str), return_inverse=True)
+        category_codes = np.full(len(codes), -1, dtype=np.int64)
+        category_codes[~missing] = inverse.ravel()[codes[~missing]]
+        result = pd.Categorical.from_codes(category_codes, categories=categories)
+        return pd.Series(result, index=values.index, name=values.name)
+    
+    result = np.empty(len(codes), dtype=object)
+    result[~missing] = normalized[codes[~missing]]
+    result[missing] = values.to_numpy(dtype=object)[missing]
+    
+    return pd.Series(result, index=values.index, name=values.name)
@@ -0,0 +1,314 @@
+"""
+Schema and Range Validation of Input and Output Frames
+======================================================
+Declares what every column of the pipeline may contain (COLUMN_RULES) and
+which columns, required columns and unique keys each input file and the
+final dataset have (SCHEMAS), and checks frames against them with one
+vectorized pass per rule, so validating a million-row frame costs a few
+column scans rather than a loop over rows.
+
+A rule may give:
+  dtype       - 'number' (numeric, or text that parses as a number once '$'
+                and ',' are stripped) or 'integer' (a whole number)
+  non_null    - no missing values
+  min / max   - inclusive bounds; greater_than is an exclusive lower bound
+  allowed     - the only values permitted (missing values aside)
+  finite      - no infinite values (e.g. from a division by zero)
+
+Violations are reported compactly: one line per failed rule with the number
+of offending rows and a few of them, sampled evenly across the frame.
+Validator runs in one of VALIDATION_MODES:
+  lazy      - check everything, then raise one ValidationError listing
+              every violation (default)
+  fail_fast - raise at the first failed rule
+  warn      - print the violations and carry on
+
+Author: Econometrics Project
+Date: 2026-10-16
+"""
+
+import numpy as np
+import pandas as pd
+
+
+KEYS = ['city', 'neighborhood']
+
+VALIDATION_MODES = ('lazy', 'fail_fast', 'warn')
+
+# Offending rows shown per violation
+MAX_EXAMPLES = 5
+
+# What each column may contain, wherever it appears
+COLUMN_RULES = {
+    'city': {'non_null': True},
+    'neighborhood': {'non_null': True},
+    'median_rent': {'dtype': 'number', 'greater_than': 0},
+    'airbnb_count': {'dtype': 'integer', 'non_null': True, 'min': 0},
+    'housing_units': {'dtype': 'number', 'min': 0},
+    'airbnb_density': {'dtype': 'number', 'min': 0, 'finite': True},
+    'price_median': {'dtype': 'number', 'min': 0},
+    'price_iqr': {'dtype': 'number', 'min': 0},
+    'entire_home_share': {'dtype': 'number', 'min': 0, 'max': 1},
+    'availability_share': {'dtype': 'number', 'min': 0, 'max': 1},
+    'reviews_per_month': {'dtype': 'number', 'min': 0},
+    'multi_listing_host_share': {'dtype': 'number', 'min': 0, 'max': 1},
+    'occupancy_rate': {'dtype': 'number', 'min': 0, 'max': 1},
+    'booked_days': {'dtype': 'number', 'min': 0},
+    'reviews_ltm': {'dtype': 'number', 'min': 0},
+    'review_occupancy': {'dtype': 'number', 'min': 0, 'max': 1},
+    'median_household_income': {'dtype': 'number', 'greater_than': 0},
+    'population_density': {'dtype': 'number', 'greater_than': 0},
+    'pct_college': {'dtype': 'number', 'min': 0, 'max': 100},
+    'tourist_area': {'dtype': 'number', 'allowed': [0, 1]},
+    'log_rent': {'dtype': 'number', 'finite': True},
+    'log_income': {'dtype': 'number', 'finite': True},
+    'log_airbnb_density': {'dtype': 'number', 'finite': True},
+}
+
+# Per frame: columns checked (when present), required columns and unique key
+SCHEMAS = {
+    'demographics': {
+        'columns': KEYS + ['median_household_income', 'population_density', 'pct_college', 'housing_units'],
+        'required': KEYS,
+        'unique': KEYS,
+    },
+    'rent': {
+        'columns': KEYS + ['median_rent'],
+        'required': KEYS + ['median_rent'],
+        'unique': KEYS,
+    },
+    'housing': {
+        'columns': KEYS + ['housing_units'],
+        'required': KEYS + ['housing_units'],
+        'unique': KEYS,
+    },
+    'tourism': {
+        'columns': KEYS + ['tourist_area'],
+        'required': KEYS + ['tourist_area'],
+        'unique': KEYS,
+    },
+    # Files of the data collection rounds (source directories); their
+    # duplicate keys are resolved by file priority, so need not be unique
+    'collection_round': {
+        'columns': KEYS + ['median_household_income', 'population_density', 'pct_college', 'housing_units',
+                           'median_rent', 'tourist_area'],
+        'required': KEYS,
+    },
+    'final': {
+        'columns': list(COLUMN_RULES),
+        'required': KEYS + ['airbnb_count'],
+        'unique': KEYS,
+    },
+}
+
+
+class ValidationError(ValueError):
+    """
+    Raised when frames violate their schemas; violations holds the details.
+    """
+    
+    def __init__(self, violations):
+        self.violations = list(violations)
+        super().__init__(format_violations(self.violations))
+
+
+def _sample(positions):
+    """
+    Up to MAX_EXAMPLES positions spread evenly over the offending rows.
+    """
+    if len(positions) <= MAX_EXAMPLES:
+        return positions
+    return positions[np.linspace(0, len(positions) - 1, MAX_EXAMPLES).astype(int)]
+
+
+def _value(value):
+    """
+    Plain Python value of a cell (or 'a / b' for a row of key columns), for reports.
+    """
+    if isinstance(value, pd.Series):
+        return ' / '.join(str(item) for item in value)
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _violation(source, column, problem, mask, values):
+    """
+    Describe the rows flagged by mask (None if there are none); values is
+    the column (or key columns) the examples are taken from.
+    """
+    positions = np.flatnonzero(mask)
+    if len(positions) == 0:
+        return None
+    return {
+        'source': source,
+        'column': column,
+        'problem': problem,
+        'count': int(len(positions)),
+        'rows': int(len(mask)),
+        'examples': [(int(position), _value(values.iloc[position])) for position in _sample(positions)],
+    }
+
+
+def _as_numbers(series):
+    """
+    Numeric values of a column (formatted text like '$1,250' parsed), NaN
+    where a value is missing or not a number.
+    """
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return series.to_numpy(dtype=float)
+    text = series.astype(str).str.replace(r'[$,]', '', regex=True).where(series.notna())
+    return pd.to_numeric(text, errors='coerce').to_numpy(dtype=float)
+
+
+def _column_violations(series, rule, source):
+    """
+    Yield the violations of one column's rule, rule by rule.
+    """
+    name = series.name
+    present = series.notna().to_numpy()
+    
+    if rule.get('non_null'):
+        yield _violation(source, name, 'missing', ~present, series)
+    
+    if 'dtype' not in rule:
+        return
+    
+    values = _as_numbers(series)
+    parsed = ~np.isnan(values)
+    yield _violation(source, name, 'not a number', present & ~parsed, series)
+    
+    if rule['dtype'] == 'integer':
+        with np.errstate(invalid='ignore'):
+            yield _violation(source, name, 'not a whole number', parsed & (np.mod(values, 1) != 0), series)
+    if rule.get('finite'):
+        yield _violation(source, name, 'infinite', np.isinf(values), series)
+    
+    finite = parsed & ~np.isinf(values)
+    with np.errstate(invalid='ignore'):
+        if 'min' in rule:
+            yield _violation(source, name, f"below {rule['min']}", finite & (values < rule['min']), series)
+        if 'greater_than' in rule:
+            yield _violation(source, name, f"not above {rule['greater_than']}",
+                             finite & (values <= rule['greater_than']), series)
+        if 'max' in rule:
+            yield _violation(source, name, f"above {rule['max']}", finite & (values > rule['max']), series)
+    if 'allowed' in rule:
+        allowed = np.isin(values, np.asarray(rule['allowed'], dtype=float))
+        yield _violation(source, name, f"not one of {', '.join(map(str, rule['allowed']))}",
+                         parsed & ~allowed, series)
+
+
+def check_frame(df, schema, source, fail_fast=False, rules=COLUMN_RULES):
+    """
+    Check a frame against a schema.
+    
+    Parameters:
+    -----------
+    df : pd.DataFrame
+        Frame to check
+    schema : dict
+        Schema with 'columns', 'required' and optionally 'unique' (see SCHEMAS)
+    source : str
+        Name of the frame in reports (e.g. its file name)
+    fail_fast : bool
+        Stop at the first violation
+    rules : dict
+        Column -> rule (see COLUMN_RULES)
+        
+    Returns:
+    --------
+    list of dict
+        Violations with keys source, column, problem, count, rows and
+        examples ((row position, value) pairs); empty if the frame is valid
+    """
+    violations = []
+    
+    def found(violation):
+        if violation is not None:
+            violations.append(violation)
+        return fail_fast and bool(violations)
+    
+    missing = [col for col in schema.get('required', []) if col not in df.columns]
+    for col in missing:
+        if found({'source': source, 'column': col, 'problem': 'column missing', 'count': None,
+                  'rows': len(df), 'examples': []}):
+            return violations
+    
+    for col in schema['columns']:
+        if col not in df.columns or col not in rules:
+            continue
+        for violation in _column_violations(df[col], rules[col], source):
+            if found(violation):
+                return violations
+    
+    keys = schema.get('unique')
+    if keys and all(key in df.columns for key in keys):
+        duplicated = df.duplicated(subset=keys, keep=False).to_numpy()
+        found(_violation(source, ', '.join(keys), 'duplicate key', duplicated, df[keys]))
+    
+    return violations
+
+
+def format_violations(violations):
+    """
+    Compact text report of violations, grouped by source.
+    """
+    sources = list(dict.fromkeys(violation['source'] for violation in violations))
+    lines = [f"Validation failed: {len(violations)} problem(s) in {len(sources)} input(s)"]
+    for source in sources:
+        lines.append(f"   {source}")
+        for violation in violations:
+            if violation['source'] != source:
+                continue
+            if violation['count'] is None:
+                lines.append(f"      {violation['column']}: {violation['problem']}")
+                continue
+            examples = ', '.join(f"row {row}: {value!r}" for row, value in violation['examples'])
+            lines.append(f"      {violation['column']}: {violation['count']:,} of {violation['rows']:,} rows "
+                         f"{violation['problem']} (e.g. {examples})")
+    return "\n".join(lines)
+
+
+class Validator:
+    """
+    Checks frames against their schemas and collects the violations.
+    
+    Parameters:
+    -----------
+    mode : str
+        One of VALIDATION_MODES
+    rules : dict
+        Column -> rule (see COLUMN_RULES)
+    """
+    
+    def __init__(self, mode='lazy', rules=COLUMN_RULES):
+        if mode not in VALIDATION_MODES:
+            raise ValueError(f"Unknown validation mode: {mode} (expected {', '.join(VALIDATION_MODES)})")
+        self.mode = mode
+        self.rules = rules
+        self.violations = []
+        self.checked = {}
+    
+    def check(self, df, schema, source):
+        """
+        Check one frame; raises right away in fail_fast mode.
+        """
+        violations = check_frame(df, schema, source, fail_fast=self.mode == 'fail_fast', rules=self.rules)
+        self.checked[source] = len(df)
+        if violations and self.mode == 'fail_fast':
+            raise ValidationError(violations)
+        self.violations.extend(violations)
+    
+    def finish(self):
+        """
+        Raise (lazy) or print (warn) the collected violations.
+        
+        Returns:
+        --------
+        dict
+            Source -> rows checked
+        """
+        if self.violations:
+            if self.mode != 'warn':
+                raise ValidationError(self.violations)
+            print("   WARNING: " + format_violations(self.violations))
+        return dict(self.checked)